@@ -0,0 +1,205 @@
+"""
+Ligne de commande de YoonuRH : génération des rapports sans interface.
+
+    python hr_cli.py report staff-list --format xlsx --out liste.xlsx
+    python hr_cli.py report staff-list hr-stats --format pdf --out-dir rapports
+    python hr_cli.py report employee-sheet --employee 519723/E --employee 42
+    python hr_cli.py report employee-sheets --department "Division X" --out fiches.zip
+    python hr_cli.py report annual-leave --year 2023
+    python hr_cli.py report annual-leave --from 2022-01-01 --to 2024-06-30 --format xlsx
+
+Prévu pour les tâches planifiées : aucune fenêtre, aucune boîte de dialogue.
+Les rapports demandés ensemble sont générés en parallèle, un processus par
+rapport (`--jobs` au plus), chacun avec sa propre connexion à la base.
+Chaque fichier écrit est affiché sur la sortie standard, les erreurs sur la
+sortie d'erreur ; le code de retour vaut 1 si un rapport a échoué.
+
+Ce module n'importe pas tkinter ; ReportLab et openpyxl ne sont chargés que
+pour le format demandé.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from hr_db import Database, to_iso_date
+from hr_reports import (build_all_employee_sheets, build_annual_leave, build_employee_sheet,
+                        build_hr_statistics, build_staff_list, leave_period, leave_period_label)
+from hr_schema import apply_migrations
+
+
+# Rapports disponibles : nom -> (fonction build_*, début du nom de fichier par défaut)
+REPORTS = {
+    'staff-list': (build_staff_list, 'liste_personnel'),
+    'employee-sheet': (build_employee_sheet, 'fiche_employe'),
+    'employee-sheets': (build_all_employee_sheets, 'fiches_employes'),
+    'annual-leave': (build_annual_leave, 'rapport_conges'),
+    'hr-stats': (build_hr_statistics, 'statistiques_rh'),
+}
+
+FORMATS = {'pdf': 'pdf', 'xlsx': 'excel'}
+
+
+def default_db_path():
+    """Base de l'application : à côté de l'exécutable (PyInstaller) ou de ce script."""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, 'hr_database.db')
+
+
+def find_employee_id(db, reference):
+    """Id de l'employé désigné par son matricule ou son id ; None s'il n'existe pas."""
+    row = db.fetchone('SELECT id FROM employees WHERE matricule = ?', (reference,))
+    if row is None and reference.isdigit():
+        row = db.fetchone('SELECT id FROM employees WHERE id = ?', (int(reference),))
+    return row[0] if row else None
+
+
+def _output_name(base_name, extension, stamp, suffix=None):
+    if suffix:
+        base_name = f"{base_name}_{suffix.replace('/', '-')}"
+    return f'{base_name}_{stamp}.{extension}'
+
+
+def plan_reports(db, args):
+    """
+    Liste des rapports à générer : (nom, args de build_*, kwargs, fichier).
+    Lève ValueError si la demande est incohérente.
+    """
+    extension = args.format
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    tasks = []
+    for name in args.reports:
+        base_name = REPORTS[name][1]
+        if name == 'employee-sheet':
+            if not args.employee:
+                raise ValueError("employee-sheet : indiquez au moins un --employee (matricule ou id)")
+            for reference in args.employee:
+                employee_id = find_employee_id(db, reference)
+                if employee_id is None:
+                    raise ValueError(f"Employé introuvable : {reference}")
+                tasks.append((name, (employee_id,), {},
+                              _output_name(base_name, extension, stamp, reference)))
+        elif name == 'employee-sheets':
+            # Archive ZIP des fiches, au format demandé
+            tasks.append((name, (), {'department': args.department, 'status': args.status},
+                          _output_name(base_name, 'zip', stamp)))
+        elif name == 'annual-leave':
+            start_date, end_date = leave_period(args.year, to_iso_date(args.date_from),
+                                                to_iso_date(args.date_to))
+            period = leave_period_label(start_date, end_date).replace('/', '-').replace(' ', '_')
+            tasks.append((name, (), {'start_date': start_date, 'end_date': end_date},
+                          _output_name(f'{base_name}_{period}', extension, stamp)))
+        else:
+            tasks.append((name, (), {}, _output_name(base_name, extension, stamp)))
+
+    if args.out:
+        if len(tasks) > 1:
+            raise ValueError("--out n'accepte qu'un seul rapport ; utilisez --out-dir")
+        name, build_args, kwargs, _ = tasks[0]
+        return [(name, build_args, kwargs, args.out)]
+    out_dir = args.out_dir or os.getcwd()
+    return [(name, build_args, kwargs, os.path.join(out_dir, filename))
+            for name, build_args, kwargs, filename in tasks]
+
+
+def run_report(db_path, name, format_type, build_args, kwargs, filename):
+    """Génère un rapport avec sa propre connexion (exécuté dans un processus de travail)."""
+    build = REPORTS[name][0]
+    db = Database(db_path)
+    try:
+        return build(db, *build_args, format_type, filename, **kwargs)
+    finally:
+        db.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='yoonurh', description="YoonuRH en ligne de commande")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report = commands.add_parser('report', help="Générer un ou plusieurs rapports")
+    report.add_argument('reports', nargs='+', choices=sorted(REPORTS), metavar='RAPPORT',
+                        help="Rapport(s) : " + ', '.join(sorted(REPORTS)))
+    report.add_argument('--format', choices=sorted(FORMATS), default='pdf',
+                        help="Format du fichier (défaut : pdf)")
+    report.add_argument('--out', help="Fichier de sortie (un seul rapport)")
+    report.add_argument('--out-dir', help="Dossier de sortie (défaut : dossier courant)")
+    report.add_argument('--year', type=int, help="Année du rapport des congés (défaut : année en cours)")
+    report.add_argument('--from', dest='date_from', metavar='DATE',
+                        help="annual-leave : début de la période (AAAA-MM-JJ ou jj/mm/aaaa)")
+    report.add_argument('--to', dest='date_to', metavar='DATE',
+                        help="annual-leave : fin de la période (AAAA-MM-JJ ou jj/mm/aaaa)")
+    report.add_argument('--employee', action='append', metavar='MATRICULE',
+                        help="Employé de la fiche (matricule ou id) ; répétable")
+    report.add_argument('--department', help="employee-sheets : seulement les employés de cette division")
+    report.add_argument('--status', help="employee-sheets : seulement les employés de ce statut actuel (ex. Active, En Congé)")
+    report.add_argument('--db', default=default_db_path(), help="Base de données à utiliser")
+    report.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Rapports générés en parallèle au plus")
+    return parser
+
+
+def report_command(args):
+    if not os.path.exists(args.db):
+        print(f"Base de données introuvable : {args.db}", file=sys.stderr)
+        return 1
+
+    db = Database(args.db)
+    try:
+        apply_migrations(db)
+        tasks = plan_reports(db, args)
+    except ValueError as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    format_type = FORMATS[args.format]
+    failures = 0
+    workers = max(1, min(args.jobs, len(tasks)))
+    if workers == 1:
+        # Un seul rapport : pas de processus de travail à démarrer
+        outcomes = []
+        for name, build_args, kwargs, filename in tasks:
+            try:
+                outcomes.append((name, run_report(args.db, name, format_type, build_args,
+                                                  kwargs, filename), None))
+            except Exception as e:
+                outcomes.append((name, None, e))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(name, executor.submit(run_report, args.db, name, format_type,
+                                              build_args, kwargs, filename))
+                       for name, build_args, kwargs, filename in tasks]
+            outcomes = []
+            for name, future in futures:
+                try:
+                    outcomes.append((name, future.result(), None))
+                except Exception as e:
+                    outcomes.append((name, None, e))
+
+    for name, filename, error in outcomes:
+        if error is None:
+            print(filename)
+        else:
+            failures += 1
+            print(f"{name} : {error}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'report':
+        return report_command(args)
+    return 2
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
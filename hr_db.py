@@ -0,0 +1,527 @@
+"""
+Couche d'accès aux données de YoonuRH.
+
+Toute l'application passe par la classe `Database` au lieu d'ouvrir sa propre
+connexion avec `sqlite3.connect`. Le thread principal (Tk) réutilise une seule
+connexion longue durée ; les travaux en arrière-plan empruntent une connexion
+dans un petit pool. Les PRAGMA (WAL, synchronous, busy_timeout) sont appliqués
+une seule fois, à la création de chaque connexion.
+
+Ce module n'importe pas tkinter : il peut être utilisé sans interface.
+"""
+import calendar
+import queue
+import sqlite3
+import threading
+import warnings
+import weakref
+from datetime import date, datetime
+
+
+class PooledConnection:
+    """
+    Connexion empruntée à `Database`.
+
+    S'utilise exactement comme une connexion sqlite3 (cursor, execute, commit...),
+    mais `close()` rend la connexion au lieu de la fermer. Le `row_factory`
+    reste propre à l'emprunt pour ne pas modifier la connexion partagée.
+    Utilisable aussi comme gestionnaire de contexte : commit en sortie normale,
+    rollback en cas d'exception, puis restitution.
+
+    Emprunt imbriqué de la connexion partagée pendant la transaction d'un
+    autre emprunt (rappel Tk pendant une boîte de message, par exemple) :
+    son travail est isolé dans un SAVEPOINT. Son `commit()` libère le point
+    de sauvegarde, sans valider la transaction englobante ; son `rollback()`
+    et sa restitution n'annulent que son propre travail. Si l'emprunt
+    englobant a disparu sans être rendu, `commit()` lève ProgrammingError
+    plutôt que de laisser croire que les données sont enregistrées.
+    """
+
+    def __init__(self, database, raw_conn, depth=0):
+        self._database = database
+        self._conn = raw_conn
+        self._depth = depth
+        self._released = False
+        self._cancellable = False
+        self._savepoint = None
+        self.row_factory = None
+
+    def _begin_savepoint(self, name):
+        self._savepoint = name
+        self._conn.execute(f'SAVEPOINT {name}')
+
+    def cursor(self):
+        cursor = self._conn.cursor()
+        if self.row_factory is not None:
+            cursor.row_factory = self.row_factory
+        return cursor
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def executescript(self, script):
+        return self._conn.executescript(script)
+
+    def commit(self):
+        if self._savepoint is None:
+            self._conn.commit()
+        elif not self._database._has_outer_borrow(self):
+            raise sqlite3.ProgrammingError(
+                "Validation imbriquée sans emprunt englobant ouvert : une connexion "
+                "empruntée n'a pas été rendue (utiliser `with db.connect() as conn`).")
+        else:
+            # Le travail rejoint la transaction englobante ; la suite a son propre point
+            self._conn.execute(f'RELEASE SAVEPOINT {self._savepoint}')
+            self._conn.execute(f'SAVEPOINT {self._savepoint}')
+
+    def rollback(self):
+        if self._savepoint is None:
+            self._conn.rollback()
+        else:
+            self._conn.execute(f'ROLLBACK TO SAVEPOINT {self._savepoint}')
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    @property
+    def total_changes(self):
+        return self._conn.total_changes
+
+    def cancel_on(self, cancel_event, check_every=1000):
+        """
+        Interrompt la requête en cours dès que `cancel_event` est positionné.
+
+        SQLite lève alors `sqlite3.OperationalError` ("interrupted"). Le
+        gestionnaire est retiré à la restitution de la connexion.
+        """
+        if cancel_event is not None:
+            self._conn.set_progress_handler(cancel_event.is_set, check_every)
+            self._cancellable = True
+
+    def close(self):
+        """Rend la connexion (ne la ferme pas réellement)."""
+        if not self._released:
+            self._released = True
+            self._database._main_borrows.discard(self)
+            if self._cancellable:
+                self._conn.set_progress_handler(None, 0)
+            if self._savepoint is not None:
+                # Comme close() sqlite3 : le travail non validé est annulé
+                self._conn.execute(f'ROLLBACK TO SAVEPOINT {self._savepoint}')
+                self._conn.execute(f'RELEASE SAVEPOINT {self._savepoint}')
+            self._database._release(self._conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+        return False
+
+
+class Database:
+    """
+    Propriétaire des connexions SQLite de l'application.
+
+    - Le thread qui crée l'objet (le thread Tk) utilise une connexion unique,
+      partagée par tous les emprunts successifs ou imbriqués.
+    - Les autres threads empruntent une connexion dans un pool borné
+      (`pool_size`), créé à la demande.
+    """
+
+    def __init__(self, db_path, pool_size=4, busy_timeout_ms=5000, cached_statements=256):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+
+        self._owner_thread = threading.get_ident()
+        self._main_conn = None
+        self._main_depth = 0
+        # Emprunts en cours de la connexion partagée (pour repérer ceux jamais rendus)
+        self._main_borrows = weakref.WeakSet()
+
+        self._pool = queue.LifoQueue()
+        self._pool_created = 0
+        self._pool_lock = threading.Lock()
+        # Connexions du pool actuellement empruntées (attendues par close())
+        self._borrowed = 0
+        self._pool_idle = threading.Condition(self._pool_lock)
+        self._closed = False
+
+    # --- Création des connexions ---
+
+    def _open(self, check_same_thread=True):
+        """Ouvre une connexion et applique les PRAGMA de performance."""
+        conn = sqlite3.connect(self.db_path,
+                               timeout=self.busy_timeout_ms / 1000,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=check_same_thread)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _is_owner_thread(self):
+        return threading.get_ident() == self._owner_thread
+
+    # --- Emprunt / restitution ---
+
+    def connect(self):
+        """Emprunte une connexion. Appeler `close()` (ou utiliser `with`) pour la rendre."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("La base de données a été fermée.")
+
+        if self._is_owner_thread():
+            if self._main_conn is None:
+                self._main_conn = self._open()
+            self._check_main_depth()
+            self._main_depth += 1
+            conn = PooledConnection(self, self._main_conn, self._main_depth)
+            self._main_borrows.add(conn)
+            if self._main_depth > 1 and self._main_conn.in_transaction:
+                conn._begin_savepoint(f'nested_{self._main_depth}')
+            return conn
+
+        with self._pool_lock:
+            # Vérifié sous le verrou : close() n'attend que les emprunts déjà comptés
+            if self._closed:
+                raise sqlite3.ProgrammingError("La base de données a été fermée.")
+            self._borrowed += 1
+        try:
+            raw_conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_create = self._pool_created < self.pool_size
+                if can_create:
+                    self._pool_created += 1
+            if can_create:
+                try:
+                    raw_conn = self._open(check_same_thread=False)
+                except Exception:
+                    with self._pool_idle:
+                        self._pool_created -= 1
+                        self._borrowed -= 1
+                        self._pool_idle.notify_all()
+                    raise
+            else:
+                # Pool épuisé : on attend qu'un autre thread rende sa connexion
+                raw_conn = self._pool.get()
+        return PooledConnection(self, raw_conn)
+
+    def _check_main_depth(self):
+        """
+        Remet à jour la profondeur d'emprunt de la connexion partagée si des
+        emprunts ont disparu sans `close()` (exception avant la restitution).
+        Leur transaction est annulée, comme à la fermeture d'une connexion
+        sqlite3 : sans cela, les validations suivantes ne seraient que des
+        libérations de SAVEPOINT et la base resterait verrouillée en écriture.
+        """
+        live = len(self._main_borrows)
+        if live >= self._main_depth:
+            return
+        warnings.warn(f"{self._main_depth - live} emprunt(s) de la connexion partagée "
+                      f"jamais rendu(s) ; leur transaction est annulée.", RuntimeWarning, stacklevel=3)
+        self._main_depth = live
+        if live == 0 and self._main_conn.in_transaction:
+            self._main_conn.rollback()
+
+    def _has_outer_borrow(self, conn):
+        """Vrai si un emprunt englobant `conn` est encore ouvert."""
+        return any(borrow._depth < conn._depth for borrow in list(self._main_borrows))
+
+    def _release(self, raw_conn):
+        if raw_conn is self._main_conn:
+            self._main_depth = max(0, self._main_depth - 1)
+            # Même sémantique qu'un close() sqlite3 : une transaction non
+            # validée est annulée, mais seulement quand plus personne n'utilise
+            # la connexion partagée.
+            if self._main_depth == 0 and raw_conn.in_transaction:
+                raw_conn.rollback()
+            return
+
+        try:
+            if raw_conn.in_transaction:
+                raw_conn.rollback()
+        finally:
+            with self._pool_idle:
+                if self._closed:
+                    raw_conn.close()
+                else:
+                    self._pool.put(raw_conn)
+                self._borrowed -= 1
+                self._pool_idle.notify_all()
+
+    # --- Raccourcis ---
+
+    def fetchone(self, sql, params=()):
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+
+    def fetchall(self, sql, params=()):
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def fetchvalue(self, sql, params=(), default=None):
+        row = self.fetchone(sql, params)
+        return row[0] if row else default
+
+    # --- Maintenance ---
+
+    def backup(self, dest_path):
+        """Copie cohérente de la base (inclut le contenu du journal WAL)."""
+        conn = self.connect()
+        try:
+            dest = sqlite3.connect(dest_path)
+            try:
+                conn._conn.backup(dest)
+            finally:
+                dest.close()
+        finally:
+            conn.close()
+
+    def close(self, timeout=None):
+        """
+        Ferme toutes les connexions (à appeler avant de remplacer le fichier).
+
+        Les nouveaux emprunts sont refusés, puis on attend (au plus `timeout`
+        secondes, sans limite par défaut) que les threads rendent les
+        connexions du pool qu'ils utilisent encore. Retourne False si des
+        connexions étaient toujours empruntées à l'expiration du délai.
+        """
+        with self._pool_idle:
+            self._closed = True
+            drained = self._pool_idle.wait_for(lambda: self._borrowed == 0, timeout)
+        if self._main_conn is not None:
+            try:
+                self._main_conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            except sqlite3.Error:
+                pass
+            self._main_conn.close()
+            self._main_conn = None
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        return drained
+
+    def reopen(self):
+        """Réactive l'objet après un `close()` (ex. après restauration)."""
+        self.close()
+        with self._pool_lock:
+            self._closed = False
+            # Les connexions encore empruntées reviendront dans le pool
+            self._pool_created = self._borrowed
+        self._main_depth = 0
+        self._main_borrows = weakref.WeakSet()
+        self._owner_thread = threading.get_ident()
+
+
+# --- Dates ---
+# Les dates sont stockées en ISO-8601 (AAAA-MM-JJ) pour être triables et
+# indexables ; l'interface continue de les saisir et de les afficher en jj/mm/aaaa.
+
+DISPLAY_DATE_FORMAT = '%d/%m/%Y'
+ISO_DATE_FORMAT = '%Y-%m-%d'
+
+# Colonnes de date migrées vers ISO, par table
+ISO_DATE_COLUMNS = {
+    'employees': ('birth_date', 'hire_date', 'contract_start', 'contract_end'),
+    'leaves': ('start_date', 'end_date'),
+    'career_history': ('act_date', 'effective_date'),
+}
+
+
+def to_iso_date(value):
+    """Convertit une date saisie jj/mm/aaaa en AAAA-MM-JJ (valeur inchangée si non reconnue)."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.strip(), DISPLAY_DATE_FORMAT).strftime(ISO_DATE_FORMAT)
+    except (ValueError, AttributeError):
+        return value
+
+
+def to_display_date(value):
+    """Convertit une date AAAA-MM-JJ stockée en jj/mm/aaaa pour l'affichage."""
+    if not value:
+        return value
+    try:
+        return datetime.strptime(value, ISO_DATE_FORMAT).strftime(DISPLAY_DATE_FORMAT)
+    except (ValueError, TypeError):
+        return value
+
+
+def parse_iso_date(value):
+    try:
+        return datetime.strptime(value, ISO_DATE_FORMAT).date()
+    except (ValueError, TypeError):
+        return None
+
+
+# --- Requêtes métier partagées ---
+
+def resolve_current_statuses(db, employee_ids=None, on_date=None):
+    """
+    Calcule le statut actuel de tous les employés en une seule passe.
+
+    Retourne un dictionnaire {employee_id: statut}. Un employé ayant un congé
+    approuvé couvrant `on_date` (aujourd'hui par défaut) est "En Congé" ; un
+    statut enregistré "En Congé" dont la période est terminée redevient
+    "Active" ; sinon le statut enregistré est conservé.
+    """
+    on_date_iso = (on_date or date.today()).strftime(ISO_DATE_FORMAT)
+    ids = list(employee_ids) if employee_ids is not None else None
+    on_leave_sql = ("SELECT DISTINCT employee_id FROM leaves "
+                    "WHERE status = 'Approved' AND start_date <= ? AND end_date >= ?")
+
+    conn = db.connect()
+    try:
+        if ids is None:
+            employees = conn.execute('SELECT id, status FROM employees').fetchall()
+            on_leave = {row[0] for row in conn.execute(on_leave_sql, (on_date_iso, on_date_iso))}
+        else:
+            employees, on_leave = [], set()
+            # Découpage pour rester sous la limite de paramètres SQLite
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ','.join('?' * len(chunk))
+                employees += conn.execute(
+                    f'SELECT id, status FROM employees WHERE id IN ({marks})', chunk
+                ).fetchall()
+                on_leave.update(row[0] for row in conn.execute(
+                    on_leave_sql + f' AND employee_id IN ({marks})',
+                    [on_date_iso, on_date_iso] + chunk))
+    finally:
+        conn.close()
+
+    statuses = {}
+    for employee_id, stored_status in employees:
+        if employee_id in on_leave:
+            statuses[employee_id] = "En Congé"
+        elif stored_status == "En Congé":
+            statuses[employee_id] = "Active"
+        else:
+            statuses[employee_id] = stored_status
+    return statuses
+
+
+class MonthLeaves:
+    """
+    Congés approuvés d'un mois, pour le calendrier.
+
+    Seuls les congés chevauchant le mois sont lus (prédicat de plage servi par
+    l'index idx_leaves_status_start). Le nombre d'absents par jour est obtenu
+    par un tableau de différences : +1 au premier jour couvert, -1 au
+    lendemain du dernier, puis une somme cumulée, soit un coût proportionnel
+    au nombre de congés et de jours du mois, quelle que soit leur durée. Les
+    noms d'un jour ne sont assemblés qu'à la demande (`names`), pour les
+    infobulles.
+    """
+
+    def __init__(self, db, year, month, today=None):
+        self.year = year
+        self.month = month
+        self.days_in_month = calendar.monthrange(year, month)[1]
+        first_day = date(year, month, 1)
+        last_day = date(year, month, self.days_in_month)
+        today = today or date.today()
+
+        rows = db.fetchall('''
+            SELECT l.start_date, l.end_date, e.first_name, e.last_name
+            FROM leaves l
+            JOIN employees e ON l.employee_id = e.id
+            WHERE l.status = 'Approved' AND l.start_date <= ? AND l.end_date >= ?
+            ORDER BY l.start_date, e.last_name, e.first_name
+        ''', (last_day.strftime(ISO_DATE_FORMAT), first_day.strftime(ISO_DATE_FORMAT)))
+
+        # Intervalles (premier jour, dernier jour, nom) ramenés aux bornes du mois
+        self._intervals = []
+        counts_diff = [0] * (self.days_in_month + 2)
+        active_diff = [0] * (self.days_in_month + 2)
+        for start_str, end_str, first_name, last_name in rows:
+            start_dt, end_dt = parse_iso_date(start_str), parse_iso_date(end_str)
+            if start_dt is None or end_dt is None or end_dt < start_dt:
+                continue
+            first = max(start_dt, first_day).day
+            last = min(end_dt, last_day).day
+            self._intervals.append((first, last, f"{first_name} {last_name}"))
+            counts_diff[first] += 1
+            counts_diff[last + 1] -= 1
+            if end_dt >= today:
+                # Congé encore en cours ou à venir
+                active_diff[first] += 1
+                active_diff[last + 1] -= 1
+
+        self._counts = [0] * (self.days_in_month + 1)
+        self._active = [0] * (self.days_in_month + 1)
+        running_count = running_active = 0
+        for day in range(1, self.days_in_month + 1):
+            running_count += counts_diff[day]
+            running_active += active_diff[day]
+            self._counts[day] = running_count
+            self._active[day] = running_active
+
+    def count(self, day):
+        """Nombre d'employés en congé ce jour-là."""
+        return self._counts[day]
+
+    def has_active(self, day):
+        """Au moins un des congés de ce jour n'est pas encore terminé."""
+        return self._active[day] > 0
+
+    def names(self, day):
+        """Noms des employés en congé ce jour-là (calculés à la demande)."""
+        return [name for first, last, name in self._intervals if first <= day <= last]
+
+
+def read_dashboard_stats(db, today=None):
+    """
+    Lit les compteurs du tableau de bord (table `dashboard_stats`).
+
+    Les compteurs sont tenus à jour par des triggers ; seule la période du
+    nombre d'employés en congé (mois courant) doit basculer avec le
+    calendrier. Cette bascule est vérifiée à chaque lecture et ne coûte
+    qu'une requête indexée, une fois par mois. Retourne {nom: valeur}.
+    """
+    today = today or date.today()
+    month_start = today.replace(day=1).strftime(ISO_DATE_FORMAT)
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1]).strftime(ISO_DATE_FORMAT)
+
+    conn = db.connect()
+    try:
+        period = conn.execute(
+            "SELECT period_start, period_end FROM dashboard_stats WHERE name = 'leaves_period'"
+        ).fetchone()
+        if period != (month_start, month_end):
+            conn.execute('''
+                UPDATE dashboard_stats SET period_start = ?, period_end = ?, value = (
+                    SELECT COUNT(DISTINCT l.employee_id)
+                    FROM leaves l
+                    JOIN employees e ON e.id = l.employee_id
+                    WHERE l.status = 'Approved' AND l.start_date <= ? AND l.end_date >= ?
+                )
+                WHERE name = 'leaves_period'
+            ''', (month_start, month_end, month_end, month_start))
+            conn.commit()
+        return dict(conn.execute('SELECT name, value FROM dashboard_stats').fetchall())
+    finally:
+        conn.close()
@@ -0,0 +1,140 @@
+"""
+Saisie assistée des courriers.
+
+Le scan joint au formulaire de courrier est lu par OCR (première page, via
+le pool et le cache de hr_ocr, sans bloquer l'appelant) et les champs usuels
+d'une lettre administrative en sont extraits : date, expéditeur ou
+destinataire, objet.
+Les valeurs proposées restent à confirmer par l'agent.
+
+Ce module n'importe pas tkinter.
+"""
+import os
+import re
+from datetime import date
+
+from hr_db import DISPLAY_DATE_FORMAT
+from hr_ocr import IMAGE_EXTENSIONS, OcrJob
+
+
+# Fichiers dont le texte peut être lu
+INTAKE_EXTENSIONS = ('.pdf',) + IMAGE_EXTENSIONS
+
+MONTHS = {
+    'janvier': 1, 'fevrier': 2, 'février': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6,
+    'juillet': 7, 'aout': 8, 'août': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11,
+    'decembre': 12, 'décembre': 12,
+}
+
+_NUMERIC_DATE = re.compile(r'\b(\d{1,2})\s?[/.-]\s?(\d{1,2})\s?[/.-]\s?(\d{4})\b')
+_WRITTEN_DATE = re.compile(r'\b(\d{1,2})(?:er)?\s+(' + '|'.join(MONTHS) + r')\s+(\d{4})\b',
+                           re.IGNORECASE)
+# « Dakar, le 12 mars 2024 » : date de la lettre, préférée aux autres dates du texte
+_DATED_PLACE = re.compile(r'\ble\s+$', re.IGNORECASE)
+
+_OBJECT_LINE = re.compile(r'^\s*(?:objet|obj\.)\s*[:：.]?\s*(.*)$', re.IGNORECASE | re.MULTILINE)
+_SENDER_LINE = re.compile(r'^\s*(?:de|exp[ée]diteur|[ée]metteur)\s*:\s*(.+)$',
+                          re.IGNORECASE | re.MULTILINE)
+_RECIPIENT_LINE = re.compile(
+    r'^\s*(?:[aà]\s+|destinataire\s*:\s*)((?:monsieur|madame|mademoiselle|messieurs|m\.|mme)\b.*)$',
+    re.IGNORECASE | re.MULTILINE)
+# En-tête d'un organisme émetteur (lignes du haut de la lettre)
+_LETTERHEAD = re.compile(
+    r'^\s*(MINIST[EÈ]RE|DIRECTION|SERVICE|CABINET|AGENCE|OFFICE|SOCI[EÉ]T[EÉ]|ENTREPRISE|'
+    r'UNIVERSIT[EÉ]|[EÉ]COLE|INSTITUT|CENTRE|H[OÔ]PITAL|MAIRIE|COMMUNE|PR[EÉ]FECTURE|'
+    r'GOUVERNANCE|INSPECTION|CONSEIL|BANQUE|CAISSE)\b.*$', re.IGNORECASE)
+_LETTERHEAD_LINES = 15
+
+_MAX_FIELD_LENGTH = 200
+
+
+def _clean(value):
+    value = re.sub(r'\s+', ' ', value).strip(' .,;:-_')
+    return value[:_MAX_FIELD_LENGTH]
+
+
+def _valid_date(day, month, year):
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def extract_letter_date(text):
+    """Date de la lettre (objet date) ou None ; « le <date> » est préféré aux autres dates."""
+    candidates = []
+    for match in _NUMERIC_DATE.finditer(text):
+        found = _valid_date(match.group(1), match.group(2), match.group(3))
+        if found:
+            candidates.append((match.start(), found))
+    for match in _WRITTEN_DATE.finditer(text):
+        found = _valid_date(match.group(1), MONTHS[match.group(2).lower()], match.group(3))
+        if found:
+            candidates.append((match.start(), found))
+    if not candidates:
+        return None
+    candidates.sort()
+    for position, found in candidates:
+        if _DATED_PLACE.search(text[max(0, position - 10):position]):
+            return found
+    return candidates[0][1]
+
+
+def extract_object(text):
+    match = _OBJECT_LINE.search(text)
+    if not match:
+        return None
+    value = match.group(1)
+    if not value.strip():
+        # « Objet : » seul sur sa ligne, suivi du texte
+        following = [line for line in text[match.end():].splitlines() if line.strip()]
+        value = following[0] if following else ''
+    return _clean(value) or None
+
+
+def extract_correspondent(text, mail_type):
+    """Expéditeur (courrier d'arrivée) ou destinataire (courrier de départ)."""
+    if mail_type == 'depart':
+        match = _RECIPIENT_LINE.search(text)
+        return _clean(match.group(1)) if match else None
+
+    match = _SENDER_LINE.search(text)
+    if match:
+        return _clean(match.group(1))
+    lines = [line for line in text.splitlines() if line.strip()][:_LETTERHEAD_LINES]
+    for line in lines:
+        if _LETTERHEAD.match(line):
+            return _clean(line)
+    return None
+
+
+def extract_mail_fields(text, mail_type='arrivee'):
+    """
+    Champs du formulaire de courrier trouvés dans `text` :
+    {'date_arrivee_expedition': 'jj/mm/aaaa', 'expediteur_destinataire': ..., 'objet': ...}.
+    Les champs introuvables sont absents du dictionnaire.
+    """
+    fields = {}
+    letter_date = extract_letter_date(text)
+    if letter_date:
+        fields['date_arrivee_expedition'] = letter_date.strftime(DISPLAY_DATE_FORMAT)
+    correspondent = extract_correspondent(text, mail_type)
+    if correspondent:
+        fields['expediteur_destinataire'] = correspondent
+    subject = extract_object(text)
+    if subject:
+        fields['objet'] = subject
+    return fields
+
+
+def start_mail_intake(executor, file_path, max_pages=1, **job_options):
+    """
+    Lance sans bloquer la lecture OCR des `max_pages` premières pages :
+    retourne l'`OcrJob` démarré par `start_async()`, ou None si le fichier
+    n'a pas de texte lisible. L'appelant (l'interface) interroge `poll()`
+    jusqu'à `finished` puis passe le texte à `extract_mail_fields`.
+    """
+    if os.path.splitext(file_path)[1].lower() not in INTAKE_EXTENSIONS:
+        return None
+    return OcrJob(executor, file_path, max_pages=max_pages, **job_options).start_async()
+
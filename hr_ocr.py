@@ -0,0 +1,841 @@
+"""
+Traitement OCR de YoonuRH.
+
+L'OCR tourne dans un pool de processus : les pages d'un PDF sont réparties
+en petits lots, rendus puis reconnus dans un processus de travail, ce qui
+répartit un long document sur tous les cœurs sans bloquer l'interface.
+Chaque lot est rendu sur disque (`render_pdf_pages`) au moment de sa
+reconnaissance : le document n'est jamais entièrement en mémoire.
+Chaque processus garde son moteur OCR (`get_engine`) : tesserocr s'il est
+installé, sinon une exécution de Tesseract par lot de pages. Les pages d'un PDF qui contiennent déjà du texte (PDF produit par
+un traitement de texte) sont lues directement avec pdftotext, sans OCR.
+`OcrJob` suit un traitement (progression, annulation) et restitue les
+pages dans l'ordre, au fur et à mesure qu'elles sont prêtes. Les textes
+obtenus sont conservés par page dans `OcrCache`. `AttachmentIndexer` applique
+le même traitement, en arrière-plan, à toutes les pièces jointes enregistrées.
+
+Ce module n'importe pas tkinter : les fonctions exécutées dans les processus
+de travail doivent rester importables rapidement et sérialisables.
+"""
+import collections
+import functools
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from hr_preprocess import preprocess_file
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+DEFAULT_LANG = 'fra'
+# Résolution de rendu des pages PDF (celle de pdf2image par défaut)
+DEFAULT_DPI = 200
+# Taille maximale d'un lot OCR (pages rendues et reconnues ensemble)
+DEFAULT_WINDOW = 4
+# Nombre minimal de caractères alphanumériques pour considérer qu'une page a une couche texte
+MIN_TEXT_LAYER_CHARS = 20
+
+# Origine du texte d'une page (voir OcrJob.page_sources)
+SOURCE_TEXT_LAYER = 'text'
+SOURCE_OCR = 'ocr'
+SOURCE_CACHE = 'cache'
+
+
+def default_worker_count():
+    """Un processus par cœur, en laissant un cœur à l'interface."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def default_indexer_worker_count():
+    """Pool de l'indexation en arrière-plan : la moitié des processus OCR."""
+    return max(1, default_worker_count() // 2)
+
+
+def create_ocr_executor(max_workers=None, tesseract_cmd=None, lang=DEFAULT_LANG):
+    """
+    Pool de processus OCR. Chaque processus prépare son moteur dès son
+    démarrage (`get_engine`) et le garde pour toutes les pages qu'il traite.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers or default_worker_count(),
+                               initializer=get_engine, initargs=(tesseract_cmd, lang))
+
+
+def pdf_page_count(file_path, poppler_path=None):
+    return int(pdfinfo_from_path(file_path, poppler_path=poppler_path)['Pages'])
+
+
+def render_pdf_pages(file_path, output_folder, dpi=DEFAULT_DPI, grayscale=True, first_page=1,
+                     last_page=None, poppler_path=None, fmt='ppm'):
+    """Rend les pages first_page..last_page dans `output_folder` : chemins des images, dans l'ordre."""
+    # Avec output_folder, pdf2image écrit les pages sur disque et ne renvoie que
+    # des chemins (noms numérotés, l'ordre alphabétique est celui des pages).
+    return sorted(convert_from_path(file_path, dpi=dpi, grayscale=grayscale,
+                                    first_page=first_page, last_page=last_page,
+                                    output_folder=output_folder, paths_only=True,
+                                    poppler_path=poppler_path, fmt=fmt))
+
+
+def _run_quietly(command, **kwargs):
+    # Pas de fenêtre console sous Windows
+    return subprocess.run(command, capture_output=True,
+                          creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0,
+                          **kwargs)
+
+
+def pdf_text_pages(file_path, first_page, last_page, poppler_path=None):
+    """
+    Texte intégré des pages first_page..last_page d'un PDF, lu par pdftotext
+    (poppler) en une seule exécution : {page: texte}.
+
+    Retourne {} si pdftotext est indisponible : les pages passent alors par
+    l'OCR.
+    """
+    command = os.path.join(poppler_path, 'pdftotext') if poppler_path else 'pdftotext'
+    try:
+        result = _run_quietly([command, '-f', str(first_page), '-l', str(last_page), '-layout',
+                               '-enc', 'UTF-8', file_path, '-'], timeout=120)
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    if result.returncode != 0:
+        return {}
+    # pdftotext termine chaque page par un saut de page
+    pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+    return {first_page + offset: text
+            for offset, text in enumerate(pages[:last_page - first_page + 1])}
+
+
+def has_text_layer(text):
+    return sum(c.isalnum() for c in text) >= MIN_TEXT_LAYER_CHARS
+
+
+# --- Moteurs OCR ---
+
+class TesseractEngine:
+    """
+    Tesseract en ligne de commande, une exécution par lot d'images.
+
+    Tesseract accepte en entrée un fichier listant les images : le modèle de
+    langue n'est chargé qu'une fois pour tout le lot, et les pages rendues
+    par pdftoppm sont lues telles quelles, sans réencodage. Chaque page se
+    termine par un saut de page dans la sortie.
+    """
+
+    name = 'tesseract'
+
+    def __init__(self, tesseract_cmd=None, lang=DEFAULT_LANG):
+        self.command = tesseract_cmd or pytesseract.pytesseract.tesseract_cmd
+        self.lang = lang
+
+    @classmethod
+    def version(cls, tesseract_cmd=None):
+        command = tesseract_cmd or pytesseract.pytesseract.tesseract_cmd
+        try:
+            result = _run_quietly([command, '--version'], timeout=30)
+        except (OSError, subprocess.SubprocessError):
+            return '?'
+        output = (result.stdout or result.stderr).decode('utf-8', errors='replace').split()
+        return output[1] if len(output) > 1 else '?'
+
+    def _run(self, paths, output_base, *configs):
+        with tempfile.TemporaryDirectory(prefix='yoonurh_tess_') as folder:
+            if len(paths) == 1:
+                source = paths[0]
+            else:
+                source = os.path.join(folder, 'pages.txt')
+                with open(source, 'w', encoding='utf-8') as f:
+                    f.write('\n'.join(paths) + '\n')
+            # Un seul thread par processus : le parallélisme vient du pool
+            env = dict(os.environ, OMP_THREAD_LIMIT='1')
+            result = _run_quietly([self.command, source, output_base, '-l', self.lang, *configs],
+                                  env=env)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode('utf-8', errors='replace').strip()
+                               or f"Tesseract a échoué (code {result.returncode})")
+        return result
+
+    def recognize_files(self, paths):
+        """Texte de chaque image de `paths`, dans le même ordre."""
+        if not paths:
+            return []
+        result = self._run(paths, 'stdout')
+        pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+        if len(pages) < len(paths):
+            raise RuntimeError("Tesseract n'a pas renvoyé toutes les pages")
+        return pages[:len(paths)]
+
+    def write_pdf(self, paths, output_base):
+        """
+        PDF interrogeable `output_base`.pdf : une page par image de `paths`,
+        avec le texte reconnu en couche invisible sous l'image.
+        """
+        self._run(paths, output_base, 'pdf')
+        return output_base + '.pdf'
+
+
+class TesserocrEngine:
+    """
+    API de Tesseract chargée dans le processus (module tesserocr, optionnel).
+
+    Le modèle de langue reste en mémoire d'une page à l'autre : aucun
+    processus n'est lancé par image.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, tesseract_cmd=None, lang=DEFAULT_LANG):
+        kwargs = {'lang': lang}
+        if tesseract_cmd:
+            # Données de langue installées avec tesseract.exe
+            tessdata = os.path.join(os.path.dirname(tesseract_cmd), 'tessdata')
+            if os.path.isdir(tessdata):
+                kwargs['path'] = tessdata
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+
+    @classmethod
+    def version(cls, tesseract_cmd=None):
+        return tesserocr.tesseract_version().split()[1]
+
+    def recognize_files(self, paths):
+        texts = []
+        for path in paths:
+            self.api.SetImageFile(path)
+            texts.append(self.api.GetUTF8Text())
+        return texts
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine(tesseract_cmd=None, lang=DEFAULT_LANG):
+    """
+    Moteur OCR du processus courant, créé une fois puis réutilisé.
+
+    tesserocr est utilisé s'il est installé, sinon Tesseract en ligne de
+    commande par lots.
+    """
+    return _engine_class()(tesseract_cmd, lang)
+
+
+def _engine_class():
+    return TesserocrEngine if tesserocr is not None else TesseractEngine
+
+
+# --- Tâches exécutées dans les processus de travail ---
+
+def _recognize(paths, tesseract_cmd, lang, preprocess, output_folder, source_dpi=None):
+    """
+    Prétraite (si demandé) puis reconnaît un lot d'images.
+
+    Retourne (textes, statistiques par image) ; les statistiques donnent les
+    durées du prétraitement et de l'OCR, et la taille des images avant/après.
+    """
+    stats = [{} for _ in paths]
+    if preprocess is not None:
+        prepared = []
+        for path, page_stats in zip(paths, stats):
+            path, page_stats_update = preprocess_file(path, output_folder, preprocess, source_dpi)
+            prepared.append(path)
+            page_stats.update(page_stats_update)
+        paths = prepared
+
+    started = time.perf_counter()
+    texts = get_engine(tesseract_cmd, lang).recognize_files(paths)
+    # Le lot est reconnu en une fois : la durée est répartie entre ses images
+    ocr_time = (time.perf_counter() - started) / max(1, len(paths))
+    for page_stats in stats:
+        page_stats['ocr'] = ocr_time
+    return texts, stats
+
+
+def read_image_file(file_path, tesseract_cmd=None, lang=DEFAULT_LANG, preprocess=None):
+    """OCR d'un fichier image : [(1, texte, origine, statistiques)]."""
+    with tempfile.TemporaryDirectory(prefix='yoonurh_ocr_') as output_folder:
+        (text,), (stats,) = _recognize([file_path], tesseract_cmd, lang, preprocess, output_folder)
+    return [(1, text, SOURCE_OCR, stats)]
+
+
+def read_pdf_pages(file_path, first_page, last_page, poppler_path=None, tesseract_cmd=None,
+                   lang=DEFAULT_LANG, dpi=DEFAULT_DPI, grayscale=True, preprocess=None):
+    """
+    Texte des pages first_page..last_page d'un PDF :
+    [(page, texte, origine, statistiques)].
+
+    La couche texte est lue d'abord ; seules les pages qui n'en ont pas
+    (pages scannées) sont rendues, prétraitées si `preprocess` est fourni,
+    puis reconnues en un seul lot.
+    """
+    results = {page: (text, SOURCE_TEXT_LAYER, {})
+               for page, text in pdf_text_pages(file_path, first_page, last_page,
+                                                poppler_path).items()
+               if has_text_layer(text)}
+    to_ocr = [page for page in range(first_page, last_page + 1) if page not in results]
+    if to_ocr:
+        with tempfile.TemporaryDirectory(prefix='yoonurh_ocr_') as output_folder:
+            paths = render_pdf_pages(file_path, output_folder, dpi, grayscale,
+                                     to_ocr[0], to_ocr[-1], poppler_path)
+            pages = dict(zip(range(to_ocr[0], to_ocr[-1] + 1), paths))
+            texts, stats = _recognize([pages[page] for page in to_ocr], tesseract_cmd, lang,
+                                      preprocess, output_folder, source_dpi=dpi)
+        for page, text, page_stats in zip(to_ocr, texts, stats):
+            results[page] = (text, SOURCE_OCR, page_stats)
+    return [(page,) + results[page] for page in range(first_page, last_page + 1)]
+
+
+# --- PDF interrogeables ---
+
+def searchable_pdf_path(file_path):
+    """Chemin de la version interrogeable d'une pièce jointe (« scan.jpg » → « scan_ocr.pdf »)."""
+    return os.path.splitext(file_path)[0] + '_ocr.pdf'
+
+
+def searchable_copy(file_path):
+    """
+    Version interrogeable de `file_path` si elle existe et est à jour, sinon
+    None : sa couche texte se lit sans OCR.
+    """
+    path = searchable_pdf_path(file_path)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(file_path):
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def write_searchable_pdf(file_path, poppler_path=None, tesseract_cmd=None, lang=DEFAULT_LANG,
+                         dpi=DEFAULT_DPI):
+    """
+    Écrit à côté de `file_path` (scan PDF ou image) sa version interrogeable :
+    l'image de chaque page avec le texte reconnu en couche invisible
+    (`searchable_pdf_path`). Retourne le chemin du PDF créé.
+
+    Le fichier est d'abord écrit sous un nom temporaire dans le même dossier
+    puis renommé : une copie interrompue n'est jamais prise pour valide.
+    """
+    output_path = searchable_pdf_path(file_path)
+    output_base = os.path.splitext(output_path)[0] + '.partiel'
+    with tempfile.TemporaryDirectory(prefix='yoonurh_ocr_') as output_folder:
+        if os.path.splitext(file_path)[1].lower() == '.pdf':
+            # Rendu en couleur et en JPEG, repris tel quel dans le PDF produit
+            paths = render_pdf_pages(file_path, output_folder, dpi, grayscale=False,
+                                     poppler_path=poppler_path, fmt='jpeg')
+        else:
+            paths = [file_path]
+        partial_path = TesseractEngine(tesseract_cmd, lang).write_pdf(paths, output_base)
+    os.replace(partial_path, output_path)
+    return output_path
+
+
+# --- Cache des résultats ---
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version(tesseract_cmd=None):
+    """Version du moteur, incluse dans la clé du cache (un nouveau Tesseract invalide le cache)."""
+    engine_class = _engine_class()
+    try:
+        return f'{engine_class.name} {engine_class.version(tesseract_cmd)}'
+    except Exception:
+        return f'{engine_class.name} ?'
+
+
+class OcrCache:
+    """
+    Cache persistant des textes OCR (table `ocr_cache`).
+
+    Clé : empreinte SHA-256 du fichier, langue, DPI de rendu (0 pour une
+    image), version du moteur et numéro de page. Chaque lecture met à jour la
+    date de dernier accès ; au-delà de `max_bytes` de texte, les pages les
+    moins récemment utilisées sont supprimées. La taille totale est lue une
+    fois puis tenue à jour à chaque ajout : la table n'est reparcourue que
+    lorsque la limite semble dépassée.
+    """
+
+    def __init__(self, db, max_bytes=50 * 1024 * 1024):
+        self.db = db
+        self.max_bytes = max_bytes
+        self._total = None
+        self._lock = threading.Lock()
+
+    def get_pages(self, key):
+        """Pages déjà connues pour `key` = (empreinte, langue, dpi, moteur) : {page: texte}."""
+        conn = self.db.connect()
+        try:
+            rows = conn.execute('''
+                SELECT page, text FROM ocr_cache
+                WHERE file_hash = ? AND lang = ? AND dpi = ? AND engine = ?
+            ''', key).fetchall()
+            if rows:
+                conn.execute('''
+                    UPDATE ocr_cache SET last_used = CURRENT_TIMESTAMP
+                    WHERE file_hash = ? AND lang = ? AND dpi = ? AND engine = ?
+                ''', key)
+                conn.commit()
+            return dict(rows)
+        finally:
+            conn.close()
+
+    def put(self, key, page, text):
+        self.put_pages(key, {page: text})
+
+    def put_pages(self, key, pages):
+        """Enregistre les pages {page: texte} de `key` en une seule transaction."""
+        if not pages:
+            return
+        rows = [tuple(key) + (page, text, len(text.encode('utf-8')))
+                for page, text in pages.items()]
+        conn = self.db.connect()
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO ocr_cache (file_hash, lang, dpi, engine, page, text, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            with self._lock:
+                if self._total is None:
+                    self._total = conn.execute(
+                        'SELECT COALESCE(SUM(size), 0) FROM ocr_cache').fetchone()[0]
+                else:
+                    # Surestimé si une page est remplacée : corrigé par _evict
+                    self._total += sum(row[-1] for row in rows)
+                if self._total > self.max_bytes:
+                    self._total = self._evict(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        """Supprime les pages les moins récemment utilisées ; retourne la nouvelle taille totale."""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM ocr_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return total
+        # On libère un peu plus que le strict nécessaire pour ne pas évincer à chaque ajout
+        to_free = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for file_hash, lang, dpi, engine, page, size in conn.execute('''
+                SELECT file_hash, lang, dpi, engine, page, size
+                FROM ocr_cache ORDER BY last_used'''):
+            victims.append((file_hash, lang, dpi, engine, page))
+            freed += size
+            if freed >= to_free:
+                break
+        conn.executemany('''
+            DELETE FROM ocr_cache
+            WHERE file_hash = ? AND lang = ? AND dpi = ? AND engine = ? AND page = ?
+        ''', victims)
+        return total - freed
+
+
+# --- Suivi d'un traitement ---
+
+def _batches(pages, size):
+    """Découpe une liste croissante de pages en lots de pages consécutives."""
+    batch = []
+    for page in pages:
+        if batch and (len(batch) == size or page != batch[-1] + 1):
+            yield batch
+            batch = []
+        batch.append(page)
+    if batch:
+        yield batch
+
+
+class OcrJob:
+    """
+    Traitement OCR d'un fichier (image ou PDF) réparti sur un pool de processus.
+
+    Le thread appelant (l'interface) interroge `poll()` périodiquement : elle
+    renvoie les pages nouvellement disponibles, dans l'ordre des pages, sous
+    forme de tuples (numéro de page, texte). `cancel()` annule les pages qui
+    n'ont pas encore commencé ; les résultats des pages en cours sont ignorés.
+    Les pages d'un PDF partent au pool par lots de pages consécutives
+    (`batch_size`, calculé par défaut pour occuper tous les processus), que
+    le moteur traite en une fois.
+    Avec un `OcrCache`, les pages déjà reconnues sont servies immédiatement
+    et seules les autres partent au pool ; les pages reconnues y sont
+    enregistrées ensemble, en fin de traitement (ou à l'annulation).
+    `page_sources` indique pour chaque
+    page restituée d'où vient son texte (couche texte, OCR ou cache).
+    `preprocess` (hr_preprocess.PreprocessOptions) active le prétraitement
+    des images ; `timings` cumule les durées et tailles d'images des pages
+    reconnues, pour comparer les traitements avec et sans prétraitement.
+    `max_pages` limite le traitement aux premières pages du document.
+    `start()` est bloquant (comptage des pages par poppler, empreinte du
+    fichier, lecture du cache) ; l'interface utilise `start_async()` et
+    attend `started` avant de lire `page_count`.
+    """
+
+    def __init__(self, executor, file_path, poppler_path=None, tesseract_cmd=None,
+                 lang=DEFAULT_LANG, dpi=DEFAULT_DPI, grayscale=True, cache=None,
+                 batch_size=None, preprocess=None, max_pages=None):
+        self.executor = executor
+        self.file_path = file_path
+        self.poppler_path = poppler_path
+        self.tesseract_cmd = tesseract_cmd
+        self.lang = lang
+        self.dpi = dpi
+        self.grayscale = grayscale
+        self.is_pdf = os.path.splitext(file_path)[1].lower() == '.pdf'
+        self.cache = cache
+        self.batch_size = batch_size
+        self.preprocess = preprocess
+        self.max_pages = max_pages
+        self.cache_key = None
+        self.page_count = 0
+        self.cached_pages = 0
+        self.cancelled = False
+        self.page_sources = {}
+        self.timings = collections.Counter()
+        self._futures = {}
+        self._results = {}
+        self._cached = {}
+        self._to_cache = {}
+        self._next_page = 1
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+        self._start_error = None
+
+    @property
+    def started(self):
+        """Vrai quand les pages sont parties au pool (ou que le démarrage a échoué)."""
+        return self._started.is_set()
+
+    def start_async(self):
+        """
+        Lance `start()` dans un thread et retourne aussitôt. Une erreur de
+        démarrage est levée par le prochain `poll()`.
+        """
+        def run():
+            try:
+                self.start()
+            except Exception as e:
+                self._start_error = e
+                self._started.set()
+
+        threading.Thread(target=run, name='ocr-start', daemon=True).start()
+        return self
+
+    def start(self):
+        page_count = pdf_page_count(self.file_path, self.poppler_path) if self.is_pdf else 1
+        if self.max_pages:
+            page_count = min(page_count, self.max_pages)
+        self.page_count = page_count
+
+        if self.cache is not None:
+            engine = engine_version(self.tesseract_cmd)
+            if self.preprocess is not None:
+                engine += ' ' + self.preprocess.signature()
+            self.cache_key = (file_sha256(self.file_path), self.lang,
+                              self.dpi if self.is_pdf else 0, engine)
+            self._cached = {page: text for page, text in self.cache.get_pages(self.cache_key).items()
+                            if page <= self.page_count}
+            self.cached_pages = len(self._cached)
+
+        pending = [page for page in range(1, self.page_count + 1) if page not in self._cached]
+        with self._lock:
+            # Annulé pendant la préparation : rien n'est envoyé au pool
+            if not self.cancelled:
+                self._submit(pending)
+        self._started.set()
+        return self
+
+    def _submit(self, pending):
+        if not self.is_pdf:
+            if pending:
+                self._futures[1] = self.executor.submit(
+                    read_image_file, self.file_path, self.tesseract_cmd, self.lang,
+                    self.preprocess)
+            return
+
+        batch_size = self.batch_size or max(
+            1, min(DEFAULT_WINDOW, -(-len(pending) // default_worker_count())))
+        for batch in _batches(pending, batch_size):
+            future = self.executor.submit(
+                read_pdf_pages, self.file_path, batch[0], batch[-1],
+                self.poppler_path, self.tesseract_cmd, self.lang,
+                self.dpi, self.grayscale, self.preprocess)
+            for page_number in batch:
+                self._futures[page_number] = future
+
+    @property
+    def completed(self):
+        """Nombre de pages terminées (dans n'importe quel ordre)."""
+        if not self.started:
+            return 0
+        running = [future for future in self._futures.values() if not future.done()]
+        return self.page_count - len(running)
+
+    @property
+    def finished(self):
+        return self.cancelled or (self.started and self._next_page > self.page_count)
+
+    def poll(self):
+        """
+        Pages prêtes depuis le dernier appel, dans l'ordre des pages.
+
+        Une erreur sur une page (fichier corrompu, Tesseract absent...) est
+        propagée à l'appelant. Rien n'est prêt avant la fin du démarrage.
+        """
+        if not self.started:
+            return []
+        if self._start_error is not None:
+            raise self._start_error
+        ready = []
+        while not self.cancelled and self._next_page <= self.page_count:
+            page_number = self._next_page
+            if page_number in self._cached:
+                text, source = self._cached.pop(page_number), SOURCE_CACHE
+            else:
+                if page_number not in self._results:
+                    future = self._futures[page_number]
+                    if not future.done():
+                        break
+                    for page, text, source, stats in future.result():
+                        self._results[page] = (text, source)
+                        self.timings.update(stats)
+                        del self._futures[page]
+                text, source = self._results.pop(page_number)
+                # La couche texte se relit plus vite qu'une requête au cache
+                if self.cache is not None and source == SOURCE_OCR:
+                    self._to_cache[page_number] = text
+            self.page_sources[page_number] = source
+            ready.append((page_number, text))
+            self._next_page += 1
+        if self.finished:
+            self._flush_cache()
+        return ready
+
+    def _flush_cache(self):
+        """Enregistre dans le cache, en une transaction, les pages reconnues par ce traitement."""
+        pages, self._to_cache = self._to_cache, {}
+        if pages:
+            self.cache.put_pages(self.cache_key, pages)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            for future in set(self._futures.values()):
+                future.cancel()
+            self._futures.clear()
+            self._results.clear()
+        # Les pages déjà reconnues restent utiles au prochain traitement
+        self._flush_cache()
+
+    def source_counts(self):
+        """Nombre de pages restituées par origine : {origine: nombre}."""
+        return collections.Counter(self.page_sources.values())
+
+
+# --- Indexation des pièces jointes ---
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+# Tables dont la colonne file_path est indexée (texte stocké dans leur colonne ocr_text)
+ATTACHMENT_SOURCES = ('courriers', 'documents')
+
+# Pièce jointe en erreur : nouvel essai après ce délai, tant que le même
+# fichier n'a pas échoué MAX_ERROR_ATTEMPTS fois
+ERROR_RETRY_MINUTES = 30
+MAX_ERROR_ATTEMPTS = 3
+
+
+def file_signature(file_path):
+    """(taille, date de modification) du fichier ; None s'il est introuvable."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+def pending_attachments(db):
+    """
+    Pièces jointes à (ré)indexer : liste de (table, id, chemin).
+
+    Y figurent les pièces jamais indexées ou dont le chemin a changé, celles
+    dont le fichier a été remplacé sur place (taille ou date de modification
+    différente de celles enregistrées) ou est réapparu, et celles en erreur
+    une fois passé ERROR_RETRY_MINUTES, au plus MAX_ERROR_ATTEMPTS fois.
+    """
+    pending = []
+    for table in ATTACHMENT_SOURCES:
+        rows = db.fetchall(f'''
+            SELECT t.id, t.file_path, a.file_path, a.status, a.file_size, a.file_mtime,
+                   a.attempts, a.indexed_at <= datetime('now', ?)
+            FROM {table} t
+            LEFT JOIN attachment_ocr a ON a.source = ? AND a.source_id = t.id
+            WHERE t.file_path IS NOT NULL AND t.file_path != ''
+            ORDER BY t.id
+        ''', (f'-{ERROR_RETRY_MINUTES} minutes', table))
+        for row_id, file_path, indexed_path, status, size, mtime, attempts, retry_due in rows:
+            indexed_signature = None if size is None else (size, mtime)
+            if indexed_path != file_path or file_signature(file_path) != indexed_signature:
+                pending.append((table, row_id, file_path))
+            elif status == 'error' and retry_due and attempts < MAX_ERROR_ATTEMPTS:
+                pending.append((table, row_id, file_path))
+    return pending
+
+
+class AttachmentIndexer:
+    """
+    Indexation OCR en arrière-plan des pièces jointes des courriers et documents.
+
+    Un thread parcourt les pièces jointes en attente et garde jusqu'à
+    `max_jobs` fichiers en cours sur un pool de processus. Sans `executor`,
+    l'indexeur crée son propre petit pool (`max_workers`, voir
+    `default_indexer_worker_count`) le temps du parcours : les OCR demandés
+    par l'utilisateur, sur le pool de l'interface, ne passent pas derrière
+    tout un dossier de pièces jointes. Le texte de chaque
+    fichier est enregistré dès qu'il est terminé (colonne ocr_text, reprise
+    par les index plein texte) avec son état dans `attachment_ocr` : après un
+    arrêt, le traitement reprend là où il s'était arrêté. La taille et la
+    date du fichier y sont notées au départ de l'OCR, pour reprendre un
+    fichier remplacé depuis (voir `pending_attachments`).
+    Les compteurs `done`, `total` et `errors` peuvent être lus par l'interface.
+    """
+
+    def __init__(self, db, executor=None, poppler_path=None, tesseract_cmd=None, cache=None,
+                 dpi=DEFAULT_DPI, max_jobs=None, preprocess=None, max_workers=None):
+        self.db = db
+        self.executor = executor
+        self.poppler_path = poppler_path
+        self.tesseract_cmd = tesseract_cmd
+        self.cache = cache
+        self.dpi = dpi
+        self.preprocess = preprocess
+        self.max_workers = max_workers or default_indexer_worker_count()
+        self.max_jobs = max_jobs or (default_worker_count() if executor is not None
+                                     else self.max_workers)
+        self._own_executor = executor is None
+        self.done = 0
+        self.total = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.done = self.total = self.errors = 0
+        self._thread = threading.Thread(target=self._run, name='ocr-indexer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Demande l'arrêt ; les fichiers en cours sont abandonnés et seront repris."""
+        self._stop.set()
+
+    def join(self, timeout=None):
+        """Attend la fin du thread d'indexation ; retourne False s'il tourne encore."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    def _run(self):
+        if self._own_executor:
+            self.executor = create_ocr_executor(self.max_workers, self.tesseract_cmd)
+        try:
+            self._index_pending()
+        finally:
+            if self._own_executor:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+    def _index_pending(self):
+        queue = collections.deque(pending_attachments(self.db))
+        self.total = len(queue)
+        active = []
+
+        while (queue or active) and not self._stop.is_set():
+            while queue and len(active) < self.max_jobs:
+                source, row_id, file_path = queue.popleft()
+                # Relevé avant l'OCR : une modification pendant le traitement sera reprise
+                signature = file_signature(file_path)
+                job = self._start_job(source, row_id, file_path, signature)
+                if job is not None:
+                    active.append((source, row_id, file_path, signature, job, []))
+
+            for entry in list(active):
+                source, row_id, file_path, signature, job, texts = entry
+                try:
+                    texts.extend(text for _, text in job.poll())
+                except Exception as e:
+                    active.remove(entry)
+                    self._record(source, row_id, file_path, signature, 'error', error=str(e))
+                    continue
+                if job.finished:
+                    active.remove(entry)
+                    self._record(source, row_id, file_path, signature, 'done',
+                                 text='\n\n'.join(texts))
+
+            if active:
+                self._stop.wait(0.1)
+
+        for *_, job, _ in active:
+            job.cancel()
+
+    def _start_job(self, source, row_id, file_path, signature):
+        extension = os.path.splitext(file_path)[1].lower()
+        if signature is None:
+            self._record(source, row_id, file_path, signature, 'missing')
+            return None
+        if extension != '.pdf' and extension not in IMAGE_EXTENSIONS:
+            self._record(source, row_id, file_path, signature, 'skipped')
+            return None
+        try:
+            # Une version interrogeable existante évite l'OCR
+            return OcrJob(self.executor, searchable_copy(file_path) or file_path,
+                          poppler_path=self.poppler_path,
+                          tesseract_cmd=self.tesseract_cmd, dpi=self.dpi,
+                          cache=self.cache, preprocess=self.preprocess).start()
+        except Exception as e:
+            self._record(source, row_id, file_path, signature, 'error', error=str(e))
+            return None
+
+    def _record(self, source, row_id, file_path, signature, status, text=None, error=None):
+        size, mtime = signature or (None, None)
+        conn = self.db.connect()
+        try:
+            if status == 'done':
+                conn.execute(f'UPDATE {source} SET ocr_text = ? WHERE id = ?', (text, row_id))
+            attempts = 0
+            if status == 'error':
+                # Échecs successifs du même fichier (remis à zéro s'il a changé)
+                previous = conn.execute('''
+                    SELECT attempts FROM attachment_ocr
+                    WHERE source = ? AND source_id = ? AND status = 'error'
+                      AND file_path = ? AND file_size IS ? AND file_mtime IS ?
+                ''', (source, row_id, file_path, size, mtime)).fetchone()
+                attempts = (previous[0] if previous else 0) + 1
+            conn.execute('''
+                INSERT OR REPLACE INTO attachment_ocr
+                    (source, source_id, file_path, status, error, file_size, file_mtime, attempts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (source, row_id, file_path, status, error, size, mtime, attempts))
+            conn.commit()
+        finally:
+            conn.close()
+        self.done += 1
+        if status == 'error':
+            self.errors += 1
@@ -0,0 +1,189 @@
+"""
+Prétraitement des images avant l'OCR.
+
+Étapes, chacune activable séparément (`PreprocessOptions`) :
+- réduction à la résolution cible : une photo de 12 Mpx n'apporte rien de
+  plus à Tesseract qu'une page à 300 DPI et le ralentit nettement ;
+- conversion en niveaux de gris ;
+- redressement : angle qui rend le profil horizontal des lignes le plus
+  contrasté, cherché sur une miniature ;
+- binarisation adaptative : seuil local (méthode de Bradley) calculé avec
+  une image intégrale, robuste aux ombres et aux fonds inégaux des photos.
+
+Les calculs sont vectorisés avec NumPy. Ce module n'importe pas tkinter : il
+est utilisé dans les processus de travail de hr_ocr.
+"""
+import collections
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+
+# Grand côté d'une page A4, pour estimer la résolution d'une photo sans métadonnées
+A4_LONG_SIDE_INCHES = 11.69
+# Recherche de l'inclinaison : angles testés (degrés) et taille de la miniature
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.25
+DESKEW_THUMBNAIL = 1000
+# Binarisation : un pixel est noir s'il est plus sombre que la moyenne locale de plus de 15 %
+BINARIZE_SENSITIVITY = 0.15
+# Lignes traitées ensemble lors de la binarisation (borne la mémoire utilisée)
+BINARIZE_STRIP_ROWS = 512
+
+
+class PreprocessOptions(collections.namedtuple(
+        'PreprocessOptions', 'target_dpi grayscale binarize deskew',
+        defaults=(300, True, True, True))):
+    """Réglages du prétraitement ; target_dpi=None désactive la réduction."""
+
+    __slots__ = ()
+
+    def signature(self):
+        """Description courte, incluse dans la clé du cache OCR."""
+        steps = [f'{self.target_dpi}dpi' if self.target_dpi else 'taille']
+        steps += [name for name, enabled in (('gris', self.grayscale), ('bin', self.binarize),
+                                             ('redr', self.deskew)) if enabled]
+        return 'pre:' + ','.join(steps)
+
+
+def estimated_dpi(image):
+    """Résolution d'une image : celle des métadonnées, ou estimée en supposant une page A4."""
+    dpi = image.info.get('dpi')
+    # 72 DPI est la valeur par défaut des appareils photo, sans rapport avec le document
+    if dpi and dpi[0] > 72:
+        return float(dpi[0])
+    return max(image.size) / A4_LONG_SIDE_INCHES
+
+
+def downscale(image, target_dpi, source_dpi=None):
+    """Réduit l'image à `target_dpi` si elle est plus résolue ; ne l'agrandit jamais."""
+    scale = target_dpi / (source_dpi or estimated_dpi(image))
+    if scale >= 0.9:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+
+def _otsu_threshold(pixels):
+    """
+    Seuil d'Otsu des niveaux de gris ; None si l'image n'a qu'un niveau de
+    gris (page blanche, intercalaire uni) : il n'y a alors rien à séparer.
+    """
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    weights = histogram.cumsum()
+    means = (histogram * np.arange(256)).cumsum()
+    total, total_mean = weights[-1], means[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_mean * weights - total * means) ** 2 / (weights * (total - weights))
+    between[~np.isfinite(between)] = np.nan
+    if np.isnan(between).all():
+        return None
+    return int(np.nanargmax(between))
+
+
+def estimate_skew(gray, max_angle=DESKEW_MAX_ANGLE, step=DESKEW_STEP):
+    """
+    Inclinaison du texte en degrés, à passer à `Image.rotate` pour redresser.
+
+    Les pixels d'encre de la miniature sont projetés sur l'axe vertical pour
+    chaque angle candidat : les lignes de texte ne forment des pics nets
+    (somme des carrés des écarts entre lignes voisines maximale) que
+    lorsqu'elles sont horizontales.
+    """
+    thumbnail = gray.copy()
+    thumbnail.thumbnail((DESKEW_THUMBNAIL, DESKEW_THUMBNAIL))
+    pixels = np.asarray(thumbnail)
+    threshold = _otsu_threshold(pixels)
+    if threshold is None:
+        return 0.0
+    ys, xs = np.nonzero(pixels < threshold)
+    if len(ys) < 100:
+        return 0.0
+
+    ys = ys.astype(np.float64)
+    xs = xs - xs.mean()
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        # Ligne de chaque pixel d'encre une fois l'image tournée de `angle`
+        rows = ys - xs * np.tan(np.radians(angle))
+        profile = np.bincount((rows - rows.min()).astype(np.int64))
+        score = float(np.square(np.diff(profile.astype(np.float64))).sum())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def binarize(gray, window=None, sensitivity=BINARIZE_SENSITIVITY):
+    """
+    Binarisation adaptative : chaque pixel est comparé à la moyenne de son
+    voisinage (`window` pixels de côté), obtenue en temps constant grâce à
+    l'image intégrale.
+    """
+    pixels = np.asarray(gray)
+    height, width = pixels.shape
+    if window is None:
+        window = max(15, min(height, width) // 50)
+    radius = window // 2
+
+    integral = np.zeros((height + 1, width + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(pixels, axis=0, dtype=np.int64), axis=1, out=integral[1:, 1:])
+
+    x0 = np.clip(np.arange(width) - radius, 0, width)
+    x1 = np.clip(np.arange(width) + radius + 1, 0, width)
+    result = np.empty_like(pixels)
+    for top in range(0, height, BINARIZE_STRIP_ROWS):
+        rows = np.arange(top, min(top + BINARIZE_STRIP_ROWS, height))
+        y0 = np.clip(rows - radius, 0, height)[:, None]
+        y1 = np.clip(rows + radius + 1, 0, height)[:, None]
+        sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+        counts = (y1 - y0) * (x1 - x0)
+        dark = pixels[rows].astype(np.int64) * counts * 100 <= sums * round(100 * (1 - sensitivity))
+        result[rows] = np.where(dark, 0, 255)
+    return Image.fromarray(result)
+
+
+def preprocess_image(image, options, source_dpi=None):
+    """Applique les étapes activées de `options` ; retourne une nouvelle image."""
+    if options.target_dpi:
+        image = downscale(image, options.target_dpi, source_dpi)
+    if options.grayscale or options.binarize or options.deskew:
+        image = image.convert('L')
+    if options.deskew:
+        angle = estimate_skew(image)
+        if abs(angle) >= DESKEW_STEP / 2:
+            image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    if options.binarize:
+        image = binarize(image)
+    return image
+
+
+def preprocess_file(file_path, output_folder, options, source_dpi=None):
+    """
+    Prétraite un fichier image vers `output_folder` (format PNM, lu directement
+    par Tesseract, sans compression à encoder).
+
+    Retourne (chemin du fichier prétraité, statistiques) ; les statistiques
+    donnent la durée du prétraitement et le nombre de pixels avant/après.
+    """
+    started = time.perf_counter()
+    with Image.open(file_path) as image:
+        # Lecture complète avant la fermeture du fichier : sans étape active,
+        # `preprocess_image` retourne l'image source elle-même
+        image.load()
+        pixels_before = image.width * image.height
+        result = preprocess_image(image, options, source_dpi)
+        # Le format PNM n'accepte que les niveaux de gris, le noir et blanc et le RVB
+        if result.mode not in ('1', 'L', 'RGB'):
+            result = result.convert('RGB')
+        elif result is image:
+            result = image.copy()
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    output_path = os.path.join(output_folder, f'{name}_pre.pnm')
+    result.save(output_path)
+    return output_path, {
+        'preprocess': time.perf_counter() - started,
+        'pixels_before': pixels_before,
+        'pixels_after': result.width * result.height,
+    }
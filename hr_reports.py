@@ -0,0 +1,554 @@
+"""
+Rapports de YoonuRH : PDF (ReportLab, hr_reports_pdf) et Excel (openpyxl,
+hr_reports_excel).
+
+Chaque rapport est construit par une fonction `build_*(db, format_type,
+filename, ..., progress=None)` qui lit ses données puis écrit le fichier ;
+`progress(fraction, message)` est appelée à chaque étape. `ReportQueue`
+exécute ces fonctions dans un thread de travail, l'une après l'autre, et
+garde l'état de chaque rapport demandé pour le panneau « Rapports ».
+
+Les fiches de tous les employés (`build_all_employee_sheets`) sont écrites
+en parallèle par un pool de processus et rassemblées dans une archive ZIP.
+
+Ce module n'importe pas tkinter.
+"""
+import io
+import itertools
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from hr_db import parse_iso_date, resolve_current_statuses, to_display_date
+
+
+class EmptyReportError(Exception):
+    """Aucune donnée à mettre dans le rapport."""
+
+
+def _notify(progress, fraction, message):
+    if progress is not None:
+        progress(fraction, message)
+
+
+def _write(format_type, report, *args):
+    """
+    Écrit le fichier avec `write_<report>_pdf` ou `write_<report>_excel`.
+    Le module du format (hr_reports_pdf ou hr_reports_excel) n'est importé
+    qu'ici, pour que la ligne de commande démarre vite.
+    """
+    if format_type == 'pdf':
+        import hr_reports_pdf
+        getattr(hr_reports_pdf, f'write_{report}_pdf')(*args)
+    else:
+        import hr_reports_excel
+        getattr(hr_reports_excel, f'write_{report}_excel')(*args)
+
+
+def _iter_query(db, sql, params=()):
+    """
+    Lignes d'une requête lues au fil du curseur, sans liste intermédiaire ;
+    la connexion est rendue au pool une fois la lecture terminée.
+    """
+    conn = db.connect()
+    try:
+        yield from conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+def _require_rows(rows, message):
+    """Vérifie qu'un itérateur de lignes n'est pas vide (EmptyReportError) sans le consommer."""
+    first = next(rows, None)
+    if first is None:
+        raise EmptyReportError(message)
+    return itertools.chain([first], rows)
+
+
+# --- Liste du personnel ---
+
+def iter_staff_list(db):
+    """Employés avec leur statut actuel (congés en cours), triés par nom, lus au fil du curseur."""
+    # Statut actuel (congés en cours) partagé avec la liste des employés
+    current_statuses = resolve_current_statuses(db)
+    rows = _iter_query(db, '''
+        SELECT id, matricule, first_name, last_name, job_title, department,
+               hire_date, contract_type, status, phone, email
+        FROM employees
+        ORDER BY last_name, first_name
+    ''')
+    for row in rows:
+        yield row[1:6] + (to_display_date(row[6]), row[7], current_statuses.get(row[0], row[8])) + row[9:]
+
+
+def build_staff_list(db, format_type, filename, progress=None):
+    _notify(progress, 0.0, "Lecture des employés")
+    employees = _require_rows(iter_staff_list(db), "Aucun employé trouvé")
+    _notify(progress, 0.3, "Écriture du fichier")
+    _write(format_type, 'staff_list', employees, filename)
+    _notify(progress, 1.0, "Terminé")
+    return filename
+
+
+# --- Fiche employé ---
+
+def fetch_employee_sheets(db, employee_ids):
+    """
+    (employé, historique de carrière, 10 derniers congés) de chaque employé
+    de `employee_ids`, dans le même ordre ; les ids inconnus sont ignorés.
+    Trois requêtes pour toute la liste, quel que soit le nombre d'employés.
+    """
+    ids = list(employee_ids)
+    marks = ','.join('?' * len(ids))
+    conn = db.connect()
+    try:
+        employees = conn.execute(f'SELECT * FROM employees WHERE id IN ({marks})', ids).fetchall()
+
+        careers = {employee_id: [] for employee_id in ids}
+        for row in conn.execute(f'''
+            SELECT employee_id, act_number, nature, subject, act_date, effective_date
+            FROM career_history
+            WHERE employee_id IN ({marks})
+            ORDER BY employee_id, act_date DESC
+        ''', ids):
+            careers[row[0]].append(row[1:])
+
+        # Les 10 derniers congés de chaque employé
+        leaves = {employee_id: [] for employee_id in ids}
+        for row in conn.execute(f'''
+            SELECT employee_id, name, start_date, end_date, days_count, status
+            FROM (SELECT l.employee_id, lt.name, l.start_date, l.end_date, l.days_count, l.status,
+                         ROW_NUMBER() OVER (PARTITION BY l.employee_id
+                                            ORDER BY l.start_date DESC) AS position
+                  FROM leaves l
+                  JOIN leave_types lt ON l.leave_type_id = lt.id
+                  WHERE l.employee_id IN ({marks}))
+            WHERE position <= 10
+            ORDER BY employee_id, start_date DESC
+        ''', ids):
+            leaves[row[0]].append(row[1:])
+    finally:
+        conn.close()
+
+    by_id = {employee[0]: employee for employee in employees}
+    return [(by_id[employee_id], careers[employee_id], leaves[employee_id])
+            for employee_id in ids if employee_id in by_id]
+
+
+def fetch_employee_sheet(db, employee_id):
+    """(employé, historique de carrière, 10 derniers congés) ; EmptyReportError si l'employé n'existe pas."""
+    sheets = fetch_employee_sheets(db, [employee_id])
+    if not sheets:
+        raise EmptyReportError("Employé non trouvé")
+    return sheets[0]
+
+
+def build_employee_sheet(db, employee_id, format_type, filename, progress=None):
+    _notify(progress, 0.0, "Lecture de la fiche")
+    employee, career_history, recent_leaves = fetch_employee_sheet(db, employee_id)
+    _notify(progress, 0.3, "Écriture du fichier")
+    _write(format_type, 'employee_sheet', employee, career_history, recent_leaves, filename)
+    _notify(progress, 1.0, "Terminé")
+    return filename
+
+
+# --- Fiches de tous les employés (archive ZIP) ---
+
+# Employés lus ensemble puis confiés à un processus de travail (bien en deçà de
+# la limite de paramètres SQLite des requêtes IN)
+SHEET_BATCH_SIZE = 25
+
+
+def select_employee_ids(db, department=None, status=None):
+    """
+    Ids des employés d'une division et/ou d'un statut (tous par défaut), triés
+    par nom. Le statut comparé est le statut actuel (congés en cours), comme
+    dans la liste des employés et la liste du personnel.
+    """
+    sql, params = 'SELECT id FROM employees', []
+    if department:
+        sql += ' WHERE department = ?'
+        params.append(department)
+    ids = [row[0] for row in db.fetchall(sql + ' ORDER BY last_name, first_name', params)]
+    if status:
+        current_statuses = resolve_current_statuses(db, ids if department else None)
+        ids = [employee_id for employee_id in ids if current_statuses.get(employee_id) == status]
+    return ids
+
+
+def sheet_file_name(employee, extension):
+    """Nom de la fiche dans l'archive : fiche_<matricule>_<nom>_<prénom>.<extension>."""
+    parts = [employee[1] or str(employee[0]), employee[3] or '', employee[2] or '']
+    name = re.sub(r'[^\w.-]+', '_', '_'.join(part for part in parts if part)).strip('_')
+    return f'fiche_{name}.{extension}'
+
+
+def write_employee_sheets(format_type, sheets):
+    """
+    Écrit en mémoire les fiches d'un lot (exécuté dans un processus de travail).
+    Retourne [(nom dans l'archive, contenu du fichier)].
+    """
+    extension = 'pdf' if format_type == 'pdf' else 'xlsx'
+    written = []
+    for employee, career_history, recent_leaves in sheets:
+        buffer = io.BytesIO()
+        _write(format_type, 'employee_sheet', employee, career_history, recent_leaves, buffer)
+        written.append((sheet_file_name(employee, extension), buffer.getvalue()))
+    return written
+
+
+def build_all_employee_sheets(db, format_type, filename, department=None, status=None,
+                              progress=None, max_workers=None):
+    """
+    Archive ZIP des fiches de tous les employés retenus (division, statut).
+
+    Les données sont lues par lots de SHEET_BATCH_SIZE employés (trois
+    requêtes par lot) et chaque lot est écrit par un processus du pool ; les
+    fiches rejoignent l'archive dès qu'un lot est prêt, quelques lots
+    seulement étant en cours à la fois. L'archive est écrite sous un nom
+    temporaire puis renommée : un échec ne laisse pas de ZIP incomplet.
+    """
+    _notify(progress, 0.0, "Sélection des employés")
+    employee_ids = select_employee_ids(db, department, status)
+    if not employee_ids:
+        raise EmptyReportError("Aucun employé ne correspond aux critères")
+    total = len(employee_ids)
+    batches = iter([employee_ids[i:i + SHEET_BATCH_SIZE]
+                    for i in range(0, total, SHEET_BATCH_SIZE)])
+
+    max_workers = max_workers or os.cpu_count() or 1
+    partial_name = filename + '.partiel'
+    names, done = set(), 0
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor, \
+                zipfile.ZipFile(partial_name, 'w', zipfile.ZIP_DEFLATED) as archive:
+            pending = set()
+            while True:
+                # Au plus deux lots par processus en attente : les fiches lues restent peu nombreuses
+                for batch in itertools.islice(batches, 2 * max_workers - len(pending)):
+                    pending.add(executor.submit(write_employee_sheets, format_type,
+                                                fetch_employee_sheets(db, batch)))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    for name, content in future.result():
+                        # Deux employés de même matricule et même nom : suffixe numérique
+                        base, extension = os.path.splitext(name)
+                        for number in itertools.count(2):
+                            if name not in names:
+                                break
+                            name = f'{base}_{number}{extension}'
+                        names.add(name)
+                        archive.writestr(name, content)
+                        done += 1
+                    _notify(progress, done / total, f"{done}/{total} fiches")
+        os.replace(partial_name, filename)
+    except BaseException:
+        if os.path.exists(partial_name):
+            os.remove(partial_name)
+        raise
+    return filename
+
+
+# --- Congés annuels ---
+
+def leave_period(year=None, start_date=None, end_date=None):
+    """
+    Période du rapport des congés en dates ISO (début, fin incluse) : l'année
+    `year` (année en cours par défaut), sauf si `start_date`/`end_date` sont
+    donnés. Lève ValueError pour une date invalide ou si la fin précède le début.
+    """
+    year = year or datetime.now().year
+    start_date = start_date or f'{year}-01-01'
+    end_date = end_date or f'{year}-12-31'
+    for value in (start_date, end_date):
+        if parse_iso_date(value) is None:
+            raise ValueError(f"Date invalide : {value}")
+    if end_date < start_date:
+        raise ValueError("La date de fin précède la date de début")
+    return start_date, end_date
+
+
+def leave_period_label(start_date, end_date):
+    """« 2024 », « 2022-2024 » pour des années entières, sinon « 01/03/2024 au 30/06/2024 »."""
+    if start_date.endswith('-01-01') and end_date.endswith('-12-31'):
+        first_year, last_year = start_date[:4], end_date[:4]
+        return first_year if first_year == last_year else f'{first_year}-{last_year}'
+    return f'{to_display_date(start_date)} au {to_display_date(end_date)}'
+
+
+def fetch_leave_types(db):
+    """(id, nom) des types de congé, colonnes du rapport des congés."""
+    return db.fetchall('SELECT id, name FROM leave_types ORDER BY name')
+
+
+# Droit annuel au congé, base du « Solde Restant »
+ANNUAL_LEAVE_ALLOWANCE = 30
+
+
+def annual_leave_type_index(leave_types):
+    """Position du type « Congé Annuel » dans `leave_types` ((id, nom)) ; None s'il n'existe pas."""
+    for index, (_, name) in enumerate(leave_types):
+        if 'annuel' in name.lower():
+            return index
+    return None
+
+
+def _is_whole_year(year, start_date, end_date):
+    return start_date <= f'{year:04d}-01-01' and end_date >= f'{year:04d}-12-31'
+
+
+def covers_whole_year(start_date, end_date):
+    """Vrai si la période contient au moins une année civile entière."""
+    first_year = int(start_date[:4]) + (0 if start_date.endswith('-01-01') else 1)
+    last_year = int(end_date[:4]) - (0 if end_date.endswith('-12-31') else 1)
+    return first_year <= last_year
+
+
+def with_leave_balance(rows, start_date, end_date, annual_index):
+    """
+    Ajoute à chaque ligne de `iter_leave_matrix` le solde de congé annuel :
+    droit annuel moins les jours du type « Congé Annuel » (colonne
+    `annual_index`). Les autres types n'entament pas le solde. Le solde
+    n'a de sens que pour une année entière : None pour une année coupée par
+    une borne de la période.
+    """
+    for row in rows:
+        year = row[0]
+        balance = None
+        if _is_whole_year(year, start_date, end_date):
+            balance = ANNUAL_LEAVE_ALLOWANCE - row[4 + annual_index]
+        yield tuple(row) + (balance,)
+
+
+def iter_leave_matrix(db, start_date, end_date, leave_types):
+    """
+    Jours de congé approuvés par employé, par année et par type, du
+    `start_date` au `end_date` inclus, lus au fil du curseur.
+
+    Une ligne par employé et par année de la période :
+    (année, matricule, prénom, nom, jours de chaque type de `leave_types`,
+    total des jours, nombre de congés). Un congé à cheval sur deux années
+    (ou sur une borne de la période) n'y compte que pour ses jours compris
+    dans chaque année. Les employés actifs figurent même sans congé, les
+    autres seulement pour les années où ils en ont pris.
+
+    Tout le calcul est fait en SQL ; les congés de chaque année sont trouvés
+    par l'index idx_leaves_status_start (statut, début, fin).
+    """
+    type_columns = ''.join(
+        f'COALESCE(SUM(CASE WHEN s.leave_type_id = {int(type_id)} THEN s.days END), 0), '
+        for type_id, _ in leave_types)
+    return _iter_query(db, f'''
+        WITH RECURSIVE years(year) AS (
+            SELECT CAST(substr(:start, 1, 4) AS INTEGER)
+            UNION ALL
+            SELECT year + 1 FROM years WHERE year < CAST(substr(:end, 1, 4) AS INTEGER)
+        ),
+        periods AS (
+            SELECT year,
+                   MAX(:start, printf('%04d-01-01', year)) AS period_start,
+                   MIN(:end, printf('%04d-12-31', year)) AS period_end
+            FROM years
+        ),
+        slices AS (
+            -- Part de chaque congé comprise dans chaque année de la période
+            SELECT l.employee_id, p.year, l.leave_type_id,
+                   CAST(julianday(MIN(l.end_date, p.period_end))
+                        - julianday(MAX(l.start_date, p.period_start)) AS INTEGER) + 1 AS days
+            FROM periods p
+            JOIN leaves l ON l.status = 'Approved'
+                         AND l.start_date <= p.period_end AND l.end_date >= p.period_start
+        )
+        SELECT p.year, e.matricule, e.first_name, e.last_name,
+               {type_columns}
+               COALESCE(SUM(s.days), 0), COUNT(s.employee_id)
+        FROM employees e
+        CROSS JOIN periods p
+        LEFT JOIN slices s ON s.employee_id = e.id AND s.year = p.year
+        WHERE e.status = 'Active' OR s.employee_id IS NOT NULL
+        GROUP BY e.id, p.year
+        ORDER BY e.last_name, e.first_name, e.id, p.year
+    ''', {'start': start_date, 'end': end_date})
+
+
+def build_annual_leave(db, format_type, filename, year=None, progress=None,
+                       start_date=None, end_date=None):
+    """
+    Rapport des congés : tableau employé × type de congé, une ligne par
+    employé et par année. Porte sur l'année `year` (en cours par défaut) ou
+    sur la période `start_date`-`end_date` (dates ISO). Le solde de congé
+    annuel n'est donné que pour les années entières de la période.
+    """
+    start_date, end_date = leave_period(year, start_date, end_date)
+    _notify(progress, 0.0, "Lecture des congés")
+    leave_types = fetch_leave_types(db)
+    rows = _require_rows(iter_leave_matrix(db, start_date, end_date, leave_types),
+                         "Aucune donnée de congé trouvée pour cette période.")
+    # Colonne « Solde Restant » seulement si la période compte une année entière
+    annual_index = annual_leave_type_index(leave_types)
+    with_balance = annual_index is not None and covers_whole_year(start_date, end_date)
+    if with_balance:
+        rows = with_leave_balance(rows, start_date, end_date, annual_index)
+    _notify(progress, 0.3, "Écriture du fichier")
+    _write(format_type, 'annual_leave', [name for _, name in leave_types], rows,
+           leave_period_label(start_date, end_date), with_balance, filename)
+    _notify(progress, 1.0, "Terminé")
+    return filename
+
+
+# --- Statistiques RH ---
+
+def fetch_hr_statistics(db, year=None):
+    """(actifs, total, par division, par contrat, (demandes, jours) de congés de l'année)."""
+    year = year or datetime.now().year
+    conn = db.connect()
+    try:
+        cursor = conn.cursor()
+
+        # Statistiques générales
+        cursor.execute('SELECT COUNT(*) FROM employees WHERE status = "Active"')
+        total_active = cursor.fetchone()[0]
+
+        cursor.execute('SELECT COUNT(*) FROM employees')
+        total_employees = cursor.fetchone()[0]
+
+        # Répartition par département
+        cursor.execute('''
+            SELECT department, COUNT(*)
+            FROM employees
+            WHERE status = "Active" AND department IS NOT NULL AND department != ""
+            GROUP BY department
+            ORDER BY COUNT(*) DESC
+        ''')
+        dept_stats = cursor.fetchall()
+
+        # Répartition par type de contrat
+        cursor.execute('''
+            SELECT contract_type, COUNT(*)
+            FROM employees
+            WHERE status = "Active" AND contract_type IS NOT NULL AND contract_type != ""
+            GROUP BY contract_type
+        ''')
+        contract_stats = cursor.fetchall()
+
+        # Statistiques des congés (année courante)
+        cursor.execute('''
+            SELECT COUNT(*), SUM(days_count)
+            FROM leaves
+            WHERE start_date >= ? AND start_date < ?
+        ''', (f"{year}-01-01", f"{year + 1}-01-01"))
+        leave_stats = cursor.fetchone()
+    finally:
+        conn.close()
+    return total_active, total_employees, dept_stats, contract_stats, leave_stats
+
+
+def build_hr_statistics(db, format_type, filename, progress=None):
+    _notify(progress, 0.0, "Calcul des statistiques")
+    statistics = fetch_hr_statistics(db)
+    _notify(progress, 0.3, "Écriture du fichier")
+    _write(format_type, 'hr_statistics', *statistics, filename)
+    _notify(progress, 1.0, "Terminé")
+    return filename
+
+
+# --- File d'attente des rapports ---
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+
+class ReportJob:
+    """
+    Un rapport demandé : état, avancement (0 à 1) et message de l'étape en
+    cours, mis à jour par le thread de travail et lus par l'interface.
+    """
+
+    def __init__(self, job_id, title, filename, build, args, kwargs):
+        self.id = job_id
+        self.title = title
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.progress = 0.0
+        self.message = "En attente"
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self._build = build
+        self._args = args
+        self._kwargs = kwargs
+        self._future = None
+
+    @property
+    def active(self):
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    def set_progress(self, fraction, message=''):
+        self.progress = fraction
+        if message:
+            self.message = message
+
+    def cancel(self):
+        """Retire le rapport de la file s'il n'a pas commencé ; retourne True si c'est le cas."""
+        if self._future is not None and self._future.cancel():
+            self.status = JOB_CANCELLED
+            self.message = "Annulé"
+            self.finished_at = datetime.now()
+            return True
+        return False
+
+    def _run(self):
+        self.status = JOB_RUNNING
+        try:
+            self._build(*self._args, progress=self.set_progress, **self._kwargs)
+        except Exception as e:
+            self.error = e
+            self.message = str(e)
+            self.status = JOB_FAILED
+        else:
+            self.progress = 1.0
+            self.message = "Terminé"
+            self.status = JOB_DONE
+        self.finished_at = datetime.now()
+
+
+class ReportQueue:
+    """
+    File d'attente des rapports, exécutés hors du thread de l'interface.
+
+    `submit(titre, fichier, build, *args)` ajoute un rapport à la file et le
+    retourne aussitôt ; `max_workers` rapports sont générés en même temps
+    (un seul par défaut : les suivants attendent leur tour). `jobs` garde
+    l'historique de la session, du plus ancien au plus récent.
+    """
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.jobs = []
+
+    def submit(self, title, filename, build, *args, **kwargs):
+        job = ReportJob(next(self._ids), title, filename, build, args, kwargs)
+        with self._lock:
+            self.jobs.append(job)
+        job._future = self._executor.submit(job._run)
+        return job
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job.id == job_id:
+                return job
+        return None
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = [job for job in self.jobs if job.active]
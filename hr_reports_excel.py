@@ -0,0 +1,227 @@
+"""
+Écriture des rapports Excel (openpyxl).
+
+Les classeurs sont ouverts en mode « écriture seule » : chaque ligne part
+dans le fichier dès qu'elle est ajoutée, la mémoire ne dépend pas du nombre
+d'employés. Les mises en forme sont des styles nommés, créés une fois par
+classeur (`_new_workbook`) et référencés par leur nom dans chaque cellule.
+
+Importé par hr_reports seulement quand un rapport Excel est demandé :
+openpyxl est long à charger et inutile pour un export PDF.
+"""
+import itertools
+from datetime import datetime
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+from hr_db import to_display_date
+
+
+PRIMARY_GREEN = '2E7D32'
+
+# Largeur des colonnes des listes : texte le plus long + 2 caractères, bornée
+MIN_COLUMN_WIDTH = 15
+MAX_COLUMN_WIDTH = 40
+# Le mode écriture seule fixe les largeurs avant la première ligne : elles sont
+# mesurées sur les premières lignes, gardées en attente le temps de la mesure.
+WIDTH_SAMPLE_ROWS = 500
+# Ligne des en-têtes des listes (après le titre, la date et une ligne vide)
+LIST_HEADER_ROW = 4
+
+
+def _new_workbook():
+    """Classeur en écriture seule avec les styles nommés des rapports."""
+    wb = Workbook(write_only=True)
+    for style in (
+        NamedStyle('rh_title', font=Font(size=16, bold=True, color=PRIMARY_GREEN)),
+        NamedStyle('rh_date', font=Font(size=10)),
+        NamedStyle('rh_section', font=Font(size=12, bold=True, color=PRIMARY_GREEN)),
+        NamedStyle('rh_header', font=Font(bold=True, color='FFFFFF'),
+                   fill=PatternFill(start_color=PRIMARY_GREEN, end_color=PRIMARY_GREEN,
+                                    fill_type='solid'),
+                   alignment=Alignment(horizontal='center')),
+        NamedStyle('rh_label', font=Font(bold=True)),
+        NamedStyle('rh_alert', font=Font(color='FF0000', bold=True)),
+    ):
+        wb.add_named_style(style)
+    return wb
+
+
+def _cell(ws, value, style):
+    cell = WriteOnlyCell(ws, value)
+    cell.style = style
+    return cell
+
+
+def _generated_on():
+    return f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
+
+
+def _set_widths(ws, widths):
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+
+class _ColumnWidths:
+    """Plus long texte de chaque colonne, mesuré sur les lignes au fur et à mesure."""
+
+    def __init__(self, headers):
+        self.lengths = [0] * len(headers)
+        self.measure(headers)
+
+    def measure(self, row):
+        for index, value in enumerate(row):
+            value = getattr(value, 'value', value)  # cellule mise en forme
+            if value not in (None, ''):
+                self.lengths[index] = max(self.lengths[index], len(str(value)))
+
+    def widths(self):
+        return [min(max(length + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH) for length in self.lengths]
+
+
+def _write_list(ws, title, headers, rows):
+    """
+    Feuille de liste : titre, date, en-têtes (ligne LIST_HEADER_ROW), puis
+    `rows` (valeurs ou cellules), écrites au fil de l'itérateur. Retourne le
+    nombre de lignes écrites sous l'en-tête.
+    """
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, WIDTH_SAMPLE_ROWS))
+    widths = _ColumnWidths(headers)
+    for row in sample:
+        widths.measure(row)
+    _set_widths(ws, widths.widths())
+
+    ws.append([_cell(ws, title, 'rh_title')])
+    ws.append([_cell(ws, _generated_on(), 'rh_date')])
+    ws.append([])
+    ws.append([_cell(ws, header, 'rh_header') for header in headers])
+    count = 0
+    for count, row in enumerate(itertools.chain(sample, rows), 1):
+        ws.append(row)
+    return count
+
+
+def _write_fields(ws, section, fields):
+    """Section « libellé : valeur » des fiches et statistiques."""
+    ws.append([_cell(ws, section, 'rh_section')])
+    ws.append([])
+    for label, value in fields:
+        ws.append([_cell(ws, label, 'rh_label'), value])
+
+
+def write_staff_list_excel(employees, filename):
+    """Créer le fichier Excel de la liste du personnel"""
+    wb = _new_workbook()
+    headers = ['Matricule', 'Nom Complet', 'Corps de l\'agent', 'Division', 'Date Embauche', 'Statut', 'Téléphone', 'Email']
+    rows = (
+        (matricule, f"{first_name} {last_name}", job_title or '', department or '', hire_date or '',
+         status, phone or '', email or '')
+        for (matricule, first_name, last_name, job_title, department, hire_date, contract_type,
+             status, phone, email) in employees
+    )
+    _write_list(wb.create_sheet("Liste Personnel"), "Liste du Personnel", headers, rows)
+    wb.save(filename)
+
+
+def write_employee_sheet_excel(employee, career_history, recent_leaves, filename):
+    """Créer le fichier Excel de la fiche employé"""
+    wb = _new_workbook()
+    ws = wb.create_sheet("Fiche Employé")
+    _set_widths(ws, [25, 40])
+
+    ws.append([_cell(ws, f"Fiche Employé - {employee[2]} {employee[3]}", 'rh_title')])
+    ws.append([])
+
+    _write_fields(ws, "INFORMATIONS PERSONNELLES", [
+        ('Matricule:', employee[1]),
+        ('Nom Complet:', f"{employee[2]} {employee[3]}"),
+        ('Genre:', employee[4] or ''),
+        ('Date de Naissance:', to_display_date(employee[5]) or ''),
+        ('Lieu de Naissance:', employee[6] or ''),
+        ('Adresse:', employee[7] or ''),
+        ('Téléphone:', employee[8] or ''),
+        ('Email:', employee[9] or ''),
+        ('Situation Matrimoniale:', employee[10] or ''),
+        ('Personnes à Charge:', employee[11] or ''),
+    ])
+    ws.append([])
+    ws.append([])
+
+    _write_fields(ws, "INFORMATIONS CONTRACTUELLES", [
+        ('Date d\'Embauche:', to_display_date(employee[14]) or ''),
+        ('Type de Contrat:', employee[15] or ''),
+        ('Début de Contrat:', to_display_date(employee[16]) or ''),
+        ('Fin de Contrat:', to_display_date(employee[17]) or ''),
+        ('Division:', employee[18] or ''),
+        ('Corps de l\'agent:', employee[19] or ''),
+        ('Statut:', employee[20] or ''),
+    ])
+    wb.save(filename)
+
+
+def write_annual_leave_excel(leave_types, rows, period, with_balance, filename):
+    """
+    Créer le fichier Excel du rapport des congés : une ligne par employé et
+    par année, une colonne de jours par type de congé. Filtre automatique
+    sur l'en-tête et volets figés pour trier et filtrer dans Excel.
+    Avec `with_balance`, chaque ligne se termine par le solde de congé
+    annuel (None : cellule vide, année incomplète).
+    """
+    wb = _new_workbook()
+    # Les noms de feuille n'acceptent pas « / » (période en dates)
+    ws = wb.create_sheet(f"Congés {period}" if '/' not in period else "Congés")
+    headers = (['Année', 'Matricule', 'Employé'] + list(leave_types)
+               + ['Total Jours Pris', 'Nb Congés'] + (['Solde Restant'] if with_balance else []))
+
+    def sheet_rows():
+        for year, matricule, first_name, last_name, *days in rows:
+            if with_balance:
+                *days, remaining_balance = days
+            *days_by_type, days_taken, total_leaves = days
+            row = [year, matricule, f"{first_name} {last_name}"] + days_by_type + [days_taken, total_leaves]
+            if with_balance:
+                # Colorer en rouge si solde négatif
+                if remaining_balance is not None and remaining_balance < 0:
+                    remaining_balance = _cell(ws, remaining_balance, 'rh_alert')
+                row.append(remaining_balance)
+            yield row
+
+    title = "Rapport Annuel des Congés" if '/' not in period else "Rapport des Congés"
+    ws.freeze_panes = f'D{LIST_HEADER_ROW + 1}'
+    count = _write_list(ws, f"{title} - {period}", headers, sheet_rows())
+    ws.auto_filter.ref = f'A{LIST_HEADER_ROW}:{get_column_letter(len(headers))}{LIST_HEADER_ROW + count}'
+    wb.save(filename)
+
+
+def write_hr_statistics_excel(total_active, total_employees, dept_stats, contract_stats, leave_stats, filename):
+    """Créer le fichier Excel des statistiques RH"""
+    wb = _new_workbook()
+    ws = wb.create_sheet("Statistiques RH")
+    _set_widths(ws, [25, 15, 15])
+
+    ws.append([_cell(ws, "Statistiques RH ", 'rh_title')])
+    ws.append([_cell(ws, _generated_on(), 'rh_date')])
+    ws.append([])
+
+    _write_fields(ws, "STATISTIQUES GÉNÉRALES", [
+        ("Total Employés:", total_employees),
+        ("Employés Actifs:", total_active),
+        ("Taux d'Activité:", f"{(total_active/total_employees*100):.1f}%" if total_employees > 0 else "0%"),
+    ])
+
+    # Répartition par département
+    if dept_stats:
+        ws.append([])
+        ws.append([])
+        ws.append([_cell(ws, "RÉPARTITION PAR DÉPARTEMENT", 'rh_section')])
+        ws.append([])
+        ws.append([_cell(ws, header, 'rh_header') for header in ('Division', 'Nombre', 'Pourcentage')])
+        for dept, count in dept_stats:
+            percentage = (count / total_active * 100) if total_active > 0 else 0
+            ws.append([dept, count, f"{percentage:.1f}%"])
+
+    wb.save(filename)
@@ -0,0 +1,358 @@
+"""
+Écriture des rapports PDF (ReportLab).
+
+Les listes (personnel, congés annuels) sont découpées en tableaux d'une page
+(`_paged_tables`) : ReportLab recalcule tout le tableau restant à chaque saut
+de page, ce qui rendait un tableau unique de plusieurs milliers de lignes
+très lent à mettre en page.
+
+Importé par hr_reports seulement quand un rapport PDF est demandé : ReportLab
+est long à charger et inutile pour un export Excel.
+"""
+import itertools
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, LongTable, Table, TableStyle, Paragraph, Spacer
+
+from hr_db import to_display_date
+
+
+# Couleurs de la charte (mêmes valeurs que l'interface)
+REPORT_COLORS = {
+    'primary_green': '#2E7D32',
+    'light_gray': '#E8F5E8',
+}
+
+# Marge intérieure du cadre de SimpleDocTemplate (Frame), en haut et en bas
+FRAME_PADDING = 6
+
+
+def _remaining_height(doc, flowables):
+    """Hauteur laissée sur la première page par les éléments déjà placés (titre, date...)."""
+    used = sum(flowable.wrap(doc.width, doc.height)[1]
+               + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+               for flowable in flowables)
+    return doc.height - 2 * FRAME_PADDING - used
+
+
+def _paged_tables(doc, first_page_height, headers, rows, col_widths, style):
+    """
+    Tableau d'une longue liste, en une LongTable par page.
+
+    `rows` est lu par tranches : chaque tranche compte autant de lignes que
+    la page peut en recevoir, d'après la hauteur mesurée de l'en-tête et
+    d'une ligne. Chaque tableau commence par l'en-tête (`repeatRows` le
+    répète si une tranche déborde malgré tout sur la page suivante).
+    """
+    page_height = doc.height - 2 * FRAME_PADDING
+    header_height = LongTable([headers], colWidths=col_widths, style=style).wrap(doc.width, page_height)[1]
+    available = first_page_height
+    tables = []
+    rows = iter(rows)
+    for first_row in rows:
+        row_height = LongTable([headers, first_row], colWidths=col_widths, style=style).wrap(
+            doc.width, page_height)[1] - header_height
+        if available < header_height + row_height:
+            available = page_height
+        count = max(1, int((available - header_height) // row_height))
+        chunk = [first_row] + list(itertools.islice(rows, count - 1))
+        tables.append(LongTable([headers] + chunk, colWidths=col_widths, repeatRows=1, style=style))
+        available = page_height
+    return tables
+
+
+def write_staff_list_pdf(employees, filename):
+    """Créer le PDF de la liste du personnel en mode PAYSAGE"""
+    # --- CORRECTION : Utilisation de landscape(A4) pour passer en mode paysage ---
+    doc = SimpleDocTemplate(filename, pagesize=landscape(A4))
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Titre
+    title_style = styles['Title']
+    title_style.textColor = colors.HexColor(REPORT_COLORS['primary_green'])
+    story.append(Paragraph("Liste Complète du Personnel", title_style))
+    story.append(Spacer(1, 12))
+
+    # Date de génération
+    story.append(Paragraph(f"Rapport généré le : {datetime.now().strftime('%d/%m/%Y à %H:%M')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Préparation des données du tableau
+    headers = [
+        "Matricule", "Prénom", "Nom", "Corps de l'agent", "Division",
+        "Date d'emb.", "Contrat", "Statut", "Téléphone", "Email"
+    ]
+
+    # --- CORRECTION : Ajustement de la largeur des colonnes pour le mode paysage ---
+    # La largeur totale d'un A4 paysage est d'environ 842 points.
+    # On ajuste pour une meilleure répartition.
+    col_widths = [
+        70,  # Matricule
+        90,  # Prénom
+        90,  # Nom
+        110, # Poste
+        90,  # Département
+        70,  # Date d'emb.
+        70,  # Contrat
+        60,  # Statut
+        80,  # Téléphone
+        120  # Email
+    ]
+
+    # Style du tableau (une seule règle pour l'alternance des couleurs des lignes)
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(REPORT_COLORS['primary_green'])),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1),
+         [colors.whitesmoke, colors.HexColor(REPORT_COLORS['light_gray'])]),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 8), # Taille de police réduite pour mieux s'adapter
+    ])
+
+    story += _paged_tables(doc, _remaining_height(doc, story), headers, (list(emp) for emp in employees),
+                           col_widths, style)
+    doc.build(story)
+
+
+def write_employee_sheet_pdf(employee, career_history, recent_leaves, filename):
+    """Créer le PDF de la fiche employé"""
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Titre
+    title_style = styles['Title']
+    title_style.textColor = colors.HexColor(REPORT_COLORS['primary_green'])
+    story.append(Paragraph(f"Fiche Employé - {employee[2]} {employee[3]}", title_style))
+    story.append(Spacer(1, 20))
+
+    # Informations personnelles
+    story.append(Paragraph("Informations Personnelles", styles['Heading2']))
+
+    personal_data = [
+        ['Matricule:', employee[1]],
+        ['Nom Complet:', f"{employee[2]} {employee[3]}"],
+        ['Genre:', employee[4] or ''],
+        ['Date de Naissance:', to_display_date(employee[5]) or ''],
+        ['Lieu de Naissance:', employee[6] or ''],
+        ['Adresse:', employee[7] or ''],
+        ['Téléphone:', employee[8] or ''],
+        ['Email:', employee[9] or ''],
+        ['Situation Matrimoniale:', employee[10] or ''],
+        ['Personnes à Charge:', str(employee[11]) if employee[11] else '0']
+    ]
+
+    personal_table = Table(personal_data, colWidths=[150, 300])
+    personal_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+
+    story.append(personal_table)
+    story.append(Spacer(1, 20))
+
+    # Informations contractuelles
+    story.append(Paragraph("Informations Contractuelles", styles['Heading2']))
+
+    contract_data = [
+        ['Date d\'Embauche:', to_display_date(employee[14]) or ''],
+        ['Type de Contrat:', employee[15] or ''],
+        ['Début de Contrat:', to_display_date(employee[16]) or ''],
+        ['Fin de Contrat:', to_display_date(employee[17]) or ''],
+        ['Division:', employee[18] or ''],
+        ['Corps de l\'agent:', employee[19] or ''],
+        ['Statut:', employee[20] or '']
+    ]
+
+    contract_table = Table(contract_data, colWidths=[150, 300])
+    contract_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+
+    story.append(contract_table)
+    story.append(Spacer(1, 20))
+
+    # Historique de carrière (si disponible)
+    if career_history:
+        story.append(Paragraph("Historique de Carrière", styles['Heading2']))
+
+        career_data = [['N° Acte', 'Nature', 'Date Acte', 'Date Effet']]
+        for act in career_history[:5]:  # Limiter à 5 derniers actes
+            career_data.append([
+                act[0] or '',
+                act[1] or '',
+                to_display_date(act[3]) or '',
+                to_display_date(act[4]) or ''
+            ])
+
+        career_table = Table(career_data)
+        career_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(REPORT_COLORS['primary_green'])),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+
+        story.append(career_table)
+
+    doc.build(story)
+
+
+def write_annual_leave_pdf(leave_types, rows, period, with_balance, filename):
+    """
+    Créer le PDF du rapport des congés (employé × type de congé, une ligne par année).
+    Avec `with_balance`, chaque ligne se termine par le solde de congé annuel
+    (None : case vide, année incomplète).
+    """
+    doc = SimpleDocTemplate(filename, pagesize=landscape(A4))
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Titre
+    title_style = styles['Title']
+    title_style.textColor = colors.HexColor(REPORT_COLORS['primary_green'])
+    title = "Rapport Annuel des Congés" if '/' not in period else "Rapport des Congés"
+    story.append(Paragraph(f"{title} - {period}", title_style))
+    story.append(Spacer(1, 20))
+
+    # Date de génération
+    story.append(Paragraph(f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # En-têtes en paragraphes : les noms de types de congé passent à la ligne
+    header_style = ParagraphStyle('leave_header', parent=styles['Normal'], fontName='Helvetica-Bold',
+                                  fontSize=7, leading=8, alignment=TA_CENTER, textColor=colors.whitesmoke)
+    headers = [Paragraph(text, header_style) for text in
+               ['Année', 'Matricule', 'Employé'] + list(leave_types) + ['Total Jours', 'Nb Congés']
+               + (['Solde Restant'] if with_balance else [])]
+
+    def table_rows():
+        for year, matricule, first_name, last_name, *days in rows:
+            if with_balance:
+                *days, remaining_balance = days
+            *days_by_type, days_taken, total_leaves = days
+            row = ([str(year), matricule, f"{first_name} {last_name}"]
+                   + [str(value) for value in days_by_type]
+                   + [str(days_taken), str(total_leaves)])
+            if with_balance:
+                row.append('' if remaining_balance is None else str(remaining_balance))
+            yield row
+
+    # Colonnes fixes, le reste de la largeur partagé entre les types de congé
+    fixed_widths = [40, 60, 110]
+    total_widths = [40, 40, 45] if with_balance else [40, 40]
+    type_width = (doc.width - sum(fixed_widths) - sum(total_widths)) / max(1, len(leave_types))
+    col_widths = fixed_widths + [type_width] * len(leave_types) + total_widths
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(REPORT_COLORS['primary_green'])),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('LEFTPADDING', (0, 0), (-1, 0), 2),
+        ('RIGHTPADDING', (0, 0), (-1, 0), 2),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.beige]),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ])
+
+    story += _paged_tables(doc, _remaining_height(doc, story), headers, table_rows(), col_widths, style)
+    doc.build(story)
+
+
+def write_hr_statistics_pdf(total_active, total_employees, dept_stats, contract_stats, leave_stats, filename):
+    """Créer le PDF des statistiques RH"""
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Titre
+    title_style = styles['Title']
+    title_style.textColor = colors.HexColor(REPORT_COLORS['primary_green'])
+    story.append(Paragraph("Statistiques RH ", title_style))
+    story.append(Spacer(1, 20))
+
+    # Date de génération
+    story.append(Paragraph(f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}", styles['Normal']))
+    story.append(Spacer(1, 30))
+
+    # Statistiques générales
+    story.append(Paragraph("Statistiques Générales", styles['Heading2']))
+
+    general_data = [
+        ['Total Employés:', str(total_employees)],
+        ['Employés Actifs:', str(total_active)],
+        ['Taux d\'Activité:', f"{(total_active/total_employees*100):.1f}%" if total_employees > 0 else "0%"]
+    ]
+
+    general_table = Table(general_data, colWidths=[200, 100])
+    general_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+
+    story.append(general_table)
+    story.append(Spacer(1, 20))
+
+    # Répartition par département
+    if dept_stats:
+        story.append(Paragraph("Répartition par Division", styles['Heading2']))
+
+        dept_data = [['Division', 'Nombre d\'Employés', 'Pourcentage']]
+        for dept, count in dept_stats:
+            percentage = (count / total_active * 100) if total_active > 0 else 0
+            dept_data.append([dept, str(count), f"{percentage:.1f}%"])
+
+        dept_table = Table(dept_data)
+        dept_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(REPORT_COLORS['primary_green'])),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+
+        story.append(dept_table)
+        story.append(Spacer(1, 20))
+
+    # Statistiques des congés
+    story.append(Paragraph(f"Statistiques des Congés {datetime.now().year}", styles['Heading2']))
+
+    total_leave_requests = leave_stats[0] or 0
+    total_leave_days = leave_stats[1] or 0
+
+    leave_data = [
+        ['Total Demandes de Congés:', str(total_leave_requests)],
+        ['Total Jours de Congés:', str(total_leave_days)],
+        ['Moyenne par Demande:', f"{(total_leave_days/total_leave_requests):.1f} jours" if total_leave_requests > 0 else "0 jours"]
+    ]
+
+    leave_table = Table(leave_data, colWidths=[200, 100])
+    leave_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+
+    story.append(leave_table)
+
+    doc.build(story)
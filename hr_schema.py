@@ -0,0 +1,571 @@
+"""
+Schéma versionné de la base YoonuRH.
+
+Chaque migration est numérotée et n'est exécutée qu'une seule fois, dans une
+transaction, puis enregistrée dans la table `schema_version`. Au démarrage,
+une base à jour ne coûte qu'une lecture de `schema_version` : aucun
+CREATE/ALTER n'est rejoué.
+
+Pour faire évoluer le schéma, ajouter une fonction à la fin de `MIGRATIONS`
+(ne jamais modifier une migration déjà livrée).
+"""
+import hashlib
+import sqlite3
+
+from hr_db import ISO_DATE_COLUMNS, to_iso_date
+
+
+# --- Migrations ---
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _add_missing_columns(conn, table, columns):
+    """Ajoute les colonnes absentes (remplace les ALTER TABLE dans des try/except)."""
+    existing = _column_names(conn, table)
+    for name, column_type in columns:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+
+
+def _migration_001_initial_schema(conn):
+    """Tables de base, colonnes ajoutées au fil des versions et données par défaut."""
+    # Table des utilisateurs
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Table des employés
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            matricule TEXT UNIQUE NOT NULL,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            gender TEXT,
+            birth_date TEXT,
+            birth_place TEXT,
+            address TEXT,
+            phone TEXT,
+            email TEXT,
+            marital_status TEXT,
+            dependents INTEGER DEFAULT 0,
+            social_security TEXT,
+            bank_details TEXT,
+            hire_date TEXT,
+            contract_type TEXT,
+            contract_start TEXT,
+            contract_end TEXT,
+            department TEXT,
+            job_title TEXT,
+            status TEXT DEFAULT 'Active',
+            photo_path TEXT,
+            numero_decision TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Table de l'historique de carrière
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS career_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            act_number TEXT,
+            nature TEXT,
+            subject TEXT,
+            act_date TEXT,
+            effective_date TEXT,
+            document_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (employee_id) REFERENCES employees (id)
+        )
+    ''')
+
+    # Table des documents
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            category TEXT,
+            name TEXT,
+            file_path TEXT,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (employee_id) REFERENCES employees (id)
+        )
+    ''')
+
+    # Table des types de congés
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leave_types (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            days_per_year INTEGER DEFAULT 0,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Table des congés
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leaves (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            leave_type_id INTEGER,
+            start_date TEXT,
+            end_date TEXT,
+            days_count INTEGER,
+            status TEXT DEFAULT 'Approved',
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (employee_id) REFERENCES employees (id),
+            FOREIGN KEY (leave_type_id) REFERENCES leave_types (id)
+        )
+    ''')
+
+    # Table des courriers
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS courriers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero_ordre TEXT UNIQUE NOT NULL,
+            type_courrier TEXT NOT NULL,
+            nombre_pieces INTEGER DEFAULT 1,
+            date_arrivee_expedition TEXT NOT NULL,
+            expediteur_destinataire TEXT NOT NULL,
+            objet TEXT NOT NULL,
+            numero_archive TEXT,
+            observation TEXT,
+            file_path TEXT,
+            date_creation TEXT DEFAULT CURRENT_TIMESTAMP,
+            created_by TEXT
+        )
+    ''')
+
+    # Colonnes ajoutées après la première version (bases existantes)
+    _add_missing_columns(conn, 'employees', [
+        ('cni', 'TEXT'), ('nationalite', 'TEXT'), ('numero_decision', 'TEXT'),
+    ])
+    _add_missing_columns(conn, 'courriers', [('file_path', 'TEXT')])
+
+    # Utilisateurs par défaut
+    admin_hash = hashlib.sha256('admin'.encode()).hexdigest()
+    user_hash = hashlib.sha256('user'.encode()).hexdigest()
+    conn.execute('INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)',
+                 ('admin', admin_hash, 'admin'))
+    conn.execute('INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)',
+                 ('user', user_hash, 'user'))
+
+    # Types de congés par défaut
+    default_leave_types = [
+        ('Congé Annuel', 30, 'Congé annuel réglementaire'),
+        ('Congé Maladie', 0, 'Congé pour maladie'),
+        ('Congé Maternité', 0, 'Congé de maternité'),
+        ('Congé Paternité', 0, 'Congé de paternité'),
+        ('Permission Exceptionnelle', 0, 'Permission pour événements familiaux')
+    ]
+    conn.executemany('INSERT OR IGNORE INTO leave_types (name, days_per_year, description) VALUES (?, ?, ?)',
+                     default_leave_types)
+
+
+def _migration_002_iso_dates(conn):
+    """Réécrit les dates jj/mm/aaaa en AAAA-MM-JJ (valeurs déjà ISO ignorées)."""
+    for table, columns in ISO_DATE_COLUMNS.items():
+        select_cols = ', '.join(columns)
+        rows = conn.execute(f'SELECT id, {select_cols} FROM {table}').fetchall()
+        for row in rows:
+            updates = {}
+            for column, value in zip(columns, row[1:]):
+                new_value = to_iso_date(value) if isinstance(value, str) else value
+                if new_value != value:
+                    updates[column] = new_value
+            if updates:
+                assignments = ', '.join(f'{column} = ?' for column in updates)
+                conn.execute(f'UPDATE {table} SET {assignments} WHERE id = ?',
+                             list(updates.values()) + [row[0]])
+
+
+def _migration_003_indexes(conn):
+    """Index composites sur les chemins d'accès réels de l'application."""
+    # Congés : statut d'un employé, historique, plan annuel / calendrier
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_leaves_employee_status_start ON leaves(employee_id, status, start_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_leaves_status_start ON leaves(status, start_date, end_date)')
+    # Documents d'un employé filtrés par catégorie, triés par date
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_documents_employee_category_uploaded ON documents(employee_id, category, uploaded_at)')
+    # Historique de carrière d'un employé trié par date d'acte
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_career_history_employee_date ON career_history(employee_id, act_date)')
+    # Registre des courriers par type, trié par date
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courriers_type_date ON courriers(type_courrier, date_arrivee_expedition)')
+    conn.execute('ANALYZE')
+
+
+def _migration_004_courriers_fts(conn):
+    """Index plein texte FTS5 du registre des courriers, synchronisé par triggers."""
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS courriers_fts USING fts5(
+                numero_ordre, expediteur_destinataire, objet, numero_archive, observation,
+                content='courriers', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite compilé sans FTS5 : la recherche retombe sur LIKE (voir hr_search)
+        return
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS courriers_fts_ai AFTER INSERT ON courriers BEGIN
+            INSERT INTO courriers_fts(rowid, numero_ordre, expediteur_destinataire, objet, numero_archive, observation)
+            VALUES (new.id, new.numero_ordre, new.expediteur_destinataire, new.objet, new.numero_archive, new.observation);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS courriers_fts_ad AFTER DELETE ON courriers BEGIN
+            INSERT INTO courriers_fts(courriers_fts, rowid, numero_ordre, expediteur_destinataire, objet, numero_archive, observation)
+            VALUES ('delete', old.id, old.numero_ordre, old.expediteur_destinataire, old.objet, old.numero_archive, old.observation);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS courriers_fts_au
+        AFTER UPDATE OF numero_ordre, expediteur_destinataire, objet, numero_archive, observation ON courriers BEGIN
+            INSERT INTO courriers_fts(courriers_fts, rowid, numero_ordre, expediteur_destinataire, objet, numero_archive, observation)
+            VALUES ('delete', old.id, old.numero_ordre, old.expediteur_destinataire, old.objet, old.numero_archive, old.observation);
+            INSERT INTO courriers_fts(rowid, numero_ordre, expediteur_destinataire, objet, numero_archive, observation)
+            VALUES (new.id, new.numero_ordre, new.expediteur_destinataire, new.objet, new.numero_archive, new.observation);
+        END
+    """)
+    # Indexation des courriers déjà enregistrés
+    conn.execute("INSERT INTO courriers_fts(courriers_fts) VALUES ('rebuild')")
+
+
+def _migration_005_employees_fts(conn):
+    """Index de recherche des employés (matricule, prénom, nom), synchronisé par triggers."""
+    try:
+        # prefix='2 3' : index de préfixes courts pour la saisie au fil de la frappe
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+                matricule, first_name, last_name,
+                content='employees', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees BEGIN
+            INSERT INTO employees_fts(rowid, matricule, first_name, last_name)
+            VALUES (new.id, new.matricule, new.first_name, new.last_name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+            INSERT INTO employees_fts(employees_fts, rowid, matricule, first_name, last_name)
+            VALUES ('delete', old.id, old.matricule, old.first_name, old.last_name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS employees_fts_au
+        AFTER UPDATE OF matricule, first_name, last_name ON employees BEGIN
+            INSERT INTO employees_fts(employees_fts, rowid, matricule, first_name, last_name)
+            VALUES ('delete', old.id, old.matricule, old.first_name, old.last_name);
+            INSERT INTO employees_fts(rowid, matricule, first_name, last_name)
+            VALUES (new.id, new.matricule, new.first_name, new.last_name);
+        END
+    """)
+    conn.execute("INSERT INTO employees_fts(employees_fts) VALUES ('rebuild')")
+    # Tri par défaut des listes d'employés
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_employees_name ON employees(last_name, first_name)')
+
+
+# Requête de recalcul des employés en congé sur la période de `dashboard_stats`
+_LEAVES_PERIOD_COUNT_SQL = '''
+    SELECT COUNT(DISTINCT l.employee_id)
+    FROM leaves l
+    JOIN employees e ON e.id = l.employee_id
+    WHERE l.status = 'Approved'
+      AND l.start_date <= dashboard_stats.period_end
+      AND l.end_date >= dashboard_stats.period_start
+'''
+
+
+def _migration_006_dashboard_stats(conn):
+    """Compteurs du tableau de bord, tenus à jour par triggers."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0,
+            period_start TEXT,
+            period_end TEXT
+        )
+    ''')
+
+    # Valeurs initiales ; 'leaves_period' est calculé au premier affichage
+    # (bascule de période, voir hr_db.read_dashboard_stats)
+    conn.execute('''
+        INSERT OR REPLACE INTO dashboard_stats (name, value)
+        SELECT 'employees_active', COUNT(*) FROM employees WHERE status IN ('Active', 'En Congé')
+    ''')
+    for mail_type in ('arrivee', 'depart'):
+        conn.execute('''
+            INSERT OR REPLACE INTO dashboard_stats (name, value)
+            SELECT ?, COUNT(*) FROM courriers WHERE type_courrier = ?
+        ''', (f'mail_{mail_type}', mail_type))
+    for month in range(1, 13):
+        conn.execute('''
+            INSERT OR REPLACE INTO dashboard_stats (name, value)
+            SELECT ?, COUNT(*) FROM employees WHERE substr(birth_date, 6, 2) = ? AND status = 'Active'
+        ''', (f'birthdays_{month:02d}', f'{month:02d}'))
+    conn.execute("INSERT OR REPLACE INTO dashboard_stats (name, value) VALUES ('leaves_period', 0)")
+
+    # Employés : effectif actif et anniversaires par mois de naissance
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS employees_stats_ai AFTER INSERT ON employees BEGIN
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = 'employees_active' AND new.status IN ('Active', 'En Congé');
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = 'birthdays_' || substr(new.birth_date, 6, 2) AND new.status = 'Active';
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS employees_stats_ad AFTER DELETE ON employees BEGIN
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = 'employees_active' AND old.status IN ('Active', 'En Congé');
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = 'birthdays_' || substr(old.birth_date, 6, 2) AND old.status = 'Active';
+            UPDATE dashboard_stats SET value = ({_LEAVES_PERIOD_COUNT_SQL})
+            WHERE name = 'leaves_period';
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS employees_stats_au AFTER UPDATE OF status, birth_date ON employees BEGIN
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = 'employees_active' AND old.status IN ('Active', 'En Congé');
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = 'employees_active' AND new.status IN ('Active', 'En Congé');
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = 'birthdays_' || substr(old.birth_date, 6, 2) AND old.status = 'Active';
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = 'birthdays_' || substr(new.birth_date, 6, 2) AND new.status = 'Active';
+        END
+    """)
+
+    # Congés : recalcul indexé, seulement si le congé touche la période suivie
+    overlaps = "{row}.start_date <= period_end AND {row}.end_date >= period_start"
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS leaves_stats_ai AFTER INSERT ON leaves BEGIN
+            UPDATE dashboard_stats SET value = ({_LEAVES_PERIOD_COUNT_SQL})
+            WHERE name = 'leaves_period' AND {overlaps.format(row='new')};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS leaves_stats_ad AFTER DELETE ON leaves BEGIN
+            UPDATE dashboard_stats SET value = ({_LEAVES_PERIOD_COUNT_SQL})
+            WHERE name = 'leaves_period' AND {overlaps.format(row='old')};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS leaves_stats_au
+        AFTER UPDATE OF employee_id, status, start_date, end_date ON leaves BEGIN
+            UPDATE dashboard_stats SET value = ({_LEAVES_PERIOD_COUNT_SQL})
+            WHERE name = 'leaves_period'
+              AND (({overlaps.format(row='old')}) OR ({overlaps.format(row='new')}));
+        END
+    """)
+
+    # Courriers : total par type
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS courriers_stats_ai AFTER INSERT ON courriers BEGIN
+            UPDATE dashboard_stats SET value = value + 1 WHERE name = 'mail_' || new.type_courrier;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS courriers_stats_ad AFTER DELETE ON courriers BEGIN
+            UPDATE dashboard_stats SET value = value - 1 WHERE name = 'mail_' || old.type_courrier;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS courriers_stats_au AFTER UPDATE OF type_courrier ON courriers BEGIN
+            UPDATE dashboard_stats SET value = value - 1 WHERE name = 'mail_' || old.type_courrier;
+            UPDATE dashboard_stats SET value = value + 1 WHERE name = 'mail_' || new.type_courrier;
+        END
+    """)
+
+
+def _migration_007_ocr_cache(conn):
+    """Cache des résultats OCR, par page, avec date de dernier accès (éviction LRU)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            file_hash TEXT NOT NULL,
+            lang TEXT NOT NULL,
+            dpi INTEGER NOT NULL,
+            engine TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (file_hash, lang, dpi, engine, page)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache(last_used)')
+
+
+def _create_fts_triggers(conn, table, fts_table, columns):
+    """Triggers de synchronisation d'un index FTS5 à contenu externe."""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column_list})
+            VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column_list} ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column_list})
+            VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    """)
+
+
+def _migration_008_attachment_text(conn):
+    """Texte extrait des pièces jointes (indexeur OCR), inclus dans la recherche plein texte."""
+    _add_missing_columns(conn, 'courriers', [('ocr_text', 'TEXT')])
+    _add_missing_columns(conn, 'documents', [('ocr_text', 'TEXT')])
+
+    # État de l'indexeur : une ligne par pièce jointe traitée (reprise après arrêt)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attachment_ocr (
+            source TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            file_path TEXT,
+            status TEXT NOT NULL,
+            error TEXT,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, source_id)
+        )
+    ''')
+
+    # L'index des courriers est recréé avec la colonne ocr_text
+    for suffix in ('ai', 'ad', 'au'):
+        conn.execute(f'DROP TRIGGER IF EXISTS courriers_fts_{suffix}')
+    conn.execute('DROP TABLE IF EXISTS courriers_fts')
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE courriers_fts USING fts5(
+                numero_ordre, expediteur_destinataire, objet, numero_archive, observation, ocr_text,
+                content='courriers', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                name, category, ocr_text,
+                content='documents', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return
+
+    _create_fts_triggers(conn, 'courriers', 'courriers_fts',
+                         ('numero_ordre', 'expediteur_destinataire', 'objet',
+                          'numero_archive', 'observation', 'ocr_text'))
+    _create_fts_triggers(conn, 'documents', 'documents_fts', ('name', 'category', 'ocr_text'))
+    conn.execute("INSERT INTO courriers_fts(courriers_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def _migration_009_attachment_changes(conn):
+    """Taille et date des pièces jointes indexées (fichiers remplacés), essais en erreur."""
+    _add_missing_columns(conn, 'attachment_ocr', [
+        ('file_size', 'INTEGER'),
+        ('file_mtime', 'REAL'),
+        ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+    ])
+
+
+# Liste ordonnée : (version, description, fonction)
+MIGRATIONS = [
+    (1, "Schéma initial", _migration_001_initial_schema),
+    (2, "Dates au format ISO-8601", _migration_002_iso_dates),
+    (3, "Index composites", _migration_003_indexes),
+    (4, "Recherche plein texte des courriers", _migration_004_courriers_fts),
+    (5, "Index de recherche des employés", _migration_005_employees_fts),
+    (6, "Compteurs du tableau de bord", _migration_006_dashboard_stats),
+    (7, "Cache des résultats OCR", _migration_007_ocr_cache),
+    (8, "Texte des pièces jointes", _migration_008_attachment_text),
+    (9, "Suivi des pièces jointes modifiées", _migration_009_attachment_changes),
+]
+
+
+# --- Moteur ---
+
+def get_schema_version(conn):
+    """Version actuelle du schéma (0 pour une base neuve ou antérieure au versionnement)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def apply_migrations(db):
+    """
+    Applique, dans l'ordre, les migrations plus récentes que la version de la base.
+
+    Chaque migration s'exécute dans sa propre transaction avec l'enregistrement
+    de sa version : en cas d'erreur, elle est entièrement annulée et l'exception
+    est propagée. La version est relue une fois le verrou d'écriture obtenu :
+    une migration déjà appliquée entre-temps par un autre processus (interface
+    et ligne de commande lancées ensemble) est sautée. Retourne la liste des
+    versions appliquées.
+    """
+    conn = db.connect()
+    applied = []
+    try:
+        current = get_schema_version(conn)
+        if current >= MIGRATIONS[-1][0]:
+            return applied
+
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                current = get_schema_version(conn)
+                if version <= current:
+                    conn.commit()
+                    continue
+                migrate(conn)
+                conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                             (version, description))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+    finally:
+        conn.close()
+    return applied
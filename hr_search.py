@@ -0,0 +1,314 @@
+"""
+Moteurs de recherche et listes paginées de YoonuRH.
+
+- Registre des courriers : index plein texte FTS5 (`courriers_fts`, créé par
+  hr_schema), insensible aux accents, résultats classés par pertinence (bm25).
+- Employés : index `employees_fts` sur matricule, prénom et nom, partagé par
+  la liste de l'onglet Employés et par tous les sélecteurs d'employé.
+- Courriers et documents incluent le texte extrait des pièces jointes
+  (colonne `ocr_text`, remplie par l'indexeur de hr_ocr).
+- `KeysetPager` : lecture des grandes listes par pages successives, triées
+  en SQL, avec un COUNT séparé pour le total.
+
+Ce module n'importe pas tkinter.
+"""
+import re
+
+
+# Colonnes renvoyées par les recherches de courriers (même ordre que load_mail_data)
+MAIL_COLUMNS = '''c.numero_ordre, c.nombre_pieces, c.date_arrivee_expedition,
+                  c.expediteur_destinataire, c.objet, c.numero_archive, c.file_path, c.id'''
+
+# Colonnes par défaut des recherches d'employés (liste de l'onglet Employés)
+EMPLOYEE_COLUMNS = '''e.id, e.matricule, e.first_name, e.last_name, e.job_title,
+                      e.department, e.status, e.photo_path'''
+
+# Rang attribué aux lignes retenues hors index plein texte (après les autres)
+_UNRANKED = 1e9
+
+
+def has_table(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone() is not None
+
+
+def build_fts_query(search_term):
+    """
+    Transforme une saisie libre en requête FTS5 sûre.
+
+    Chaque mot devient une phrase entre guillemets avec recherche par préfixe
+    ("ndiay"* trouve "Ndiaye") ; les mots sont combinés en ET. Retourne None
+    si la saisie ne contient aucun mot exploitable.
+    """
+    words = [w for w in re.split(r'\s+', search_term.strip()) if re.search(r'\w', w)]
+    if not words:
+        return None
+    return ' '.join('"{}"*'.format(w.replace('"', '""')) for w in words)
+
+
+# --- Filtres partagés (recherche simple et listes paginées) ---
+# Chaque filtre retourne (source, conditions, paramètres, expression de rang) ;
+# l'expression de rang vaut None quand il n'y a pas de recherche plein texte.
+
+def _courrier_filter(conn, mail_type, search_term):
+    term = (search_term or '').strip()
+    source = 'courriers c'
+    where, params = ['c.type_courrier = ?'], [mail_type]
+    rank = None
+
+    fts_query = build_fts_query(term) if term else None
+    if fts_query is not None and has_table(conn, 'courriers_fts'):
+        source += '''
+            JOIN (SELECT rowid, bm25(courriers_fts) AS rank
+                  FROM courriers_fts WHERE courriers_fts MATCH ?) f
+              ON f.rowid = c.id'''
+        params.insert(0, fts_query)
+        rank = 'f.rank'
+    elif term:
+        # Repli sans FTS5 : recherche LIKE sur toutes les colonnes texte
+        like = f'%{term}%'
+        where.append('(c.numero_ordre LIKE ? OR c.expediteur_destinataire LIKE ? OR '
+                     'c.objet LIKE ? OR c.numero_archive LIKE ? OR c.observation LIKE ? OR '
+                     'c.ocr_text LIKE ?)')
+        params.extend([like] * 6)
+    return source, where, params, rank
+
+
+def _employee_filter(conn, search_term, status=None):
+    term = (search_term or '').strip()
+    source = 'employees e'
+    where, params = [], []
+    rank = None
+
+    fts_query = build_fts_query(term) if term else None
+    if fts_query is not None and has_table(conn, 'employees_fts'):
+        source += '''
+            LEFT JOIN (SELECT rowid, bm25(employees_fts) AS rank
+                       FROM employees_fts WHERE employees_fts MATCH ?) f
+                   ON f.rowid = e.id'''
+        params.append(fts_query)
+        where.append('(f.rowid IS NOT NULL OR e.matricule LIKE ?)')
+        params.append(f'%{term}%')
+        rank = f'COALESCE(f.rank, {_UNRANKED})'
+    elif term:
+        # Repli sans FTS5
+        like = f'%{term}%'
+        where.append("(e.first_name LIKE ? OR e.last_name LIKE ? OR e.matricule LIKE ? "
+                     "OR e.first_name || ' ' || e.last_name LIKE ?)")
+        params.extend([like] * 4)
+
+    if status is not None:
+        where.append('e.status = ?')
+        params.append(status)
+    return source, where, params, rank
+
+
+def _select_sql(columns, source, where, order_by):
+    sql = f'SELECT {columns} FROM {source}'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    return sql + ' ORDER BY ' + order_by
+
+
+# --- Recherches ---
+
+def search_courriers(db, mail_type, search_term, limit=None, cancel_event=None):
+    """
+    Recherche dans les courriers d'un type ('arrivee' ou 'depart').
+
+    Couvre numéro d'ordre, expéditeur/destinataire, objet, numéro d'archive,
+    observation et texte des pièces jointes. Résultats classés par pertinence puis par date ; sans saisie,
+    tous les courriers du type sont renvoyés, du plus récent au plus ancien.
+    `cancel_event` (threading.Event) permet d'interrompre la requête.
+    """
+    conn = db.connect()
+    try:
+        conn.cancel_on(cancel_event)
+        source, where, params, rank = _courrier_filter(conn, mail_type, search_term)
+        order_by = 'c.date_arrivee_expedition DESC'
+        if rank is not None:
+            order_by = f'{rank}, {order_by}'
+        sql = _select_sql(MAIL_COLUMNS, source, where, order_by)
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def search_employees(db, search_term='', columns=EMPLOYEE_COLUMNS, status=None, limit=None,
+                     cancel_event=None):
+    """
+    Recherche d'employés partagée par la liste et les sélecteurs.
+
+    Chaque mot saisi est comparé par préfixe, sans tenir compte des accents,
+    au matricule, au prénom et au nom : "ndeye di" trouve "Ndèye DIOUF" comme
+    "DIOUF Ndèye". Le matricule accepte aussi une sous-chaîne ("9723" trouve
+    "519723/E"). Sans saisie, tous les employés sont renvoyés par ordre
+    alphabétique. `status` filtre sur le statut enregistré ; `limit` ne garde
+    que les K meilleurs résultats ; `cancel_event` interrompt la requête.
+    """
+    conn = db.connect()
+    try:
+        conn.cancel_on(cancel_event)
+        source, where, params, rank = _employee_filter(conn, search_term, status)
+        order_by = 'e.last_name, e.first_name'
+        if rank is not None:
+            order_by = f'{rank}, {order_by}'
+        sql = _select_sql(columns, source, where, order_by)
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def search_documents(db, employee_id, search_term='', category=None, cancel_event=None):
+    """
+    Documents d'un employé, filtrés par catégorie et par recherche.
+
+    La recherche porte sur le nom, la catégorie et le texte extrait du
+    fichier par l'indexeur OCR. Résultats du plus récent au plus ancien.
+    """
+    term = (search_term or '').strip()
+    conn = db.connect()
+    try:
+        conn.cancel_on(cancel_event)
+        where, params = ['d.employee_id = ?'], [employee_id]
+        if category is not None:
+            where.append('d.category = ?')
+            params.append(category)
+
+        fts_query = build_fts_query(term) if term else None
+        if fts_query is not None and has_table(conn, 'documents_fts'):
+            where.append('d.id IN (SELECT rowid FROM documents_fts WHERE documents_fts MATCH ?)')
+            params.append(fts_query)
+        elif term:
+            like = f'%{term}%'
+            where.append('(d.name LIKE ? OR d.category LIKE ? OR d.ocr_text LIKE ?)')
+            params.extend([like] * 3)
+
+        sql = _select_sql('d.id, d.category, d.name, d.uploaded_at, d.file_path',
+                          'documents d', where, 'd.uploaded_at DESC')
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+# --- Listes paginées ---
+
+class KeysetPager:
+    """
+    Lecture d'une liste par pages successives, sans OFFSET.
+
+    Les lignes sont triées en SQL sur `order_by` (expressions non nulles, la
+    dernière devant être unique, ex. l'id) ; chaque page reprend après la clé
+    de la dernière ligne lue (`WHERE (k1, k2) > (?, ?)`), ce qui reste rapide
+    quelle que soit la profondeur de défilement. Le total vient d'un COUNT
+    séparé, calculé une seule fois.
+    """
+
+    def __init__(self, db, columns, source, where=(), params=(), order_by=('id',),
+                 descending=False, page_size=200):
+        self.db = db
+        self.columns = columns
+        self.source = source
+        self.where = list(where)
+        self.params = list(params)
+        self.order_by = list(order_by)
+        self.descending = descending
+        self.page_size = page_size
+        self.exhausted = False
+        self._last_key = None
+        self._total = None
+
+    def total(self, cancel_event=None):
+        """Nombre total de lignes de la liste."""
+        if self._total is None:
+            sql = f'SELECT COUNT(*) FROM {self.source}'
+            if self.where:
+                sql += ' WHERE ' + ' AND '.join(self.where)
+            conn = self.db.connect()
+            try:
+                conn.cancel_on(cancel_event)
+                self._total = conn.execute(sql, self.params).fetchone()[0]
+            finally:
+                conn.close()
+        return self._total
+
+    def next_page(self, cancel_event=None):
+        """Lit la page suivante ; retourne [] une fois la liste épuisée."""
+        if self.exhausted:
+            return []
+
+        direction = ' DESC' if self.descending else ''
+        keys = ', '.join(self.order_by)
+        where, params = list(self.where), list(self.params)
+        if self._last_key is not None:
+            marks = ', '.join('?' * len(self._last_key))
+            where.append(f"({keys}) {'<' if self.descending else '>'} ({marks})")
+            params.extend(self._last_key)
+
+        order_by = ', '.join(key + direction for key in self.order_by)
+        sql = _select_sql(f'{self.columns}, {keys}', self.source, where, order_by) + ' LIMIT ?'
+        params.append(self.page_size)
+
+        conn = self.db.connect()
+        try:
+            conn.cancel_on(cancel_event)
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if not rows:
+            return []
+        key_count = len(self.order_by)
+        self._last_key = tuple(rows[-1][-key_count:])
+        return [tuple(row[:-key_count]) for row in rows]
+
+
+def courrier_pager(db, mail_type, search_term='', sort_keys=None, descending=True,
+                   page_size=200):
+    """
+    Liste paginée des courriers d'un type, filtrée comme `search_courriers`.
+
+    `sort_keys` : expressions SQL de tri (colonne cliquée). Par défaut, les
+    résultats d'une recherche sont classés par pertinence et la liste
+    complète par date, du plus récent au plus ancien.
+    """
+    conn = db.connect()
+    try:
+        source, where, params, rank = _courrier_filter(conn, mail_type, search_term)
+    finally:
+        conn.close()
+    if sort_keys:
+        order_by = list(sort_keys)
+    elif rank is not None:
+        order_by, descending = [rank], False
+    else:
+        order_by = ['c.date_arrivee_expedition']
+    return KeysetPager(db, MAIL_COLUMNS, source, where, params, order_by + ['c.id'],
+                       descending=descending, page_size=page_size)
+
+
+def employee_pager(db, search_term='', sort_keys=None, descending=False, status=None,
+                   page_size=200):
+    """Liste paginée des employés, filtrée comme `search_employees`."""
+    conn = db.connect()
+    try:
+        source, where, params, rank = _employee_filter(conn, search_term, status)
+    finally:
+        conn.close()
+    if sort_keys:
+        order_by = list(sort_keys)
+    else:
+        order_by = ['e.last_name', 'e.first_name']
+        if rank is not None:
+            order_by, descending = [rank] + order_by, False
+    return KeysetPager(db, EMPLOYEE_COLUMNS, source, where, params, order_by + ['e.id'],
+                       descending=descending, page_size=page_size)
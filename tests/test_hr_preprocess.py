@@ -0,0 +1,44 @@
+"""Prétraitement OCR : pages blanches et images sans étape active."""
+import os
+import sys
+import tempfile
+import unittest
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hr_preprocess import PreprocessOptions, estimate_skew, preprocess_file, preprocess_image  # noqa: E402
+
+
+class BlankPageTest(unittest.TestCase):
+
+    def test_estimate_skew_on_blank_page(self):
+        self.assertEqual(estimate_skew(Image.new('L', (800, 1000), 255)), 0.0)
+        self.assertEqual(estimate_skew(Image.new('L', (800, 1000), 0)), 0.0)
+
+    def test_preprocess_blank_page_with_default_options(self):
+        result = preprocess_image(Image.new('L', (800, 1000), 255), PreprocessOptions())
+        self.assertEqual(result.size, (800, 1000))
+
+
+class PreprocessFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def test_no_step_and_non_pnm_modes(self):
+        for mode, extension in (('RGB', 'jpg'), ('RGBA', 'png'), ('P', 'png')):
+            source = os.path.join(self.folder.name, f'page_{mode}.{extension}')
+            Image.new(mode, (50, 60)).save(source)
+            for options in (PreprocessOptions(300, False, False, False), PreprocessOptions()):
+                with self.subTest(mode=mode, options=options):
+                    output_path, stats = preprocess_file(source, self.folder.name, options)
+                    with Image.open(output_path) as result:
+                        self.assertEqual(result.size, (50, 60))
+                    self.assertEqual(stats['pixels_before'], 50 * 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
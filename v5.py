@@ -5,22 +5,28 @@ import hashlib
 import os
 import shutil
 import sys # Ajout important
-from datetime import datetime, timedelta
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import calendar
 from PIL import Image, ImageTk
 import subprocess
 import platform
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4,landscape
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
 import json
 import pytesseract
-from pdf2image import convert_from_path
+from hr_db import (Database, MonthLeaves, read_dashboard_stats, resolve_current_statuses,
+                   to_iso_date, to_display_date)
+from hr_schema import apply_migrations
+from hr_search import search_documents, search_employees, courrier_pager, employee_pager
+from hr_ocr import (DEFAULT_DPI, SOURCE_CACHE, SOURCE_OCR, SOURCE_TEXT_LAYER,
+                    AttachmentIndexer, OcrCache, OcrJob, create_ocr_executor,
+                    searchable_copy, write_searchable_pdf)
+from hr_preprocess import PreprocessOptions
+from hr_intake import extract_mail_fields, start_mail_intake
+from hr_reports import (JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, ReportQueue,
+                        build_all_employee_sheets, build_annual_leave, build_employee_sheet,
+                        build_hr_statistics, build_staff_list, leave_period_label)
 
 # --- CODE SPÉCIFIQUE À WINDOWS POUR L'ICÔNE DE LA BARRE DES TÂCHES ---
 # Doit être exécuté avant la création de la fenêtre principale Tk()
@@ -33,6 +39,169 @@ if platform.system() == "Windows":
         pass # Ne fait rien si ctypes n'est pas disponible ou si l'appel échoue
 
 
+# Libellés de l'origine du texte d'une page dans le module OCR
+OCR_SOURCE_LABELS = {
+    SOURCE_TEXT_LAYER: "couche texte",
+    SOURCE_OCR: "OCR",
+    SOURCE_CACHE: "cache",
+}
+
+
+# Libellés de l'état d'un rapport dans le panneau « Rapports »
+REPORT_STATUS_LABELS = {
+    JOB_QUEUED: "En attente",
+    JOB_RUNNING: "En cours",
+    JOB_DONE: "Terminé",
+    JOB_FAILED: "Erreur",
+    JOB_CANCELLED: "Annulé",
+}
+
+
+class DebouncedSearch:
+    """
+    Recherche au fil de la frappe, sans bloquer l'interface.
+
+    `submit(terme)` attend `delay_ms` sans nouvelle frappe, puis exécute
+    `query(terme, cancel_event)` dans un thread de `executor`. Une nouvelle
+    recherche positionne le `cancel_event` de la précédente (les fonctions de
+    hr_search interrompent alors leur requête SQL) et seul le résultat de la
+    dernière recherche est transmis à `apply(resultat)`, sur le thread Tk.
+    """
+
+    def __init__(self, root, executor, query, apply, delay_ms=250, poll_ms=30):
+        self.root = root
+        self.executor = executor
+        self.query = query
+        self.apply = apply
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self._after_id = None
+        self._generation = 0
+        self._cancel_event = None
+
+    def submit(self, search_term):
+        """Planifie une recherche après le délai d'inactivité."""
+        self._cancel_pending()
+        self._after_id = self.root.after(self.delay_ms, self._start, search_term)
+
+    def run_now(self, search_term):
+        """Lance la recherche immédiatement (touche Entrée, bouton Rechercher)."""
+        self._cancel_pending()
+        self._start(search_term)
+
+    def cancel(self):
+        """Abandonne la recherche planifiée et celle en cours."""
+        self._cancel_pending()
+        self._generation += 1
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def _cancel_pending(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _start(self, search_term):
+        self._after_id = None
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self._generation += 1
+        self._cancel_event = threading.Event()
+        future = self.executor.submit(self.query, search_term, self._cancel_event)
+        self._poll(future, self._generation)
+
+    def _poll(self, future, generation):
+        if generation != self._generation:
+            return  # Résultat périmé : une recherche plus récente a été lancée
+        if not future.done():
+            self.root.after(self.poll_ms, self._poll, future, generation)
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Erreur lors de la recherche : {e}")
+            return
+        self.apply(result)
+
+
+class PagedTreeview:
+    """
+    Affichage paginé d'une ttk.Treeview alimentée par un `KeysetPager`.
+
+    Seule la première page est insérée à l'affichage ; les pages suivantes
+    sont lues à mesure que l'utilisateur approche du bas de la liste. Un clic
+    sur un en-tête de `sort_keys` ({colonne: expressions SQL}) relance la
+    liste triée par SQL (second clic : ordre inverse) via `reload()`.
+    `render_rows(lignes)` convertit une page en [(valeurs, tags), ...].
+    """
+
+    def __init__(self, tree, scrollbar, render_rows, reload, sort_keys=None,
+                 count_label=None, count_format="{} élément(s)"):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.render_rows = render_rows
+        self.reload = reload
+        self.count_label = count_label
+        self.count_format = count_format
+        self.pager = None
+        self.sort_column = None
+        self.descending = False
+        self._loading = False
+
+        tree.configure(yscrollcommand=self._on_scroll)
+        for column in (sort_keys or {}):
+            tree.heading(column, command=lambda c=column: self._sort_by(c))
+        self.sort_keys = sort_keys or {}
+
+    def current_sort(self):
+        """(expressions SQL, ordre décroissant) du tri choisi, ou (None, None)."""
+        if self.sort_column is None:
+            return None, None
+        return self.sort_keys[self.sort_column], self.descending
+
+    def show(self, pager, first_page=None, total=None):
+        """
+        Remplace le contenu par `pager`. `first_page` (lignes déjà rendues) et
+        `total` peuvent avoir été préparés en arrière-plan.
+        """
+        if not self.tree.winfo_exists():
+            return
+        self.pager = pager
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        if first_page is None:
+            first_page = self.render_rows(pager.next_page())
+        self._insert(first_page)
+        if self.count_label is not None:
+            self.count_label.config(text=self.count_format.format(
+                pager.total() if total is None else total))
+
+    def _insert(self, rendered_rows):
+        for values, tags in rendered_rows:
+            self.tree.insert('', 'end', values=values, tags=tags)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if (float(last) > 0.9 and not self._loading
+                and self.pager is not None and not self.pager.exhausted):
+            self._loading = True
+            self.tree.after_idle(self._load_more)
+
+    def _load_more(self):
+        try:
+            if self.tree.winfo_exists():
+                self._insert(self.render_rows(self.pager.next_page()))
+        finally:
+            self._loading = False
+
+    def _sort_by(self, column):
+        if self.sort_column == column:
+            self.descending = not self.descending
+        else:
+            self.sort_column, self.descending = column, False
+        self.reload()
+
+
 class HRManagementApp:
 
     def __init__(self):
@@ -119,9 +288,27 @@ class HRManagementApp:
         # Configuration du style
         self.setup_styles()
         
-        # Initialisation de la base de données
+        # Initialisation de la base de données (connexion partagée + PRAGMA)
+        self.db = Database(self.db_path)
         self.init_database()
         
+        # Threads des recherches au fil de la frappe (voir DebouncedSearch)
+        self.search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='search')
+        # Listes paginées des courriers, par type ('arrivee' / 'depart')
+        self.mail_views = {}
+        # Pool de processus OCR (créé à la demande), traitement en cours et cache des résultats
+        self.ocr_executor = None
+        self.ocr_job = None
+        self.ocr_cache = OcrCache(self.db)
+        self.attachment_indexer = None
+        self.ocr_index_poll_id = None
+        self.ocr_file_path = None
+        # Rapports générés en arrière-plan et notifications de fin
+        self.report_queue = ReportQueue()
+        self.notified_report_jobs = set()
+        self.notifications = []
+        self.root.after(500, self._poll_report_jobs)
+        
         # Démarrage avec l'écran de connexion
         self.show_login_screen()
 
@@ -143,173 +330,8 @@ class HRManagementApp:
         style.configure('Custom.Treeview.Heading', background=self.colors['primary_green'], foreground='white', font=('Segoe UI', 10, 'bold'))
 
     def init_database(self):
-        """Initialisation de la base de données SQLite"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Table des utilisateurs
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Table des employés
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                matricule TEXT UNIQUE NOT NULL,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                gender TEXT,
-                birth_date TEXT,
-                birth_place TEXT,
-                address TEXT,
-                phone TEXT,
-                email TEXT,
-                marital_status TEXT,
-                dependents INTEGER DEFAULT 0,
-                social_security TEXT,
-                bank_details TEXT,
-                hire_date TEXT,
-                contract_type TEXT,
-                contract_start TEXT,
-                contract_end TEXT,
-                department TEXT,
-                job_title TEXT,
-                status TEXT DEFAULT 'Active',
-                photo_path TEXT,
-                numero_decision TEXT, -- Champ ajouté
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Table de l'historique de carrière
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS career_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER,
-                act_number TEXT,
-                nature TEXT,
-                subject TEXT,
-                act_date TEXT,
-                effective_date TEXT,
-                document_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees (id)
-            )
-        ''')
-        
-        # Table des documents
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER,
-                category TEXT,
-                name TEXT,
-                file_path TEXT,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees (id)
-            )
-        ''')
-        
-        # Table des types de congés
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS leave_types (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                days_per_year INTEGER DEFAULT 0,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Table des congés
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS leaves (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER,
-                leave_type_id INTEGER,
-                start_date TEXT,
-                end_date TEXT,
-                days_count INTEGER,
-                status TEXT DEFAULT 'Approved',
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees (id),
-                FOREIGN KEY (leave_type_id) REFERENCES leave_types (id)
-            )
-        ''')
-        
-        # Table des courriers - MISE À JOUR avec colonne pour fichiers
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS courriers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                numero_ordre TEXT UNIQUE NOT NULL,
-                type_courrier TEXT NOT NULL,
-                nombre_pieces INTEGER DEFAULT 1,
-                date_arrivee_expedition TEXT NOT NULL,
-                expediteur_destinataire TEXT NOT NULL,
-                objet TEXT NOT NULL,
-                numero_archive TEXT,
-                observation TEXT,
-                file_path TEXT,
-                date_creation TEXT DEFAULT CURRENT_TIMESTAMP,
-                created_by TEXT
-            )
-        ''')
-        # AJOUTEZ CE BLOC DE CODE ICI
-        # Ajouter les colonnes CNI et nationalité si elles n'existent pas
-        try:
-            cursor.execute('ALTER TABLE employees ADD COLUMN cni TEXT')
-            cursor.execute('ALTER TABLE employees ADD COLUMN nationalite TEXT')
-        except sqlite3.OperationalError:
-            # Les colonnes existent déjà
-            pass
-        # Ajouter la colonne file_path si elle n'existe pas déjà
-        try:
-            cursor.execute('ALTER TABLE courriers ADD COLUMN file_path TEXT')
-        except sqlite3.OperationalError:
-            # La colonne existe déjà
-            pass
-        try:
-            cursor.execute('ALTER TABLE employees ADD COLUMN numero_decision TEXT')
-        except sqlite3.OperationalError:
-            # La colonne existe déjà
-            pass
-
-        # Insérer des utilisateurs par défaut
-        try:
-            admin_hash = hashlib.sha256('admin'.encode()).hexdigest()
-            user_hash = hashlib.sha256('user'.encode()).hexdigest()
-            
-            cursor.execute('INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)',
-                          ('admin', admin_hash, 'admin'))
-            cursor.execute('INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)',
-                          ('user', user_hash, 'user'))
-        except sqlite3.IntegrityError:
-            pass
-        
-        # Insérer des types de congés par défaut
-        default_leave_types = [
-            ('Congé Annuel', 30, 'Congé annuel réglementaire'),
-            ('Congé Maladie', 0, 'Congé pour maladie'),
-            ('Congé Maternité', 0, 'Congé de maternité'),
-            ('Congé Paternité', 0, 'Congé de paternité'),
-            ('Permission Exceptionnelle', 0, 'Permission pour événements familiaux')
-        ]
-        
-        for leave_type in default_leave_types:
-            cursor.execute('INSERT OR IGNORE INTO leave_types (name, days_per_year, description) VALUES (?, ?, ?)',
-                          leave_type)
-        
-        conn.commit()
-        conn.close()
+        """Initialisation de la base de données SQLite (migrations versionnées, voir hr_schema)"""
+        apply_migrations(self.db)
         
     def show_login_screen(self):
         """Affichage de l'écran de connexion (design moderne)"""
@@ -428,15 +450,14 @@ class HRManagementApp:
             return
             
         # Vérification dans la base de données
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
         
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        cursor.execute('SELECT id, username, role FROM users WHERE username = ? AND password_hash = ?',
-                      (username, password_hash))
+            password_hash = hashlib.sha256(password.encode()).hexdigest()
+            cursor.execute('SELECT id, username, role FROM users WHERE username = ? AND password_hash = ?',
+                          (username, password_hash))
         
-        user = cursor.fetchone()
-        conn.close()
+            user = cursor.fetchone()
         
         if user:
             self.current_user = {
@@ -589,71 +610,14 @@ class HRManagementApp:
         stats_frame = tk.Frame(self.main_content, bg=self.colors['background'])
         stats_frame.pack(fill='x', padx=20)
         
-        # --- MODIFICATION DE LA LOGIQUE DES STATS ---
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # On récupère tous les employés qui ne sont ni retraités, ni démissionnés, etc.
-        cursor.execute("SELECT id, status FROM employees WHERE status IN ('Active', 'En Congé')")
-        potentially_active_employees = cursor.fetchall()
-
-        total_employees_active_and_on_leave = 0
-        for emp_id, stored_status in potentially_active_employees:
-            # On vérifie leur statut réel
-            current_status = self._get_employee_current_status(emp_id, stored_status)
-            if current_status in ['Active', 'En Congé']:
-                total_employees_active_and_on_leave += 1
-        
-        # --- NOUVELLE LOGIQUE CORRIGÉE POUR LES EMPLOYÉS EN CONGÉ CE MOIS ---
+        # Compteurs précalculés (triggers), lus en une requête
         now = datetime.now()
-        month_start_dt = now.replace(day=1).date()
-        
-        # Trouve le premier jour du mois suivant, puis soustrait un jour pour obtenir la fin du mois actuel
-        next_month_start_dt = (now.replace(day=28) + timedelta(days=4)).replace(day=1)
-        month_end_dt = (next_month_start_dt - timedelta(days=1)).date()
-
-        cursor.execute('''
-            SELECT e.id, l.start_date, l.end_date 
-            FROM employees e
-            JOIN leaves l ON e.id = l.employee_id
-            WHERE l.status = "Approved"
-        ''')
-        all_leaves = cursor.fetchall()
-        
-        employees_on_leave_this_month = set()
-        for emp_id, start_date_str, end_date_str in all_leaves:
-            try:
-                leave_start_dt = datetime.strptime(start_date_str, '%d/%m/%Y').date()
-                leave_end_dt = datetime.strptime(end_date_str, '%d/%m/%Y').date()
-                
-                # Vérifie si la période de congé chevauche le mois actuel
-                # (DébutCongé <= FinMois) ET (FinCongé >= DébutMois)
-                if leave_start_dt <= month_end_dt and leave_end_dt >= month_start_dt:
-                    employees_on_leave_this_month.add(emp_id)
-            except (ValueError, TypeError):
-                # Ignore les congés avec des dates mal formatées
-                continue
-
-        employees_on_leave_month = len(employees_on_leave_this_month)
-        # --- FIN DE LA NOUVELLE LOGIQUE ---
-        
-        # Anniversaires ce mois
-        current_month_str = now.strftime('%m')
-        cursor.execute('''
-            SELECT COUNT(*) FROM employees 
-            WHERE substr(birth_date, 4, 2) = ? AND status = "Active"
-        ''', (current_month_str,))
-        birthdays_this_month = cursor.fetchone()[0]
-        
-        # Total courriers arrivée
-        cursor.execute("SELECT COUNT(*) FROM courriers WHERE type_courrier = 'arrivee'")
-        total_arrival_mail = cursor.fetchone()[0]
-
-        # Total courriers départ
-        cursor.execute("SELECT COUNT(*) FROM courriers WHERE type_courrier = 'depart'")
-        total_departure_mail = cursor.fetchone()[0]
-        
-        conn.close()
+        stats = read_dashboard_stats(self.db, now.date())
+        total_employees_active_and_on_leave = stats.get('employees_active', 0)
+        employees_on_leave_month = stats.get('leaves_period', 0)
+        birthdays_this_month = stats.get(f"birthdays_{now.strftime('%m')}", 0)
+        total_arrival_mail = stats.get('mail_arrivee', 0)
+        total_departure_mail = stats.get('mail_depart', 0)
         
         # Cartes de statistiques mises à jour
         stats_data = [
@@ -820,6 +784,12 @@ class HRManagementApp:
                            command=self.add_new_employee)
         add_btn.pack(side='left', padx=(0, 10))
         
+        employees_count_label = tk.Label(toolbar, text="",
+                                         font=('Segoe UI', 10),
+                                         fg=self.colors['text_light'],
+                                         bg=self.colors['background'])
+        employees_count_label.pack(side='left', padx=(10, 0))
+        
         # Champ de recherche
         search_frame = tk.Frame(toolbar, bg=self.colors['background'])
         search_frame.pack(side='right')
@@ -830,6 +800,10 @@ class HRManagementApp:
                 fg=self.colors['text_dark'],
                 bg=self.colors['background']).pack(side='left', padx=(0, 5))
         
+        if hasattr(self, 'employee_search'):
+            self.employee_search.cancel()
+        self.employee_search = DebouncedSearch(self.root, self.search_executor,
+                                               self._query_employees, self._show_employees)
         self.search_var = tk.StringVar()
         self.search_var.trace('w', self.filter_employees)
         search_entry = tk.Entry(search_frame,
@@ -872,6 +846,23 @@ class HRManagementApp:
         h_scrollbar = ttk.Scrollbar(list_frame, orient='horizontal', command=self.employees_tree.xview)
         self.employees_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
+        self.employees_tree.tag_configure('active', background='#E8F5E8')
+        self.employees_tree.tag_configure('on_leave', background='#FFF3E0')
+        self.employees_tree.tag_configure('inactive', background='#FFEBEE')
+        
+        # Liste paginée : lignes lues par pages au défilement, tri en SQL
+        # (la colonne Statut est triée sur le statut enregistré)
+        self.employees_view = PagedTreeview(
+            self.employees_tree, v_scrollbar, self._render_employee_rows, self.load_employees,
+            sort_keys={
+                'Matricule': ['e.matricule'],
+                'Nom Complet': ['e.first_name', 'e.last_name'],
+                "Corps de l'agent": ["COALESCE(e.job_title, '')"],
+                'Division': ["COALESCE(e.department, '')"],
+                'Statut': ["COALESCE(e.status, '')"],
+            },
+            count_label=employees_count_label, count_format="{} employé(s)")
+        
         # Placement
         self.employees_tree.grid(row=0, column=0, sticky='nsew')
         v_scrollbar.grid(row=0, column=1, sticky='ns')
@@ -909,31 +900,27 @@ class HRManagementApp:
 
     def load_employees(self):
         """Charger la liste des employés avec statut dynamique."""
-        for item in self.employees_tree.get_children():
-            self.employees_tree.delete(item)
-            
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         search_term = self.search_var.get() if hasattr(self, 'search_var') else ""
+        self._show_employees(self._query_employees(search_term))
         
-        query = 'SELECT id, matricule, first_name, last_name, job_title, department, status, photo_path FROM employees'
-        params = []
-        if search_term:
-            query += ' WHERE first_name LIKE ? OR last_name LIKE ? OR matricule LIKE ?'
-            params.extend([f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'])
-        query += ' ORDER BY last_name, first_name'
+    def _query_employees(self, search_term, cancel_event=None):
+        """Prépare la liste des employés : pagination, première page et total (sans toucher à l'interface)."""
+        sort_keys, descending = self.employees_view.current_sort()
+        pager = employee_pager(self.db, search_term, sort_keys, bool(descending))
+        first_page = self._render_employee_rows(pager.next_page(cancel_event))
+        return pager, first_page, pager.total(cancel_event)
         
-        cursor.execute(query, params)
-        employees = cursor.fetchall()
-        conn.close()
+    def _render_employee_rows(self, employees):
+        """Convertit une page d'employés en lignes (valeurs, tags) de la liste."""
+        # Statuts dynamiques résolus en une seule passe pour toute la page
+        current_statuses = resolve_current_statuses(self.db, [emp[0] for emp in employees]) if employees else {}
         
+        rows = []
         for emp in employees:
             emp_id, matricule, first_name, last_name, job_title, department, stored_status, photo_path = emp
             full_name = f"{first_name} {last_name}"
             
-            # --- MODIFICATION ICI : On utilise la fonction de statut dynamique ---
-            current_status = self._get_employee_current_status(emp_id, stored_status)
+            current_status = current_statuses.get(emp_id, stored_status)
             
             photo_indicator = "📷" if photo_path and os.path.exists(photo_path) else "👤"
             
@@ -945,18 +932,18 @@ class HRManagementApp:
             else:
                 tags = ['inactive']
                 
-            self.employees_tree.insert('', 'end',
-                                     values=(photo_indicator, matricule, full_name, 
-                                           job_title or '', department or '', current_status),
-                                     tags=tags)
-        
-        self.employees_tree.tag_configure('active', background='#E8F5E8')
-        self.employees_tree.tag_configure('on_leave', background='#FFF3E0')
-        self.employees_tree.tag_configure('inactive', background='#FFEBEE')
+            rows.append(((photo_indicator, matricule, full_name,
+                          job_title or '', department or '', current_status), tags))
+        return rows
+        
+    def _show_employees(self, result):
+        """Affiche le résultat de `_query_employees` dans la liste des employés."""
+        pager, first_page, total = result
+        self.employees_view.show(pager, first_page, total)
            
     def filter_employees(self, *args):
-        """Filtrer les employés selon la recherche"""
-        self.load_employees()
+        """Filtrer les employés selon la recherche (en arrière-plan, après une pause de frappe)"""
+        self.employee_search.submit(self.search_var.get())
         
     def add_new_employee(self):
         """Ajouter un nouvel employé"""
@@ -974,11 +961,10 @@ class HRManagementApp:
         item = self.employees_tree.item(selection[0])
         matricule = item['values'][1]
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM employees WHERE matricule = ?', (matricule,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM employees WHERE matricule = ?', (matricule,))
+            result = cursor.fetchone()
         
         if result:
             self.current_employee_id = result[0]
@@ -998,27 +984,26 @@ class HRManagementApp:
         if messagebox.askyesno("Confirmation", 
                               f"Êtes-vous sûr de vouloir supprimer l'employé {full_name} (Matricule: {matricule}) ?\n\nCette action est irréversible."):
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
             
-            # Récupérer l'ID
-            cursor.execute('SELECT id FROM employees WHERE matricule = ?', (matricule,))
-            result = cursor.fetchone()
+                # Récupérer l'ID
+                cursor.execute('SELECT id FROM employees WHERE matricule = ?', (matricule,))
+                result = cursor.fetchone()
             
-            if result:
-                emp_id = result[0]
+                if result:
+                    emp_id = result[0]
                 
-                # Supprimer les données liées
-                cursor.execute('DELETE FROM career_history WHERE employee_id = ?', (emp_id,))
-                cursor.execute('DELETE FROM documents WHERE employee_id = ?', (emp_id,))
-                cursor.execute('DELETE FROM leaves WHERE employee_id = ?', (emp_id,))
-                cursor.execute('DELETE FROM employees WHERE id = ?', (emp_id,))
+                    # Supprimer les données liées
+                    cursor.execute('DELETE FROM career_history WHERE employee_id = ?', (emp_id,))
+                    cursor.execute('DELETE FROM documents WHERE employee_id = ?', (emp_id,))
+                    cursor.execute('DELETE FROM leaves WHERE employee_id = ?', (emp_id,))
+                    cursor.execute('DELETE FROM employees WHERE id = ?', (emp_id,))
                 
-                conn.commit()
-                messagebox.showinfo("Succès", "Employé supprimé avec succès")
-                self.load_employees()
+                    conn.commit()
+                    messagebox.showinfo("Succès", "Employé supprimé avec succès")
+                    self.load_employees()
             
-            conn.close()
             
     def open_employee_file(self, event=None):
         """Ouvrir le dossier complet d'un employé"""
@@ -1030,11 +1015,10 @@ class HRManagementApp:
         item = self.employees_tree.item(selection[0])
         matricule = item['values'][1]
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM employees WHERE matricule = ?', (matricule,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM employees WHERE matricule = ?', (matricule,))
+            result = cursor.fetchone()
         
         if result:
             self.current_employee_id = result[0]
@@ -1274,19 +1258,21 @@ class HRManagementApp:
         if not self.current_employee_id:
             return
             
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row # Permet d'accéder aux colonnes par leur nom
-        cursor = conn.cursor()
+        with self.db.connect() as conn:
+            conn.row_factory = sqlite3.Row # Permet d'accéder aux colonnes par leur nom
+            cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM employees WHERE id = ?', (self.current_employee_id,))
-        employee_data = cursor.fetchone()
-        conn.close()
+            cursor.execute('SELECT * FROM employees WHERE id = ?', (self.current_employee_id,))
+            employee_data = cursor.fetchone()
         
         if employee_data:
             # 1. Remplir les champs standards (Entry, Combobox)
+            date_fields = ('birth_date', 'hire_date', 'contract_start', 'contract_end')
             for field_name, var in self.form_vars.items():
                 if field_name in employee_data.keys() and field_name not in self.form_text_widgets:
                     value = employee_data[field_name] or ''
+                    if field_name in date_fields:
+                        value = to_display_date(value)
                     var.set(value)
 
             # 2. Remplir manuellement les champs Text (Adresse et RIB)
@@ -1322,7 +1308,7 @@ class HRManagementApp:
                 return
                 
         # Vérifier l'unicité du matricule
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         if self.current_employee_id:
@@ -1355,6 +1341,8 @@ class HRManagementApp:
             # Sinon (c'est un Entry ou Combobox)
             else:
                 value = self.form_vars[field].get().strip()
+                if field in date_fields:
+                    value = to_iso_date(value)
                 data.append(value if value else None)
             
         try:
@@ -1412,12 +1400,11 @@ class HRManagementApp:
         details_window.transient(self.root)
         
         # Récupérer les données de l'employé en utilisant les noms de colonnes
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row # Important: permet d'accéder aux colonnes par leur nom
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM employees WHERE id = ?', (self.current_employee_id,))
-        employee = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            conn.row_factory = sqlite3.Row # Important: permet d'accéder aux colonnes par leur nom
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM employees WHERE id = ?', (self.current_employee_id,))
+            employee = cursor.fetchone()
         
         if not employee:
             messagebox.showerror("Erreur", "Employé non trouvé")
@@ -1506,7 +1493,7 @@ class HRManagementApp:
             ("CNI:", employee['cni']),
             ("Nationalité:", employee['nationalite']),
             ("Genre:", employee['gender']),
-            ("Date de Naissance:", employee['birth_date']),
+            ("Date de Naissance:", to_display_date(employee['birth_date'])),
             ("Lieu de Naissance:", employee['birth_place']),
             ("Adresse:", employee['address']),
             ("Téléphone:", employee['phone']),
@@ -1544,11 +1531,11 @@ class HRManagementApp:
         contract_frame.pack(fill='x', padx=20, pady=10)
         
         contract_fields = [
-            ("Date d'Embauche:", employee['hire_date']),
+            ("Date d'Embauche:", to_display_date(employee['hire_date'])),
             ("Type d'engagement:", employee['contract_type']),
             ("Numéro décision:", employee['numero_decision']), # <-- CORRIGÉ
-            ("Début de Contrat:", employee['contract_start']),
-            ("Fin de Contrat:", employee['contract_end']),
+            ("Début de Contrat:", to_display_date(employee['contract_start'])),
+            ("Fin de Contrat:", to_display_date(employee['contract_end'])),
             ("Division:", employee['department']),
             ("Corps de l'agent:", employee['job_title']),
             ("Statut:", employee['status'])
@@ -1591,12 +1578,11 @@ class HRManagementApp:
                 shutil.copy2(file_path, dest_path)
                 
                 # Mettre à jour la base de données
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute('UPDATE employees SET photo_path = ? WHERE id = ?',
-                              (dest_path, self.current_employee_id))
-                conn.commit()
-                conn.close()
+                with self.db.connect() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('UPDATE employees SET photo_path = ? WHERE id = ?',
+                                  (dest_path, self.current_employee_id))
+                    conn.commit()
                 
                 # Afficher la photo
                 self.display_photo(photo_label, dest_path)
@@ -1852,7 +1838,7 @@ class HRManagementApp:
                 return
                 
         # Enregistrer en base
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         try:
@@ -1865,8 +1851,8 @@ class HRManagementApp:
                 act_vars['act_number'].get(),
                 act_vars['nature'].get(),
                 subject,
-                act_vars['act_date'].get(),
-                act_vars['effective_date'].get() or None,
+                to_iso_date(act_vars['act_date'].get()),
+                to_iso_date(act_vars['effective_date'].get()),
                 doc_path
             ))
             
@@ -1890,17 +1876,16 @@ class HRManagementApp:
             self.career_tree.delete(item)
             
         # Charger depuis la base
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT act_number, nature, subject, act_date, effective_date, document_path
-            FROM career_history 
-            WHERE employee_id = ?
-            ORDER BY act_date DESC
-        ''', (self.current_employee_id,))
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT act_number, nature, subject, act_date, effective_date, document_path
+                FROM career_history 
+                WHERE employee_id = ?
+                ORDER BY act_date DESC
+            ''', (self.current_employee_id,))
         
-        acts = cursor.fetchall()
-        conn.close()
+            acts = cursor.fetchall()
         
         for act in acts:
             act_number, nature, subject, act_date, effective_date, document_path = act
@@ -1910,8 +1895,8 @@ class HRManagementApp:
                 act_number,
                 nature,
                 subject[:30] + "..." if len(subject) > 30 else subject,
-                act_date,
-                effective_date or "",
+                to_display_date(act_date),
+                to_display_date(effective_date) or "",
                 doc_indicator
             ))
             
@@ -1943,6 +1928,17 @@ class HRManagementApp:
                            command=lambda cat=category: self.load_documents(category=cat))
             btn.pack(side='left', padx=3)
 
+        # Recherche dans le nom, la catégorie et le texte des fichiers (indexeur OCR)
+        self.docs_category = "Tous"
+        self.docs_search_var = tk.StringVar()
+        docs_search = DebouncedSearch(
+            self.root, self.search_executor,
+            lambda term, cancel_event: search_documents(
+                self.db, self.current_employee_id, term,
+                self._documents_category_filter(), cancel_event),
+            self._fill_documents)
+        self.docs_search_var.trace('w', lambda *args: docs_search.submit(self.docs_search_var.get()))
+
         add_doc_btn = tk.Button(toolbar,
                                text="📁 Ajouter Document",
                                font=('Segoe UI', 11, 'bold'),
@@ -1956,6 +1952,11 @@ class HRManagementApp:
                                command=self.add_document)
         add_doc_btn.pack(side='right')
 
+        tk.Entry(toolbar, textvariable=self.docs_search_var, font=('Segoe UI', 11),
+                 width=22, relief='solid', bd=1).pack(side='right', padx=(0, 10))
+        tk.Label(toolbar, text="🔍", font=('Segoe UI', 11), fg=self.colors['text_dark'],
+                 bg=self.colors['background']).pack(side='right')
+
         # --- Liste des documents (Treeview) ---
         tree_container = tk.Frame(docs_frame)
         tree_container.pack(fill='both', expand=True, padx=20, pady=(0, 20))
@@ -2048,53 +2049,47 @@ class HRManagementApp:
             dest_path = os.path.join(self.documents_folder, filename)
             shutil.copy2(file_path, dest_path)
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
             
-            if doc_id: # Mode mise à jour
-                # On ne met à jour que les métadonnées, pas le fichier lui-même pour l'instant
-                cursor.execute('''
-                    UPDATE documents SET name = ?, category = ? WHERE id = ?
-                ''', (doc_name, category, doc_id))
-                message = "Informations du document modifiées avec succès."
-            else: # Mode création
-                cursor.execute('''
-                    INSERT INTO documents (employee_id, category, name, file_path)
-                    VALUES (?, ?, ?, ?)
-                ''', (self.current_employee_id, category, doc_name, dest_path))
-                message = "Document ajouté avec succès."
+                if doc_id: # Mode mise à jour
+                    # On ne met à jour que les métadonnées, pas le fichier lui-même pour l'instant
+                    cursor.execute('''
+                        UPDATE documents SET name = ?, category = ? WHERE id = ?
+                    ''', (doc_name, category, doc_id))
+                    message = "Informations du document modifiées avec succès."
+                else: # Mode création
+                    cursor.execute('''
+                        INSERT INTO documents (employee_id, category, name, file_path)
+                        VALUES (?, ?, ?, ?)
+                    ''', (self.current_employee_id, category, doc_name, dest_path))
+                    message = "Document ajouté avec succès."
 
-            conn.commit()
-            conn.close()
+                conn.commit()
             messagebox.showinfo("Succès", message)
             self.load_documents()
 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'enregistrement du document: {e}")
 
-    def load_documents(self, category="Tous"):
-        """Charger la liste des documents en filtrant par catégorie."""
+    def load_documents(self, category=None):
+        """Charger la liste des documents en filtrant par catégorie et par recherche."""
         if not hasattr(self, 'docs_tree'):
             return
+        if category is not None:
+            self.docs_category = category
 
-        for item in self.docs_tree.get_children():
-            self.docs_tree.delete(item)
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        query = 'SELECT id, category, name, uploaded_at, file_path FROM documents WHERE employee_id = ?'
-        params = (self.current_employee_id,)
+        documents = search_documents(self.db, self.current_employee_id,
+                                     self.docs_search_var.get(),
+                                     self._documents_category_filter())
+        self._fill_documents(documents)
 
-        if category != "Tous":
-            query += ' AND category = ?'
-            params = (self.current_employee_id, category)
-        
-        query += ' ORDER BY uploaded_at DESC'
+    def _documents_category_filter(self):
+        return None if self.docs_category == "Tous" else self.docs_category
 
-        cursor.execute(query, params)
-        documents = cursor.fetchall()
-        conn.close()
+    def _fill_documents(self, documents):
+        for item in self.docs_tree.get_children():
+            self.docs_tree.delete(item)
 
         for doc in documents:
             doc_id, doc_category, name, uploaded_at, file_path = doc
@@ -2119,11 +2114,10 @@ class HRManagementApp:
             
         doc_id = int(selection[0])
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT file_path FROM documents WHERE id = ?', (doc_id,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT file_path FROM documents WHERE id = ?', (doc_id,))
+            result = cursor.fetchone()
         
         if result and os.path.exists(result[0]):
             try:
@@ -2146,11 +2140,10 @@ class HRManagementApp:
         doc_id = int(selection[0])
 
         # Récupérer les informations actuelles
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT name, category FROM documents WHERE id = ?', (doc_id,))
-        current_data = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, category FROM documents WHERE id = ?', (doc_id,))
+            current_data = cursor.fetchone()
 
         if not current_data:
             messagebox.showerror("Erreur", "Document non trouvé dans la base de données.")
@@ -2187,11 +2180,10 @@ class HRManagementApp:
             
             # Mettre à jour la base de données
             try:
-                conn_update = sqlite3.connect(self.db_path)
-                cursor_update = conn_update.cursor()
-                cursor_update.execute('UPDATE documents SET name = ?, category = ? WHERE id = ?', (new_name, new_category, doc_id))
-                conn_update.commit()
-                conn_update.close()
+                with self.db.connect() as conn_update:
+                    cursor_update = conn_update.cursor()
+                    cursor_update.execute('UPDATE documents SET name = ?, category = ? WHERE id = ?', (new_name, new_category, doc_id))
+                    conn_update.commit()
                 messagebox.showinfo("Succès", "Document mis à jour.")
                 self.load_documents()
             except sqlite3.Error as e:
@@ -2211,18 +2203,17 @@ class HRManagementApp:
         
         if messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir supprimer ce document ?\nLe fichier associé sera également effacé définitivement."):
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
+                with self.db.connect() as conn:
+                    cursor = conn.cursor()
                 
-                # 1. Récupérer le chemin du fichier avant de supprimer l'enregistrement
-                cursor.execute('SELECT file_path FROM documents WHERE id = ?', (doc_id,))
-                result = cursor.fetchone()
-                file_path_to_delete = result[0] if result else None
+                    # 1. Récupérer le chemin du fichier avant de supprimer l'enregistrement
+                    cursor.execute('SELECT file_path FROM documents WHERE id = ?', (doc_id,))
+                    result = cursor.fetchone()
+                    file_path_to_delete = result[0] if result else None
                 
-                # 2. Supprimer l'enregistrement de la base de données
-                cursor.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
-                conn.commit()
-                conn.close()
+                    # 2. Supprimer l'enregistrement de la base de données
+                    cursor.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+                    conn.commit()
                 
                 # 3. Supprimer le fichier physique s'il existe
                 if file_path_to_delete and os.path.exists(file_path_to_delete):
@@ -2295,26 +2286,25 @@ class HRManagementApp:
             self.leaves_tree.delete(item)
             
         # Charger depuis la base
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT lt.name, l.start_date, l.end_date, l.days_count, l.status, l.notes
-            FROM leaves l
-            JOIN leave_types lt ON l.leave_type_id = lt.id
-            WHERE l.employee_id = ?
-            ORDER BY l.start_date DESC
-        ''', (self.current_employee_id,))
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT lt.name, l.start_date, l.end_date, l.days_count, l.status, l.notes
+                FROM leaves l
+                JOIN leave_types lt ON l.leave_type_id = lt.id
+                WHERE l.employee_id = ?
+                ORDER BY l.start_date DESC
+            ''', (self.current_employee_id,))
         
-        leaves = cursor.fetchall()
-        conn.close()
+            leaves = cursor.fetchall()
         
         for leave in leaves:
             leave_type, start_date, end_date, days_count, status, notes = leave
             
             self.leaves_tree.insert('', 'end', values=(
                 leave_type,
-                start_date,
-                end_date,
+                to_display_date(start_date),
+                to_display_date(end_date),
                 f"{days_count} jour(s)",
                 status,
                 notes or ""
@@ -2471,27 +2461,28 @@ class HRManagementApp:
             for item in tree.get_children():
                 tree.delete(item)
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
         
-        base_query = '''
-            SELECT l.id, l.start_date, l.end_date, e.first_name, e.last_name, e.job_title, e.department
-            FROM leaves l
-            JOIN employees e ON l.employee_id = e.id
-            WHERE strftime('%Y', date(substr(l.start_date, 7, 4) || '-' || substr(l.start_date, 4, 2) || '-' || substr(l.start_date, 1, 2))) = ?
-            AND l.status = 'Approved'
-        '''
-        params = [year]
+            base_query = '''
+                SELECT l.id, l.start_date, l.end_date, e.first_name, e.last_name, e.job_title, e.department
+                FROM leaves l
+                JOIN employees e ON l.employee_id = e.id
+                WHERE l.status = 'Approved' AND l.start_date >= ? AND l.start_date < ?
+            '''
+            try:
+                params = [f"{int(year):04d}-01-01", f"{int(year) + 1:04d}-01-01"]
+            except ValueError:
+                params = [f"{datetime.now().year}-01-01", f"{datetime.now().year + 1}-01-01"]
 
-        if search_term:
-            base_query += " AND (e.first_name LIKE ? OR e.last_name LIKE ? OR (e.first_name || ' ' || e.last_name) LIKE ?)"
-            params.extend([f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'])
+            if search_term:
+                base_query += " AND (e.first_name LIKE ? OR e.last_name LIKE ? OR (e.first_name || ' ' || e.last_name) LIKE ?)"
+                params.extend([f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'])
 
-        base_query += " ORDER BY l.start_date"
+            base_query += " ORDER BY l.start_date"
         
-        cursor.execute(base_query, params)
-        all_leaves = cursor.fetchall()
-        conn.close()
+            cursor.execute(base_query, params)
+            all_leaves = cursor.fetchall()
 
         if not all_leaves and search_term:
             messagebox.showinfo("Recherche", f"Aucun congé trouvé pour '{search_term}' en {year}.")
@@ -2505,7 +2496,7 @@ class HRManagementApp:
                 if not isinstance(leave_id, int):
                     continue
 
-                start_dt = datetime.strptime(start_date_str, '%d/%m/%Y')
+                start_dt = datetime.strptime(start_date_str, '%Y-%m-%d')
                 month_index = start_dt.month - 1
 
                 if 0 <= month_index < len(self.monthly_leave_trees):
@@ -2518,8 +2509,8 @@ class HRManagementApp:
                         f"{first_name} {last_name}",
                         job_title or '',
                         department or '',
-                        start_date_str,
-                        end_date_str
+                        to_display_date(start_date_str),
+                        to_display_date(end_date_str)
                     ))
             except (ValueError, IndexError, TypeError) as e:
                 print(f"Avertissement : Impossible d'afficher un congé. Données invalides. Erreur: {e}")
@@ -2589,11 +2580,10 @@ class HRManagementApp:
         
         if messagebox.askyesno("Confirmation", f"Êtes-vous sûr de vouloir supprimer ce congé (ID: {leave_id}) ?\nCette action est irréversible."):
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM leaves WHERE id = ?", (leave_id,))
-                conn.commit()
-                conn.close()
+                with self.db.connect() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("DELETE FROM leaves WHERE id = ?", (leave_id,))
+                    conn.commit()
                 
                 messagebox.showinfo("Succès", "Le congé a été supprimé avec succès.")
                 self.display_yearly_leave_plan()
@@ -2628,7 +2618,7 @@ class HRManagementApp:
         employee_listbox = tk.Listbox(listbox_frame, font=('Segoe UI', 11), width=45, height=6)
         
         # Lier la fonction de mise à jour au champ de saisie
-        self.leave_vars['employee'].trace('w', lambda name, index, mode, sv=self.leave_vars['employee'], lb=employee_listbox: self._update_employee_listbox(lb, sv))
+        self._bind_employee_picker(employee_listbox, self.leave_vars['employee'])
         
         # Fonction pour afficher la Listbox lors de la saisie
         def show_listbox(event):
@@ -2641,41 +2631,40 @@ class HRManagementApp:
         employee_listbox.pack(fill='both', expand=True)
         # --- FIN CHAMP EMPLOYÉ RECHERCHABLE ---
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
 
-        # --- AUTRES CHAMPS (Type de congé, dates, etc.) ---
-        tk.Label(form_frame, text="Type de Congé:", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=2, column=0, sticky='w', pady=5)
-        cursor.execute('SELECT name FROM leave_types ORDER BY name')
-        leave_types = [row[0] for row in cursor.fetchall()]
-        leave_type_combo = ttk.Combobox(form_frame, textvariable=self.leave_vars['leave_type'], values=leave_types, font=('Segoe UI', 11), width=42, state='readonly')
-        leave_type_combo.grid(row=2, column=1, sticky='w', padx=(10, 0), pady=5)
+            # --- AUTRES CHAMPS (Type de congé, dates, etc.) ---
+            tk.Label(form_frame, text="Type de Congé:", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=2, column=0, sticky='w', pady=5)
+            cursor.execute('SELECT name FROM leave_types ORDER BY name')
+            leave_types = [row[0] for row in cursor.fetchall()]
+            leave_type_combo = ttk.Combobox(form_frame, textvariable=self.leave_vars['leave_type'], values=leave_types, font=('Segoe UI', 11), width=42, state='readonly')
+            leave_type_combo.grid(row=2, column=1, sticky='w', padx=(10, 0), pady=5)
 
-        tk.Label(form_frame, text="Date de Début (jj/mm/aaaa):", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=3, column=0, sticky='w', pady=5)
-        tk.Entry(form_frame, textvariable=self.leave_vars['start_date'], font=('Segoe UI', 11), width=45).grid(row=3, column=1, sticky='w', padx=(10, 0), pady=5)
+            tk.Label(form_frame, text="Date de Début (jj/mm/aaaa):", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=3, column=0, sticky='w', pady=5)
+            tk.Entry(form_frame, textvariable=self.leave_vars['start_date'], font=('Segoe UI', 11), width=45).grid(row=3, column=1, sticky='w', padx=(10, 0), pady=5)
 
-        tk.Label(form_frame, text="Date de Fin (jj/mm/aaaa):", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=4, column=0, sticky='w', pady=5)
-        tk.Entry(form_frame, textvariable=self.leave_vars['end_date'], font=('Segoe UI', 11), width=45).grid(row=4, column=1, sticky='w', padx=(10, 0), pady=5)
+            tk.Label(form_frame, text="Date de Fin (jj/mm/aaaa):", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=4, column=0, sticky='w', pady=5)
+            tk.Entry(form_frame, textvariable=self.leave_vars['end_date'], font=('Segoe UI', 11), width=45).grid(row=4, column=1, sticky='w', padx=(10, 0), pady=5)
 
-        tk.Label(form_frame, text="Notes:", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=5, column=0, sticky='w', pady=5)
-        tk.Entry(form_frame, textvariable=self.leave_vars['notes'], font=('Segoe UI', 11), width=45).grid(row=5, column=1, sticky='w', padx=(10, 0), pady=5)
+            tk.Label(form_frame, text="Notes:", font=('Segoe UI', 11), bg=self.colors['background']).grid(row=5, column=0, sticky='w', pady=5)
+            tk.Entry(form_frame, textvariable=self.leave_vars['notes'], font=('Segoe UI', 11), width=45).grid(row=5, column=1, sticky='w', padx=(10, 0), pady=5)
+        
+            if leave_id is not None:
+                cursor.execute('''
+                    SELECT l.employee_id, lt.name, l.start_date, l.end_date, l.notes, e.first_name, e.last_name
+                    FROM leaves l JOIN leave_types lt ON l.leave_type_id = lt.id JOIN employees e ON l.employee_id = e.id
+                    WHERE l.id = ?
+                ''', (leave_id,))
+                data = cursor.fetchone()
+                if data:
+                    employee_id, leave_type, start_date, end_date, notes, first_name, last_name = data
+                    self.leave_vars['employee'].set(f"{first_name} {last_name} (ID: {employee_id})")
+                    self.leave_vars['leave_type'].set(leave_type)
+                    self.leave_vars['start_date'].set(to_display_date(start_date))
+                    self.leave_vars['end_date'].set(to_display_date(end_date))
+                    self.leave_vars['notes'].set(notes or '')
         
-        if leave_id is not None:
-            cursor.execute('''
-                SELECT l.employee_id, lt.name, l.start_date, l.end_date, l.notes, e.first_name, e.last_name
-                FROM leaves l JOIN leave_types lt ON l.leave_type_id = lt.id JOIN employees e ON l.employee_id = e.id
-                WHERE l.id = ?
-            ''', (leave_id,))
-            data = cursor.fetchone()
-            if data:
-                employee_id, leave_type, start_date, end_date, notes, first_name, last_name = data
-                self.leave_vars['employee'].set(f"{first_name} {last_name} (ID: {employee_id})")
-                self.leave_vars['leave_type'].set(leave_type)
-                self.leave_vars['start_date'].set(start_date)
-                self.leave_vars['end_date'].set(end_date)
-                self.leave_vars['notes'].set(notes or '')
-        
-        conn.close()
 
         buttons_frame = tk.Frame(form_frame, bg=self.colors['background'])
         buttons_frame.grid(row=6, column=0, columnspan=2, pady=20)
@@ -2715,7 +2704,7 @@ class HRManagementApp:
             messagebox.showerror("Erreur", "Employé invalide", parent=form_window)
             return
             
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM leave_types WHERE name = ?', (self.leave_vars['leave_type'].get(),))
         leave_type_result = cursor.fetchone()
@@ -2735,13 +2724,13 @@ class HRManagementApp:
                         employee_id = ?, leave_type_id = ?, start_date = ?,
                         end_date = ?, days_count = ?, notes = ?
                     WHERE id = ?
-                ''', (employee_id, leave_type_id, start_date, end_date, days_count, notes, leave_id))
+                ''', (employee_id, leave_type_id, start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d'), days_count, notes, leave_id))
                 message = "Congé modifié avec succès."
             else:
                 cursor.execute('''
                     INSERT INTO leaves (employee_id, leave_type_id, start_date, end_date, days_count, notes)
                     VALUES (?, ?, ?, ?, ?, ?)
-                ''', (employee_id, leave_type_id, start_date, end_date, days_count, notes))
+                ''', (employee_id, leave_type_id, start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d'), days_count, notes))
                 message = f"Congé enregistré avec succès ({days_count} jour(s))."
             
             conn.commit()
@@ -2812,42 +2801,9 @@ class HRManagementApp:
             label = tk.Label(self.calendar_frame, text=day, font=('Segoe UI', 11, 'bold'), fg='white', bg=self.colors['primary_green'], width=12, height=2)
             label.grid(row=0, column=i, padx=1, pady=1, sticky='nsew')
             
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT l.start_date, l.end_date, e.first_name, e.last_name
-            FROM leaves l
-            JOIN employees e ON l.employee_id = e.id
-            WHERE l.status = 'Approved'
-        ''')
-        leaves_data = cursor.fetchall()
-        conn.close()
+        # Congés chevauchant le mois affiché uniquement, comptés par jour
+        month_leaves = MonthLeaves(self.db, self.current_year, self.current_month)
         
-        leaves_by_date = {}
-        today = datetime.now().date() # Obtenir la date d'aujourd'hui une seule fois
-
-        for start_str, end_str, first_name, last_name in leaves_data:
-            try:
-                start_dt = datetime.strptime(start_str, '%d/%m/%Y').date()
-                end_dt = datetime.strptime(end_str, '%d/%m/%Y').date()
-                
-                current_dt = start_dt
-                while current_dt <= end_dt:
-                    if current_dt.month == self.current_month and current_dt.year == self.current_year:
-                        day_key = current_dt.day
-                        if day_key not in leaves_by_date:
-                            leaves_by_date[day_key] = []
-                        
-                        # On stocke le nom et si le congé est toujours en cours
-                        leaves_by_date[day_key].append({
-                            'name': f"{first_name} {last_name}",
-                            'is_active': end_dt >= today 
-                        })
-                    current_dt += timedelta(days=1)
-            except (ValueError, TypeError):
-                continue
-                
         for week_num, week in enumerate(cal):
             for day_num, day in enumerate(week):
                 if day == 0:
@@ -2856,30 +2812,26 @@ class HRManagementApp:
                     bg_color = self.colors['white']
                     text_color = self.colors['text_dark']
                     day_text = str(day)
+                    employees_count = month_leaves.count(day)
                     
-                    if day in leaves_by_date:
-                        # NOUVELLE LOGIQUE : Vérifier s'il y a au moins un congé actif ce jour-là
-                        has_active_leave = any(leave['is_active'] for leave in leaves_by_date[day])
-                        
-                        if has_active_leave:
+                    if employees_count:
+                        # Vérifier s'il y a au moins un congé actif ce jour-là
+                        if month_leaves.has_active(day):
                             bg_color = self.colors['light_green']
                             text_color = 'white'
                         
-                        # L'affichage du nombre d'employés reste le même
-                        employees_on_leave = [leave['name'] for leave in leaves_by_date[day]]
-                        employees_count = len(employees_on_leave)
-                        
                         if employees_count > 1:
                             day_text += f"\n({employees_count})"
                         else:
-                            day_text += f"\n{employees_on_leave[0].split()[0]}"
+                            day_text += f"\n{month_leaves.names(day)[0].split()[0]}"
                             
                     label = tk.Label(self.calendar_frame, text=day_text, font=('Segoe UI', 10), fg=text_color, bg=bg_color, width=12, height=4, relief='solid', bd=1, justify='center')
                     
-                    if day in leaves_by_date:
-                        all_employees_on_leave = [leave['name'] for leave in leaves_by_date[day]]
-                        tooltip_text = f"Congés le {day:02d}/{self.current_month:02d}/{self.current_year}:\n" + "\n".join(all_employees_on_leave)
-                        self.create_tooltip(label, tooltip_text)
+                    if employees_count:
+                        # Liste des noms construite au survol seulement
+                        self.create_tooltip(label, lambda day=day: (
+                            f"Congés le {day:02d}/{month_leaves.month:02d}/{month_leaves.year}:\n"
+                            + "\n".join(month_leaves.names(day))))
                         
                 label.grid(row=week_num+1, column=day_num, padx=1, pady=1, sticky='nsew')
                 
@@ -2889,14 +2841,14 @@ class HRManagementApp:
             self.calendar_frame.grid_rowconfigure(i, weight=1)
 
     def create_tooltip(self, widget, text):
-        """Créer un tooltip pour un widget"""
+        """Créer un tooltip pour un widget (`text` peut être une fonction, appelée au survol)"""
         tooltip = None
         def on_enter(event):
             nonlocal tooltip
             tooltip = tk.Toplevel(widget)
             tooltip.wm_overrideredirect(True)
             tooltip.wm_geometry(f"+{event.x_root+10}+{event.y_root+10}")
-            label = tk.Label(tooltip, text=text, font=('Segoe UI', 9), bg='#FFFFCC', fg=self.colors['text_dark'], relief='solid', bd=1, padx=5, pady=3)
+            label = tk.Label(tooltip, text=text() if callable(text) else text, font=('Segoe UI', 9), bg='#FFFFCC', fg=self.colors['text_dark'], relief='solid', bd=1, padx=5, pady=3)
             label.pack()
             
         def on_leave(event):
@@ -2967,7 +2919,7 @@ class HRManagementApp:
             messagebox.showerror("Erreur", "Le nombre de jours doit être un entier.")
             return
             
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         try:
             cursor.execute('INSERT INTO leave_types (name, days_per_year, description) VALUES (?, ?, ?)', (name, days, description))
@@ -2991,13 +2943,12 @@ class HRManagementApp:
         for item in self.leave_types_tree.get_children():
             self.leave_types_tree.delete(item)
             
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT name, days_per_year, description FROM leave_types ORDER BY name')
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, days_per_year, description FROM leave_types ORDER BY name')
         
-        for name, days, desc in cursor.fetchall():
-            self.leave_types_tree.insert('', 'end', values=(name, days, desc or ""))
-        conn.close()
+            for name, days, desc in cursor.fetchall():
+                self.leave_types_tree.insert('', 'end', values=(name, days, desc or ""))
 
     def show_mail_module(self):
         """Module de gestion des courriers - MISE À JOUR avec upload de fichiers"""
@@ -3076,8 +3027,16 @@ class HRManagementApp:
                                relief='solid', bd=1)
         search_entry.pack(side='left', padx=(0, 10))
         
+        # Recherche au fil de la frappe, exécutée en arrière-plan
+        mail_search = DebouncedSearch(
+            self.root, self.search_executor,
+            lambda term, cancel_event: self._query_mail_list(mail_type, term, cancel_event),
+            lambda result: self.mail_views[mail_type].show(*result))
+        search_var.trace('w', lambda *args: mail_search.submit(search_var.get()))
+        search_entry.bind('<Return>', lambda e: mail_search.run_now(search_var.get()))
+        
         search_btn = tk.Button(search_frame, text="Rechercher",
-                              command=lambda: self.search_mail(mail_type, search_var.get()),
+                              command=lambda: mail_search.run_now(search_var.get()),
                               font=('Segoe UI', 10),
                               bg=self.colors['primary_green'],
                               fg='white',
@@ -3088,6 +3047,12 @@ class HRManagementApp:
                               cursor='hand2')
         search_btn.pack(side='left')
         
+        count_label = tk.Label(search_frame, text="",
+                               font=('Segoe UI', 10),
+                               fg=self.colors['text_light'],
+                               bg=self.colors['background'])
+        count_label.pack(side='right')
+        
         # Treeview pour la liste des courriers - AJOUT de la colonne Fichier
         columns = ('N° Ordre', 'Nb Pièces', 'Date', 'Expéditeur/Destinataire', 'Objet', 'N° Archive', 'Fichier')
         
@@ -3121,6 +3086,20 @@ class HRManagementApp:
         tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
         
+        # Liste paginée : lignes lues par pages au défilement, tri en SQL
+        self.mail_views[mail_type] = PagedTreeview(
+            tree, scrollbar, self._render_mail_rows,
+            lambda: mail_search.run_now(search_var.get()),
+            sort_keys={
+                'N° Ordre': ['c.numero_ordre'],
+                'Nb Pièces': ['COALESCE(c.nombre_pieces, 0)'],
+                'Date': ['c.date_arrivee_expedition'],
+                'Expéditeur/Destinataire': ['c.expediteur_destinataire'],
+                'Objet': ['c.objet'],
+                'N° Archive': ["COALESCE(c.numero_archive, '')"],
+            },
+            count_label=count_label, count_format="{} courrier(s)")
+        
         # Charger les données
         self.load_mail_data(tree, mail_type)
         
@@ -3133,6 +3112,8 @@ class HRManagementApp:
         context_menu.add_separator()
         context_menu.add_command(label="📁 Ouvrir fichier",
                                 command=lambda: self.open_mail_file(tree))
+        context_menu.add_command(label="📑 Créer un PDF interrogeable",
+                                command=lambda: self.make_mail_file_searchable(tree))
         context_menu.add_separator()
         context_menu.add_command(label="🗑️ Supprimer",
                                 command=lambda: self.delete_mail(tree))
@@ -3154,22 +3135,22 @@ class HRManagementApp:
             
     def load_mail_data(self, tree, mail_type):
         """Charger les données des courriers dans le treeview - MISE À JOUR avec fichier"""
-        # Vider le treeview
-        for item in tree.get_children():
-            tree.delete(item)
+        self.mail_views[mail_type].show(*self._query_mail_list(mail_type, ''))
         
-        # Récupérer les données
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT numero_ordre, nombre_pieces, date_arrivee_expedition,
-                   expediteur_destinataire, objet, numero_archive, file_path, id
-            FROM courriers
-            WHERE type_courrier = ?
-            ORDER BY date_arrivee_expedition DESC
-        ''', (mail_type,))
-        
-        for row in cursor.fetchall():
+    def _query_mail_list(self, mail_type, search_term, cancel_event=None):
+        """Prépare une liste de courriers : pagination, première page et total (sans toucher à l'interface)."""
+        sort_keys, descending = self.mail_views[mail_type].current_sort()
+        if sort_keys is None:
+            pager = courrier_pager(self.db, mail_type, search_term)
+        else:
+            pager = courrier_pager(self.db, mail_type, search_term, sort_keys, descending)
+        first_page = self._render_mail_rows(pager.next_page(cancel_event))
+        return pager, first_page, pager.total(cancel_event)
+        
+    def _render_mail_rows(self, rows):
+        """Convertit une page de courriers en lignes (valeurs, tags) de la liste."""
+        rendered = []
+        for row in rows:
             # Formater la date
             date_str = row[2]
             try:
@@ -3181,11 +3162,10 @@ class HRManagementApp:
             # Indicateur de fichier
             file_indicator = "📄" if row[6] and os.path.exists(row[6]) else ""
             
-            tree.insert('', 'end', values=(
+            rendered.append(((
                 row[0], row[1], formatted_date, row[3], row[4], row[5] or '', file_indicator
-            ), tags=(row[7],))  # Stocker l'ID dans les tags
-            
-        conn.close()
+            ), (row[7],)))  # Stocker l'ID dans les tags
+        return rendered
         
     def add_new_mail(self):
         """Ajouter un nouveau courrier"""
@@ -3216,11 +3196,10 @@ class HRManagementApp:
         
         # Si modification, charger les données existantes
         if mail_id:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM courriers WHERE id = ?", (mail_id,))
-            mail_data = cursor.fetchone()
-            conn.close()
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM courriers WHERE id = ?", (mail_id,))
+                mail_data = cursor.fetchone()
             
             if mail_data:
                 numero_ordre_var.set(mail_data[1])
@@ -3365,7 +3344,7 @@ class HRManagementApp:
                                    padx=15,
                                    pady=5,
                                    cursor='hand2',
-                                   command=self.select_mail_file)
+                                   command=lambda: self.select_mail_file(on_selected=prefill_from_scan))
         select_file_btn.pack(side='left')
         
         self.file_label = tk.Label(file_frame,
@@ -3375,6 +3354,20 @@ class HRManagementApp:
                                   bg=self.colors['background'])
         self.file_label.pack(side='left', padx=(10, 0))
         row += 1
+
+        # Saisie assistée : lecture du scan en arrière-plan, les champs vides sont pré-remplis
+        intake_label = tk.Label(form_frame, text="", font=('Segoe UI', 9),
+                                fg=self.colors['text_light'], bg=self.colors['background'],
+                                anchor='w', justify='left')
+        intake_label.grid(row=row, column=1, sticky='ew', padx=(10, 0))
+        row += 1
+
+        def prefill_from_scan(file_path):
+            self._start_mail_intake(form_window, file_path, type_courrier_var.get(), {
+                'date_arrivee_expedition': date_var,
+                'expediteur_destinataire': expediteur_destinataire_var,
+                'objet': objet_var,
+            }, intake_label)
         
         # Observation
         tk.Label(form_frame, text="Observation:",
@@ -3437,8 +3430,8 @@ class HRManagementApp:
         # Focus sur le premier champ
         numero_entry.focus()
         
-    def select_mail_file(self):
-        """Sélectionner un fichier pour le courrier - NOUVELLE FONCTION"""
+    def select_mail_file(self, on_selected=None):
+        """Sélectionner un fichier pour le courrier ; `on_selected(chemin)` est appelé après le choix."""
         file_path = filedialog.askopenfilename(
             title="Sélectionner un fichier pour le courrier",
             filetypes=[
@@ -3455,6 +3448,62 @@ class HRManagementApp:
             self.selected_mail_file = file_path
             filename = os.path.basename(file_path)
             self.file_label.configure(text=f"📄 {filename}", fg=self.colors['primary_green'])
+            if on_selected is not None:
+                on_selected(file_path)
+
+    def _start_mail_intake(self, form_window, file_path, mail_type, field_vars, status_label):
+        """
+        Lance la lecture du scan sur le pool OCR ; le formulaire reste
+        utilisable. Le suivi se fait par `after`, comme le module OCR : aucun
+        thread de recherche n'est occupé pendant la lecture.
+        """
+        # Seule la lecture du dernier fichier choisi remplit le formulaire
+        previous = getattr(form_window, 'intake_job', None)
+        if previous is not None:
+            previous.cancel()
+        job = start_mail_intake(self._get_ocr_executor(), file_path,
+                                poppler_path=self.poppler_path,
+                                tesseract_cmd=pytesseract.pytesseract.tesseract_cmd,
+                                cache=self.ocr_cache,
+                                preprocess=PreprocessOptions())
+        form_window.intake_job = job
+        if job is None:
+            status_label.config(text="")
+            return
+        status_label.config(text="🔎 Lecture du document en cours...")
+        self._poll_mail_intake(form_window, job, [], mail_type, field_vars, status_label)
+
+    def _poll_mail_intake(self, form_window, job, texts, mail_type, field_vars, status_label):
+        if job is not getattr(form_window, 'intake_job', None) or job.cancelled:
+            return
+        if not form_window.winfo_exists():
+            job.cancel()
+            return
+        try:
+            texts.extend(text for _, text in job.poll())
+        except Exception as e:
+            job.cancel()
+            status_label.config(text=f"Lecture automatique impossible : {e}")
+            return
+        if not job.finished:
+            self.root.after(200, self._poll_mail_intake, form_window, job, texts, mail_type,
+                            field_vars, status_label)
+            return
+        fields = extract_mail_fields('\n'.join(texts), mail_type)
+
+        labels = {'date_arrivee_expedition': "date",
+                  'expediteur_destinataire': "expéditeur/destinataire",
+                  'objet': "objet"}
+        filled = []
+        for name, value in fields.items():
+            # Ne jamais écraser une saisie de l'agent
+            if not field_vars[name].get().strip():
+                field_vars[name].set(value)
+                filled.append(labels[name])
+        if filled:
+            status_label.config(text="✨ Pré-rempli depuis le scan (à vérifier) : " + ", ".join(filled))
+        else:
+            status_label.config(text="Aucun champ reconnu dans le document.")
             
     def save_mail(self, form_window, mail_id, numero_ordre, type_courrier, nombre_pieces,
                   date_str, expediteur_destinataire, objet, numero_archive, observation):
@@ -3507,46 +3556,44 @@ class HRManagementApp:
                     messagebox.showerror("Erreur", f"Erreur lors de la copie du fichier: {str(e)}")
                     return
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
             
-            if mail_id:
-                # Modification
-                cursor.execute('''
-                    UPDATE courriers SET
-                        numero_ordre = ?, type_courrier = ?, nombre_pieces = ?,
-                        date_arrivee_expedition = ?, expediteur_destinataire = ?,
-                        objet = ?, numero_archive = ?, observation = ?, file_path = ?
-                    WHERE id = ?
-                ''', (numero_ordre.strip(), type_courrier, nombre_pieces_int,
-                     date_formatted, expediteur_destinataire.strip(),
-                     objet.strip(), numero_archive.strip() or None,
-                     observation.strip() or None, file_path, mail_id))
+                if mail_id:
+                    # Modification
+                    cursor.execute('''
+                        UPDATE courriers SET
+                            numero_ordre = ?, type_courrier = ?, nombre_pieces = ?,
+                            date_arrivee_expedition = ?, expediteur_destinataire = ?,
+                            objet = ?, numero_archive = ?, observation = ?, file_path = ?
+                        WHERE id = ?
+                    ''', (numero_ordre.strip(), type_courrier, nombre_pieces_int,
+                         date_formatted, expediteur_destinataire.strip(),
+                         objet.strip(), numero_archive.strip() or None,
+                         observation.strip() or None, file_path, mail_id))
                 
-                messagebox.showinfo("Succès", "Courrier modifié avec succès!")
-            else:
-                # Vérifier l'unicité du numéro d'ordre
-                cursor.execute("SELECT id FROM courriers WHERE numero_ordre = ?", (numero_ordre.strip(),))
-                if cursor.fetchone():
-                    messagebox.showerror("Erreur", "Ce numéro d'ordre existe déjà.")
-                    conn.close()
-                    return
+                    messagebox.showinfo("Succès", "Courrier modifié avec succès!")
+                else:
+                    # Vérifier l'unicité du numéro d'ordre
+                    cursor.execute("SELECT id FROM courriers WHERE numero_ordre = ?", (numero_ordre.strip(),))
+                    if cursor.fetchone():
+                        messagebox.showerror("Erreur", "Ce numéro d'ordre existe déjà.")
+                        return
                 
-                # Nouveau courrier
-                cursor.execute('''
-                    INSERT INTO courriers (numero_ordre, type_courrier, nombre_pieces,
-                                         date_arrivee_expedition, expediteur_destinataire,
-                                         objet, numero_archive, observation, file_path, created_by)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (numero_ordre.strip(), type_courrier, nombre_pieces_int,
-                     date_formatted, expediteur_destinataire.strip(),
-                     objet.strip(), numero_archive.strip() or None,
-                     observation.strip() or None, file_path, self.current_user['username']))
+                    # Nouveau courrier
+                    cursor.execute('''
+                        INSERT INTO courriers (numero_ordre, type_courrier, nombre_pieces,
+                                             date_arrivee_expedition, expediteur_destinataire,
+                                             objet, numero_archive, observation, file_path, created_by)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (numero_ordre.strip(), type_courrier, nombre_pieces_int,
+                         date_formatted, expediteur_destinataire.strip(),
+                         objet.strip(), numero_archive.strip() or None,
+                         observation.strip() or None, file_path, self.current_user['username']))
                 
-                messagebox.showinfo("Succès", "Courrier enregistré avec succès!")
+                    messagebox.showinfo("Succès", "Courrier enregistré avec succès!")
             
-            conn.commit()
-            conn.close()
+                conn.commit()
             form_window.destroy()
             
             # Rafraîchir la liste
@@ -3569,11 +3616,10 @@ class HRManagementApp:
             return
         
         # Récupérer le chemin du fichier
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT file_path FROM courriers WHERE id = ?", (mail_id,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT file_path FROM courriers WHERE id = ?", (mail_id,))
+            result = cursor.fetchone()
         
         if result and result[0] and os.path.exists(result[0]):
             try:
@@ -3589,55 +3635,27 @@ class HRManagementApp:
         else:
             messagebox.showinfo("Information", "Aucun fichier joint à ce courrier.")
             
+    def make_mail_file_searchable(self, tree):
+        """Écrit la version interrogeable (PDF avec couche texte) du fichier joint."""
+        selection = tree.selection()
+        if not selection:
+            messagebox.showwarning("Attention", "Veuillez sélectionner un courrier.")
+            return
+        item = tree.item(selection[0])
+        mail_id = item['tags'][0] if item['tags'] else None
+        if not mail_id:
+            return
+
+        file_path = self.db.fetchvalue("SELECT file_path FROM courriers WHERE id = ?", (mail_id,))
+        if not file_path or not os.path.exists(file_path):
+            messagebox.showinfo("Information", "Aucun fichier joint à ce courrier.")
+            return
+        self._create_searchable_pdf(file_path)
+
     def search_mail(self, mail_type, search_term):
         """Rechercher des courriers"""
-        tree = self.arrival_tree if mail_type == 'arrivee' else self.departure_tree
-        
-        # Vider le treeview
-        for item in tree.get_children():
-            tree.delete(item)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if search_term.strip():
-            # Recherche avec terme
-            cursor.execute('''
-                SELECT numero_ordre, nombre_pieces, date_arrivee_expedition,
-                       expediteur_destinataire, objet, numero_archive, file_path, id
-                FROM courriers
-                WHERE type_courrier = ? AND (
-                    numero_ordre LIKE ? OR
-                    expediteur_destinataire LIKE ? OR
-                    objet LIKE ? OR
-                    numero_archive LIKE ?
-                )
-                ORDER BY date_arrivee_expedition DESC
-            ''', (mail_type, f'%{search_term}%', f'%{search_term}%',
-                 f'%{search_term}%', f'%{search_term}%'))
-        else:
-            # Afficher tous
-            self.load_mail_data(tree, mail_type)
-            conn.close()
-            return
-        
-        for row in cursor.fetchall():
-            # Formater la date
-            date_str = row[2]
-            try:
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                formatted_date = date_obj.strftime('%d/%m/%Y')
-            except:
-                formatted_date = date_str
-            
-            # Indicateur de fichier
-            file_indicator = "📄" if row[6] and os.path.exists(row[6]) else ""
-            
-            tree.insert('', 'end', values=(
-                row[0], row[1], formatted_date, row[3], row[4], row[5] or '', file_indicator
-            ), tags=(row[7],))
-            
-        conn.close()
+        # Recherche plein texte (FTS5), classée par pertinence ; sans saisie, tous les courriers
+        self.mail_views[mail_type].show(*self._query_mail_list(mail_type, search_term))
         
     def edit_mail(self, tree):
         """Modifier un courrier sélectionné"""
@@ -3666,11 +3684,10 @@ class HRManagementApp:
             return
         
         # Récupérer les détails
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM courriers WHERE id = ?", (mail_id,))
-        mail_data = cursor.fetchone()
-        conn.close()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM courriers WHERE id = ?", (mail_id,))
+            mail_data = cursor.fetchone()
         
         if not mail_data:
             messagebox.showerror("Erreur", "Courrier introuvable.")
@@ -3797,18 +3814,17 @@ class HRManagementApp:
         # Confirmation
         if messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir supprimer ce courrier ?"):
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
+                with self.db.connect() as conn:
+                    cursor = conn.cursor()
                 
-                # Récupérer le chemin du fichier pour le supprimer
-                cursor.execute("SELECT file_path FROM courriers WHERE id = ?", (mail_id,))
-                result = cursor.fetchone()
-                file_path = result[0] if result else None
+                    # Récupérer le chemin du fichier pour le supprimer
+                    cursor.execute("SELECT file_path FROM courriers WHERE id = ?", (mail_id,))
+                    result = cursor.fetchone()
+                    file_path = result[0] if result else None
                 
-                # Supprimer le courrier de la base
-                cursor.execute("DELETE FROM courriers WHERE id = ?", (mail_id,))
-                conn.commit()
-                conn.close()
+                    # Supprimer le courrier de la base
+                    cursor.execute("DELETE FROM courriers WHERE id = ?", (mail_id,))
+                    conn.commit()
                 
                 # Supprimer le fichier joint s'il existe
                 if file_path and os.path.exists(file_path):
@@ -3856,9 +3872,15 @@ class HRManagementApp:
                 'icon': '👤',
                 'command': self.generate_employee_sheet_report
             },
+            {
+                'title': '🗂️ Fiches de Tous les Employés',
+                'description': 'Une fiche par agent (tous ou une division), réunies dans une archive ZIP',
+                'icon': '📦',
+                'command': self.generate_all_employee_sheets_report
+            },
             {
                 'title': '🏖️ Rapport Annuel des Congés',
-                'description': 'Synthèse des congés pris et soldes restants par employé',
+                'description': 'Jours pris par employé et par type de congé, sur une ou plusieurs années',
                 'icon': '📅',
                 'command': self.generate_annual_leave_report
             },
@@ -3943,216 +3965,45 @@ class HRManagementApp:
         # Configurer les colonnes pour qu'elles s'étendent uniformément
         reports_frame.grid_columnconfigure(0, weight=1)
         reports_frame.grid_columnconfigure(1, weight=1)
+
+        # Panneau des rapports demandés : générés en arrière-plan, l'un après l'autre
+        jobs_frame = tk.LabelFrame(reports_frame,
+                                   text="🗂️ Rapports en cours et terminés",
+                                   font=('Segoe UI', 12, 'bold'),
+                                   fg=self.colors['primary_green'],
+                                   bg=self.colors['background'],
+                                   padx=10, pady=10)
+        jobs_frame.grid(row=(len(reports_config) + 1) // 2, column=0, columnspan=2,
+                        padx=20, pady=15, sticky='nsew')
+        reports_frame.grid_rowconfigure((len(reports_config) + 1) // 2, weight=1)
+
+        jobs_buttons = tk.Frame(jobs_frame, bg=self.colors['background'])
+        jobs_buttons.pack(fill='x', pady=(0, 5))
+        for text, command in (("📂 Ouvrir", self._open_report_job),
+                              ("⛔ Annuler", self._cancel_report_job),
+                              ("🧹 Effacer les terminés", self._clear_report_jobs)):
+            tk.Button(jobs_buttons, text=text, font=('Segoe UI', 10),
+                      bg=self.colors['accent_green'], fg=self.colors['text_dark'],
+                      relief='flat', bd=0, padx=12, pady=4, cursor='hand2',
+                      command=command).pack(side='left', padx=(0, 8))
+
+        columns = ('title', 'file', 'status', 'progress')
+        self.report_jobs_tree = ttk.Treeview(jobs_frame, columns=columns, show='headings', height=5)
+        for column, heading, width in (('title', 'Rapport', 200), ('file', 'Fichier', 260),
+                                       ('status', 'État', 90), ('progress', 'Avancement', 220)):
+            self.report_jobs_tree.heading(column, text=heading)
+            self.report_jobs_tree.column(column, width=width, anchor='w')
+        self.report_jobs_tree.pack(fill='both', expand=True)
+        self.report_jobs_tree.bind('<Double-1>', lambda e: self._open_report_job())
+        self._refresh_report_jobs()
         
     def generate_staff_list_report(self, format_type):
         """Générer le rapport de liste du personnel"""
-        try:
-            # Récupérer les données
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT matricule, first_name, last_name, job_title, department, 
-                       hire_date, contract_type, status, phone, email
-                FROM employees 
-                ORDER BY last_name, first_name
-            ''')
-            employees = cursor.fetchall()
-            conn.close()
-            
-            if not employees:
-                messagebox.showwarning("Attention", "Aucun employé trouvé")
-                return
-                
-            # --- NOUVEAU BLOC DE CODE ---
-            file_extension = ".pdf" if format_type == 'pdf' else ".xlsx"
-            default_name = f"liste_personnel_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
-            
-            filename = filedialog.asksaveasfilename(
-                title=f"Enregistrer la Liste du Personnel",
-                initialfile=default_name,
-                defaultextension=file_extension,
-                filetypes=[("Fichiers PDF", "*.pdf"), ("Fichiers Excel", "*.xlsx")]
-            )
+        filename = self._ask_report_filename("Enregistrer la Liste du Personnel", "liste_personnel", format_type)
+        if filename:
+            self._queue_report("Liste du personnel", filename, build_staff_list,
+                               self.db, format_type, filename)
 
-            if not filename:
-                return # L'utilisateur a annulé
-            # --- FIN DU NOUVEAU BLOC ---
-
-            if format_type == 'pdf':
-                self.create_staff_list_pdf(employees, filename)
-            else:
-                self.create_staff_list_excel(employees, filename)
-
-                messagebox.showinfo("Succès", f"Rapport généré avec succès:\n{filename}")
-
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la génération du rapport: {str(e)}")
-            
-    def create_staff_list_pdf(self, employees, filename):
-        """Créer le PDF de la liste du personnel en mode PAYSAGE"""
-        # --- CORRECTION : Utilisation de landscape(A4) pour passer en mode paysage ---
-        doc = SimpleDocTemplate(filename, pagesize=landscape(A4))
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Titre
-        title_style = styles['Title']
-        title_style.textColor = colors.HexColor(self.colors['primary_green'])
-        story.append(Paragraph("Liste Complète du Personnel", title_style))
-        story.append(Spacer(1, 12))
-
-        # Date de génération
-        story.append(Paragraph(f"Rapport généré le : {datetime.now().strftime('%d/%m/%Y à %H:%M')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-
-        # Préparation des données du tableau
-        headers = [
-            "Matricule", "Prénom", "Nom", "Corps de l'agent", "Division",
-            "Date d'emb.", "Contrat", "Statut", "Téléphone", "Email"
-        ]
-        data = [headers] + [list(emp) for emp in employees]
-
-        # --- CORRECTION : Ajustement de la largeur des colonnes pour le mode paysage ---
-        # La largeur totale d'un A4 paysage est d'environ 842 points.
-        # On ajuste pour une meilleure répartition.
-        col_widths = [
-            70,  # Matricule
-            90,  # Prénom
-            90,  # Nom
-            110, # Poste
-            90,  # Département
-            70,  # Date d'emb.
-            70,  # Contrat
-            60,  # Statut
-            80,  # Téléphone
-            120  # Email
-        ]
-
-        # Création du tableau
-        table = Table(data, colWidths=col_widths)
-
-        # Style du tableau
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(self.colors['primary_green'])),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor(self.colors['light_gray'])),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 8), # Taille de police réduite pour mieux s'adapter
-        ])
-        table.setStyle(style)
-
-        # Alternance des couleurs des lignes
-        for i, row in enumerate(employees):
-            if i % 2 == 0:
-                bg_color = colors.whitesmoke
-                style.add('BACKGROUND', (0, i + 1), (-1, i + 1), bg_color)
-
-        story.append(table)
-        doc.build(story)
-
-    def _get_employee_current_status(self, employee_id, stored_status):
-        """Détermine le statut actuel d'un employé en vérifiant les congés."""
-        today = datetime.now().date()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Récupère les congés approuvés qui incluent la date d'aujourd'hui
-        cursor.execute('''
-            SELECT id FROM leaves
-            WHERE employee_id = ? AND status = 'Approved'
-        ''', (employee_id,))
-        
-        leaves = cursor.fetchall()
-        is_on_leave_today = False
-        
-        for leave in leaves:
-            # Nous devons récupérer les dates et les convertir car elles sont en texte
-            cursor.execute('SELECT start_date, end_date FROM leaves WHERE id = ?', (leave[0],))
-            start_str, end_str = cursor.fetchone()
-            try:
-                start_date = datetime.strptime(start_str, '%d/%m/%Y').date()
-                end_date = datetime.strptime(end_str, '%d/%m/%Y').date()
-                
-                if start_date <= today <= end_date:
-                    is_on_leave_today = True
-                    break # Un seul congé suffit
-            except (ValueError, TypeError):
-                continue # Ignore les congés avec des dates mal formatées
-
-        conn.close()
-        
-        if is_on_leave_today:
-            return "En Congé"
-        else:
-            # Si le statut enregistré est "En Congé" mais que la période est terminée, on le remet en "Active"
-            if stored_status == "En Congé":
-                return "Active"
-            return stored_status
-
-    def create_staff_list_excel(self, employees, filename):
-        """Créer le fichier Excel de la liste du personnel"""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Liste Personnel"
-        
-        # Titre
-        ws['A1'] = "Liste du Personnel"
-        ws['A1'].font = Font(size=16, bold=True, color='2E7D32')
-        ws.merge_cells('A1:F1')
-        
-        # Date
-        ws['A2'] = f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-        ws['A2'].font = Font(size=10)
-        
-        # En-têtes
-        headers = ['Matricule', 'Nom Complet', 'Corps de l\'agent', 'Division', 'Date Embauche', 'Statut', 'Téléphone', 'Email']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = Font(bold=True, color='FFFFFF')
-            cell.fill = PatternFill(start_color='2E7D32', end_color='2E7D32', fill_type='solid')
-            cell.alignment = Alignment(horizontal='center')
-            
-        # Données
-        for row, emp in enumerate(employees, 5):
-            matricule, first_name, last_name, job_title, department, hire_date, contract_type, status, phone, email = emp
-            
-            ws.cell(row=row, column=1, value=matricule)
-            ws.cell(row=row, column=2, value=f"{first_name} {last_name}")
-            ws.cell(row=row, column=3, value=job_title or '')
-            ws.cell(row=row, column=4, value=department or '')
-            ws.cell(row=row, column=5, value=hire_date or '')
-            ws.cell(row=row, column=6, value=status)
-            ws.cell(row=row, column=7, value=phone or '')
-            ws.cell(row=row, column=8, value=email or '')
-            
-        # Ajuster les largeurs de colonnes
-        # Ajuster les largeurs de colonnes (version corrigée)
-
-        for col_idx in range(1, ws.max_column + 1):
-            column_letter = get_column_letter(col_idx)
-            max_length = 0
-            for cell in ws[column_letter]:
-                # Ignorer les cellules fusionnées
-                if isinstance(cell, openpyxl.cell.cell.MergedCell):
-                    continue
-                try:
-                    if cell.value:
-                        # Ajouter 2 pour un peu d'espace
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                except:
-                    pass
-
-            # Définir une largeur minimale et maximale
-            adjusted_width = max(max_length + 2, 15)
-            ws.column_dimensions[column_letter].width = min(adjusted_width, 40)   
-        wb.save(filename)
-        
     def generate_employee_sheet_report(self, format_type):
         """Générer la fiche détaillée d'un employé avec un champ de recherche."""
         # Créer une fenêtre de sélection
@@ -4182,8 +4033,7 @@ class HRManagementApp:
         results_listbox.pack(fill='both', expand=True, padx=20, pady=(0, 20))
 
         # --- Lier la recherche à la mise à jour de la liste ---
-        # La fonction _update_employee_listbox existe déjà dans votre code principal
-        search_var.trace('w', lambda name, index, mode, sv=search_var, lb=results_listbox: self._update_employee_listbox(lb, sv))
+        self._bind_employee_picker(results_listbox, search_var)
         # On remplit la liste une première fois avec tous les employés
         self._update_employee_listbox(results_listbox, search_var)
 
@@ -4194,7 +4044,7 @@ class HRManagementApp:
                 messagebox.showwarning("Attention", "Veuillez sélectionner un employé dans la liste", parent=selection_window)
                 return
 
-            # self.employee_choices_data est mis à jour par _update_employee_listbox
+            # self.employee_choices_data est mis à jour à chaque remplissage de la liste
             selected_emp_data = self.employee_choices_data[selection_indices[0]]
             employee_id = selected_emp_data[0]
             employee_name_for_file = f"{selected_emp_data[1]}_{selected_emp_data[2]}"
@@ -4236,606 +4086,268 @@ class HRManagementApp:
                 command=selection_window.destroy).pack(side='right')
 
 
-    def create_employee_sheet_report(self, employee_id, format_type, filename):
-        """Créer la fiche détaillée d'un employé en utilisant le chemin de fichier fourni."""
-        try:
-            # Récupérer les données complètes de l'employé
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row # Utiliser Row Factory pour un accès facile par nom de colonne
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM employees WHERE id = ?', (employee_id,))
-            employee = cursor.fetchone()
-
-            if not employee:
-                messagebox.showerror("Erreur", "Employé non trouvé")
-                conn.close()
+    def generate_all_employee_sheets_report(self, format_type):
+        """Fiches de tous les employés (ou d'une division / d'un statut) dans une archive ZIP."""
+        all_departments, all_statuses = "Toutes les divisions", "Tous les statuts"
+        departments = [row[0] for row in self.db.fetchall(
+            "SELECT DISTINCT department FROM employees "
+            "WHERE department IS NOT NULL AND department != '' ORDER BY department")]
+
+        filter_window = tk.Toplevel(self.root)
+        filter_window.title("Fiches de Tous les Employés")
+        filter_window.geometry("420x230")
+        filter_window.configure(bg=self.colors['background'])
+        filter_window.transient(self.root)
+        filter_window.grab_set()
+
+        fields_frame = tk.Frame(filter_window, bg=self.colors['background'])
+        fields_frame.pack(fill='x', padx=20, pady=20)
+
+        department_var = tk.StringVar(value=all_departments)
+        status_var = tk.StringVar(value=all_statuses)
+        for row, (label, variable, values) in enumerate((
+                ("Division :", department_var, [all_departments] + departments),
+                ("Statut :", status_var, [all_statuses, 'Active', 'En Congé', 'Suspendu',
+                                          'Retraité', 'Démissionné']))):
+            tk.Label(fields_frame, text=label, font=('Segoe UI', 11),
+                     bg=self.colors['background']).grid(row=row, column=0, sticky='w', pady=5)
+            ttk.Combobox(fields_frame, textvariable=variable, values=values, state='readonly',
+                         font=('Segoe UI', 10), width=28).grid(row=row, column=1, sticky='ew',
+                                                               padx=(10, 0), pady=5)
+        fields_frame.grid_columnconfigure(1, weight=1)
+
+        def on_confirm():
+            department = department_var.get()
+            department = None if department == all_departments else department
+            status = status_var.get()
+            status = None if status == all_statuses else status
+
+            default_name = f"fiches_employes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            filename = filedialog.asksaveasfilename(
+                title="Enregistrer l'archive des fiches",
+                initialfile=default_name,
+                defaultextension=".zip",
+                filetypes=[("Archives ZIP", "*.zip")],
+                parent=filter_window
+            )
+            if not filename:
                 return
+            filter_window.destroy()
+            title = f"Fiches employés - {department or 'toutes divisions'}"
+            self._queue_report(title, filename, build_all_employee_sheets,
+                               self.db, format_type, filename, department=department, status=status)
 
-            # Récupérer l'historique de carrière
-            cursor.execute('''
-                SELECT act_number, nature, subject, act_date, effective_date
-                FROM career_history
-                WHERE employee_id = ?
-                ORDER BY act_date DESC
-            ''', (employee_id,))
-            career_history = cursor.fetchall()
-
-            # Récupérer les congés
-            cursor.execute('''
-                SELECT lt.name, l.start_date, l.end_date, l.days_count, l.status
-                FROM leaves l
-                JOIN leave_types lt ON l.leave_type_id = lt.id
-                WHERE employee_id = ?
-                ORDER BY l.start_date DESC
-                LIMIT 10
-            ''', (employee_id,))
-            recent_leaves = cursor.fetchall()
-
-            conn.close()
+        buttons_frame = tk.Frame(filter_window, bg=self.colors['background'])
+        buttons_frame.pack(fill='x', padx=20, pady=(0, 20), side='bottom')
 
-            # On utilise directement le 'filename' passé en argument
-            if format_type == 'pdf':
-                self.create_employee_sheet_pdf(employee, career_history, recent_leaves, filename)
-            else:  # excel
-                self.create_employee_sheet_excel(employee, career_history, recent_leaves, filename)
+        tk.Button(buttons_frame,
+                text=f"Générer {format_type.upper()}",
+                font=('Segoe UI', 11, 'bold'),
+                bg=self.colors['primary_green'],
+                fg='white', relief='flat', bd=0, padx=20, pady=8, cursor='hand2',
+                command=on_confirm).pack(side='right', padx=(10, 0))
 
-            messagebox.showinfo("Succès", f"Fiche employé générée:\n{filename}")
+        tk.Button(buttons_frame,
+                text="Annuler",
+                font=('Segoe UI', 11),
+                bg=self.colors['text_light'],
+                fg='white', relief='flat', bd=0, padx=20, pady=8, cursor='hand2',
+                command=filter_window.destroy).pack(side='right')
 
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la génération: {str(e)}")
+    def create_employee_sheet_report(self, employee_id, format_type, filename):
+        """Met en file la fiche détaillée d'un employé, écrite dans le fichier fourni."""
+        self._queue_report(f"Fiche employé - {os.path.basename(filename)}", filename,
+                           build_employee_sheet, self.db, employee_id, format_type, filename)
 
-           
-    def create_employee_sheet_pdf(self, employee, career_history, recent_leaves, filename):
-        """Créer le PDF de la fiche employé"""
-        doc = SimpleDocTemplate(filename, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Titre
-        title_style = styles['Title']
-        title_style.textColor = colors.HexColor(self.colors['primary_green'])
-        story.append(Paragraph(f"Fiche Employé - {employee[2]} {employee[3]}", title_style))
-        story.append(Spacer(1, 20))
-        
-        # Informations personnelles
-        story.append(Paragraph("Informations Personnelles", styles['Heading2']))
-        
-        personal_data = [
-            ['Matricule:', employee[1]],
-            ['Nom Complet:', f"{employee[2]} {employee[3]}"],
-            ['Genre:', employee[4] or ''],
-            ['Date de Naissance:', employee[5] or ''],
-            ['Lieu de Naissance:', employee[6] or ''],
-            ['Adresse:', employee[7] or ''],
-            ['Téléphone:', employee[8] or ''],
-            ['Email:', employee[9] or ''],
-            ['Situation Matrimoniale:', employee[10] or ''],
-            ['Personnes à Charge:', str(employee[11]) if employee[11] else '0']
-        ]
-        
-        personal_table = Table(personal_data, colWidths=[150, 300])
-        personal_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        story.append(personal_table)
-        story.append(Spacer(1, 20))
-        
-        # Informations contractuelles
-        story.append(Paragraph("Informations Contractuelles", styles['Heading2']))
-        
-        contract_data = [
-            ['Date d\'Embauche:', employee[14] or ''],
-            ['Type de Contrat:', employee[15] or ''],
-            ['Début de Contrat:', employee[16] or ''],
-            ['Fin de Contrat:', employee[17] or ''],
-            ['Division:', employee[18] or ''],
-            ['Corps de l\'agent:', employee[19] or ''],
-            ['Statut:', employee[20] or '']
-        ]
-        
-        contract_table = Table(contract_data, colWidths=[150, 300])
-        contract_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        story.append(contract_table)
-        story.append(Spacer(1, 20))
-        
-        # Historique de carrière (si disponible)
-        if career_history:
-            story.append(Paragraph("Historique de Carrière", styles['Heading2']))
-            
-            career_data = [['N° Acte', 'Nature', 'Date Acte', 'Date Effet']]
-            for act in career_history[:5]:  # Limiter à 5 derniers actes
-                career_data.append([
-                    act[0] or '',
-                    act[1] or '',
-                    act[3] or '',
-                    act[4] or ''
-                ])
-                
-            career_table = Table(career_data)
-            career_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(self.colors['primary_green'])),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            story.append(career_table)
-            
-        doc.build(story)
-        
-    def create_employee_sheet_excel(self, employee, career_history, recent_leaves, filename):
-        """Créer le fichier Excel de la fiche employé"""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Fiche Employé"
-        
-        # Titre
-        ws['A1'] = f"Fiche Employé - {employee[2]} {employee[3]}"
-        ws['A1'].font = Font(size=16, bold=True, color='2E7D32')
-        ws.merge_cells('A1:D1')
-        
-        row = 3
-        
-        # Informations personnelles
-        ws[f'A{row}'] = "INFORMATIONS PERSONNELLES"
-        ws[f'A{row}'].font = Font(size=12, bold=True, color='2E7D32')
-        row += 2
-        
-        personal_fields = [
-            ('Matricule:', employee[1]),
-            ('Nom Complet:', f"{employee[2]} {employee[3]}"),
-            ('Genre:', employee[4]),
-            ('Date de Naissance:', employee[5]),
-            ('Lieu de Naissance:', employee[6]),
-            ('Adresse:', employee[7]),
-            ('Téléphone:', employee[8]),
-            ('Email:', employee[9]),
-            ('Situation Matrimoniale:', employee[10]),
-            ('Personnes à Charge:', employee[11])
-        ]
-        
-        for label, value in personal_fields:
-            ws[f'A{row}'] = label
-            ws[f'A{row}'].font = Font(bold=True)
-            ws[f'B{row}'] = value or ''
-            row += 1
-            
-        row += 2
-        
-        # Informations contractuelles
-        ws[f'A{row}'] = "INFORMATIONS CONTRACTUELLES"
-        ws[f'A{row}'].font = Font(size=12, bold=True, color='2E7D32')
-        row += 2
-        
-        contract_fields = [
-            ('Date d\'Embauche:', employee[14]),
-            ('Type de Contrat:', employee[15]),
-            ('Début de Contrat:', employee[16]),
-            ('Fin de Contrat:', employee[17]),
-            ('Division:', employee[18]),
-            ('Corps de l\'agent:', employee[19]),
-            ('Statut:', employee[20])
-        ]
-        
-        for label, value in contract_fields:
-            ws[f'A{row}'] = label
-            ws[f'A{row}'].font = Font(bold=True)
-            ws[f'B{row}'] = value or ''
-            row += 1
-            
-        # Ajuster les largeurs de colonnes
-        ws.column_dimensions['A'].width = 25
-        ws.column_dimensions['B'].width = 40
-        
-        wb.save(filename)
-        
     def generate_annual_leave_report(self, format_type):
-        """Générer le rapport annuel des congés"""
-        try:
-            current_year = datetime.now().year
-            
-            # Récupérer les données des congés
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT e.matricule, e.first_name, e.last_name, 
-                       COUNT(l.id) as total_leaves,
-                       SUM(l.days_count) as total_days,
-                       GROUP_CONCAT(lt.name || ': ' || l.days_count || ' jours', '; ') as leave_details
-                FROM employees e
-                LEFT JOIN leaves l ON e.id = l.employee_id 
-                    AND strftime('%Y', date(substr(l.start_date, 7, 4) || '-' || substr(l.start_date, 4, 2) || '-' || substr(l.start_date, 1, 2))) = ?
-                LEFT JOIN leave_types lt ON l.leave_type_id = lt.id
-                WHERE e.status = 'Active'
-                GROUP BY e.id, e.matricule, e.first_name, e.last_name
-                ORDER BY e.last_name, e.first_name
-            ''', (str(current_year),))
-            
-            leave_data = cursor.fetchall()
-            conn.close()
-            
-            if not leave_data:
-                messagebox.showwarning("Attention", "Aucune donnée de congé trouvée pour cette année.")
+        """Générer le rapport des congés sur une période (l'année en cours par défaut)"""
+        current_year = datetime.now().year
+
+        period_window = tk.Toplevel(self.root)
+        period_window.title("Période du Rapport des Congés")
+        period_window.geometry("380x200")
+        period_window.configure(bg=self.colors['background'])
+        period_window.transient(self.root)
+        period_window.grab_set()
+
+        fields_frame = tk.Frame(period_window, bg=self.colors['background'])
+        fields_frame.pack(fill='x', padx=20, pady=20)
+
+        start_var = tk.StringVar(value=f"01/01/{current_year}")
+        end_var = tk.StringVar(value=f"31/12/{current_year}")
+        for row, (label, variable) in enumerate((("Du (jj/mm/aaaa) :", start_var),
+                                                 ("Au (jj/mm/aaaa) :", end_var))):
+            tk.Label(fields_frame, text=label, font=('Segoe UI', 11),
+                     bg=self.colors['background']).grid(row=row, column=0, sticky='w', pady=5)
+            tk.Entry(fields_frame, textvariable=variable, font=('Segoe UI', 11),
+                     width=14).grid(row=row, column=1, sticky='w', padx=(10, 0), pady=5)
+
+        def on_confirm():
+            try:
+                start_dt = datetime.strptime(start_var.get().strip(), '%d/%m/%Y')
+                end_dt = datetime.strptime(end_var.get().strip(), '%d/%m/%Y')
+            except ValueError:
+                messagebox.showerror("Erreur", "Format de date invalide. Utilisez jj/mm/aaaa", parent=period_window)
+                return
+            if end_dt < start_dt:
+                messagebox.showerror("Erreur", "La date de fin doit être postérieure à la date de début", parent=period_window)
                 return
-            
-            # --- BLOC CORRIGÉ ---
-            file_extension = ".pdf" if format_type == 'pdf' else ".xlsx"
-            default_name = f"rapport_conges_{current_year}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
-            
-            filename = filedialog.asksaveasfilename(
-                title="Enregistrer le Rapport Annuel des Congés",
-                initialfile=default_name,
-                defaultextension=file_extension,
-                filetypes=[("Fichiers PDF", "*.pdf"), ("Fichiers Excel", "*.xlsx")]
-            )
 
-            if not filename:
-                return # L'utilisateur a annulé
-            
-            # Appeler les bonnes fonctions de création de rapport
-            if format_type == 'pdf':
-                self.create_annual_leave_pdf(leave_data, current_year, filename)
-            else:
-                self.create_annual_leave_excel(leave_data, current_year, filename)
+            start_date, end_date = start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d')
+            period = leave_period_label(start_date, end_date)
+            filename = self._ask_report_filename("Enregistrer le Rapport des Congés",
+                                                 f"rapport_conges_{period.replace('/', '-').replace(' ', '_')}",
+                                                 format_type)
+            if filename:
+                period_window.destroy()
+                self._queue_report(f"Congés {period}", filename, build_annual_leave,
+                                   self.db, format_type, filename,
+                                   start_date=start_date, end_date=end_date)
 
-            messagebox.showinfo("Succès", f"Rapport généré avec succès:\n{filename}")
+        buttons_frame = tk.Frame(period_window, bg=self.colors['background'])
+        buttons_frame.pack(fill='x', padx=20, pady=(0, 20), side='bottom')
 
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la génération du rapport: {str(e)}")
+        tk.Button(buttons_frame,
+                text=f"Générer {format_type.upper()}",
+                font=('Segoe UI', 11, 'bold'),
+                bg=self.colors['primary_green'],
+                fg='white', relief='flat', bd=0, padx=20, pady=8, cursor='hand2',
+                command=on_confirm).pack(side='right', padx=(10, 0))
 
-    def create_annual_leave_pdf(self, leave_data, year, filename):
-        """Créer le PDF du rapport annuel des congés"""
-        doc = SimpleDocTemplate(filename, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Titre
-        title_style = styles['Title']
-        title_style.textColor = colors.HexColor(self.colors['primary_green'])
-        story.append(Paragraph(f"Rapport Annuel des Congés - {year}", title_style))
-        story.append(Spacer(1, 20))
-        
-        # Date de génération
-        story.append(Paragraph(f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Tableau des congés
-        data = [['Matricule', 'Employé', 'Nb Congés', 'Total Jours', 'Solde Restant']]
-        
-        for emp_data in leave_data:
-            matricule, first_name, last_name, total_leaves, total_days, leave_details = emp_data
-            
-            # Calcul du solde (30 jours par défaut - jours pris)
-            annual_allowance = 30
-            days_taken = total_days or 0
-            remaining_balance = annual_allowance - days_taken
-            
-            data.append([
-                matricule,
-                f"{first_name} {last_name}",
-                str(total_leaves or 0),
-                str(days_taken),
-                str(remaining_balance)
-            ])
-            
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(self.colors['primary_green'])),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ]))
-        
-        story.append(table)
-        doc.build(story)
-        
-    def create_annual_leave_excel(self, leave_data, year, filename):
-        """Créer le fichier Excel du rapport annuel des congés"""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"Congés {year}"
-        
-        # Titre
-        ws['A1'] = f"Rapport Annuel des Congés - {year}"
-        ws['A1'].font = Font(size=16, bold=True, color='2E7D32')
-        ws.merge_cells('A1:E1')
-        
-        # Date
-        ws['A2'] = f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-        ws['A2'].font = Font(size=10)
-        
-        # En-têtes
-        headers = ['Matricule', 'Employé', 'Nb Congés Pris', 'Total Jours Pris', 'Solde Restant']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = Font(bold=True, color='FFFFFF')
-            cell.fill = PatternFill(start_color='2E7D32', end_color='2E7D32', fill_type='solid')
-            cell.alignment = Alignment(horizontal='center')
-            
-        # Données
-        for row, emp_data in enumerate(leave_data, 5):
-            matricule, first_name, last_name, total_leaves, total_days, leave_details = emp_data
-            
-            # Calcul du solde
-            annual_allowance = 30
-            days_taken = total_days or 0
-            remaining_balance = annual_allowance - days_taken
-            
-            ws.cell(row=row, column=1, value=matricule)
-            ws.cell(row=row, column=2, value=f"{first_name} {last_name}")
-            ws.cell(row=row, column=3, value=total_leaves or 0)
-            ws.cell(row=row, column=4, value=days_taken)
-            ws.cell(row=row, column=5, value=remaining_balance)
-            
-            # Colorer en rouge si solde négatif
-            if remaining_balance < 0:
-                ws.cell(row=row, column=5).font = Font(color='FF0000', bold=True)
-                
-        # Ajuster les largeurs de colonnes
-        # Ajuster les largeurs de colonnes (version corrigée)
-        for col_idx in range(1, ws.max_column + 1):
-            column_letter = get_column_letter(col_idx)
-            max_length = 0
-            for cell in ws[column_letter]:
-                # Ignorer les cellules fusionnées
-                if isinstance(cell, openpyxl.cell.cell.MergedCell):
-                    continue
-                try:
-                    if cell.value:
-                        # Ajouter 2 pour un peu d'espace
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                except:
-                    pass
+        tk.Button(buttons_frame,
+                text="Annuler",
+                font=('Segoe UI', 11),
+                bg=self.colors['text_light'],
+                fg='white', relief='flat', bd=0, padx=20, pady=8, cursor='hand2',
+                command=period_window.destroy).pack(side='right')
 
-            # Définir une largeur minimale et maximale
-            adjusted_width = max(max_length + 2, 15)
-            ws.column_dimensions[column_letter].width = min(adjusted_width, 40)
-        wb.save(filename)
-        
     def generate_hr_statistics_report(self, format_type):
         """Générer le rapport de statistiques RH"""
-        try:
-            # Récupérer toutes les statistiques
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Statistiques générales
-            cursor.execute('SELECT COUNT(*) FROM employees WHERE status = "Active"')
-            total_active = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM employees')
-            total_employees = cursor.fetchone()[0]
-            
-            # Répartition par département
-            cursor.execute('''
-                SELECT department, COUNT(*) 
-                FROM employees 
-                WHERE status = "Active" AND department IS NOT NULL AND department != ""
-                GROUP BY department 
-                ORDER BY COUNT(*) DESC
-            ''')
-            dept_stats = cursor.fetchall()
-            
-            # Répartition par type de contrat
-            cursor.execute('''
-                SELECT contract_type, COUNT(*) 
-                FROM employees 
-                WHERE status = "Active" AND contract_type IS NOT NULL AND contract_type != ""
-                GROUP BY contract_type
-            ''')
-            contract_stats = cursor.fetchall()
-            
-            # Statistiques des congés (année courante)
-            current_year = datetime.now().year
-            cursor.execute('''
-                SELECT COUNT(*), SUM(days_count)
-                FROM leaves 
-                WHERE strftime('%Y', date(substr(start_date, 7, 4) || '-' || substr(start_date, 4, 2) || '-' || substr(start_date, 1, 2))) = ?
-            ''', (str(current_year),))
-            leave_stats = cursor.fetchone()
-            
-            conn.close()
-            
-            # --- BLOC CORRIGÉ ---
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S') # Ligne qui manquait
-            file_extension = ".pdf" if format_type == 'pdf' else ".xlsx"
-            default_name = f"statistiques_rh_{timestamp}{file_extension}"
-            
-            filename = filedialog.asksaveasfilename(
-                title="Enregistrer les Statistiques RH",
-                initialfile=default_name,
-                defaultextension=file_extension,
-                filetypes=[("Fichiers PDF", "*.pdf"), ("Fichiers Excel", "*.xlsx")]
-            )
+        filename = self._ask_report_filename("Enregistrer les Statistiques RH", "statistiques_rh", format_type)
+        if filename:
+            self._queue_report("Statistiques RH", filename, build_hr_statistics,
+                               self.db, format_type, filename)
+
+    def _ask_report_filename(self, title, base_name, format_type):
+        """Boîte « Enregistrer sous » d'un rapport ; None si l'utilisateur annule."""
+        file_extension = ".pdf" if format_type == 'pdf' else ".xlsx"
+        default_name = f"{base_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
+        return filedialog.asksaveasfilename(
+            title=title,
+            initialfile=default_name,
+            defaultextension=file_extension,
+            filetypes=[("Fichiers PDF", "*.pdf"), ("Fichiers Excel", "*.xlsx")]
+        ) or None
+
+    def _queue_report(self, title, filename, build, *args, **kwargs):
+        """Ajoute un rapport à la file : il est généré en arrière-plan, l'interface reste libre."""
+        self.report_queue.submit(title, filename, build, *args, **kwargs)
+        self._refresh_report_jobs()
+
+    def _poll_report_jobs(self):
+        """Suit la file des rapports : notification à la fin de chacun, mise à jour du panneau."""
+        for job in list(self.report_queue.jobs):
+            if job.active or job.id in self.notified_report_jobs:
+                continue
+            self.notified_report_jobs.add(job.id)
+            if job.status == JOB_DONE:
+                self._notify(f"✅ {job.title} prêt :\n{os.path.basename(job.filename)}",
+                             action=("Ouvrir", lambda path=job.filename: self._open_with_default_app(path)))
+            elif job.status == JOB_FAILED:
+                self._notify(f"❌ {job.title} : {job.message}", kind='error')
+        self._refresh_report_jobs()
+        self.root.after(500, self._poll_report_jobs)
+
+    def _refresh_report_jobs(self):
+        """Met à jour le panneau des rapports s'il est affiché."""
+        tree = getattr(self, 'report_jobs_tree', None)
+        if tree is None or not tree.winfo_exists():
+            return
+        jobs = {str(job.id): job for job in self.report_queue.jobs}
+        for iid in tree.get_children():
+            if iid not in jobs:
+                tree.delete(iid)
+        for index, (iid, job) in enumerate(reversed(list(jobs.items()))):
+            if job.status == JOB_RUNNING:
+                progress = f"{int(job.progress * 100)} % - {job.message}"
+            else:
+                progress = job.message
+            values = (job.title, os.path.basename(job.filename),
+                      REPORT_STATUS_LABELS[job.status], progress)
+            if tree.exists(iid):
+                tree.item(iid, values=values)
+            else:
+                tree.insert('', index, iid=iid, values=values)
 
-            if not filename:
-                return # L'utilisateur a annulé
+    def _selected_report_job(self):
+        selection = self.report_jobs_tree.selection()
+        if not selection:
+            messagebox.showwarning("Attention", "Veuillez sélectionner un rapport dans la liste.")
+            return None
+        return self.report_queue.get(int(selection[0]))
 
-            # Logique if/else corrigée
-            if format_type == 'pdf':
-                self.create_hr_statistics_pdf(
-                    total_active, total_employees, dept_stats, 
-                    contract_stats, leave_stats, filename
-                )
-            else:  # excel
-                self.create_hr_statistics_excel(
-                    total_active, total_employees, dept_stats, 
-                    contract_stats, leave_stats, filename
-                )
-                
-            messagebox.showinfo("Succès", f"Rapport statistiques généré: {filename}")
-            
+    def _open_report_job(self):
+        job = self._selected_report_job()
+        if job is None:
+            return
+        if job.status != JOB_DONE:
+            messagebox.showinfo("Information", "Ce rapport n'est pas encore prêt.")
+            return
+        self._open_with_default_app(job.filename)
+
+    def _cancel_report_job(self):
+        job = self._selected_report_job()
+        if job is not None and not job.cancel():
+            messagebox.showinfo("Information", "Seuls les rapports en attente peuvent être annulés.")
+        self._refresh_report_jobs()
+
+    def _clear_report_jobs(self):
+        self.report_queue.clear_finished()
+        self._refresh_report_jobs()
+
+    def _open_with_default_app(self, path):
+        """Ouvre un fichier avec l'application par défaut du système."""
+        try:
+            if platform.system() == 'Darwin':  # macOS
+                subprocess.call(('open', path))
+            elif platform.system() == 'Windows':  # Windows
+                os.startfile(path)
+            else:  # Linux
+                subprocess.call(('xdg-open', path))
         except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de la génération: {str(e)}")
+            messagebox.showerror("Erreur", f"Impossible d'ouvrir le fichier: {str(e)}")
+
+    def _notify(self, message, kind='success', action=None, duration_ms=6000):
+        """
+        Notification discrète en bas à droite de la fenêtre, fermée
+        automatiquement ; `action` = (libellé, commande) ajoute un bouton.
+        """
+        background = self.colors['error'] if kind == 'error' else self.colors['primary_green']
+        toast = tk.Toplevel(self.root)
+        toast.wm_overrideredirect(True)
+        toast.attributes('-topmost', True)
+        frame = tk.Frame(toast, bg=background, padx=12, pady=10)
+        frame.pack(fill='both', expand=True)
+        tk.Label(frame, text=message, font=('Segoe UI', 10), fg='white', bg=background,
+                 justify='left', wraplength=300).pack(side='left')
+        tk.Button(frame, text="✕", font=('Segoe UI', 9), fg='white', bg=background, relief='flat',
+                  bd=0, cursor='hand2', command=toast.destroy).pack(side='right', anchor='n')
+        if action is not None:
+            label, command = action
+            tk.Button(frame, text=label, font=('Segoe UI', 9, 'bold'), bg='white',
+                      fg=background, relief='flat', padx=8, cursor='hand2',
+                      command=lambda: (toast.destroy(), command())).pack(side='right', padx=(10, 5))
+
+        # Les notifications ouvertes s'empilent vers le haut
+        self.notifications = [t for t in self.notifications if t.winfo_exists()]
+        toast.update_idletasks()
+        offset = sum(t.winfo_height() + 8 for t in self.notifications)
+        x = self.root.winfo_rootx() + self.root.winfo_width() - toast.winfo_width() - 20
+        y = self.root.winfo_rooty() + self.root.winfo_height() - toast.winfo_height() - 20 - offset
+        toast.geometry(f"+{x}+{y}")
+        self.notifications.append(toast)
+        toast.after(duration_ms if kind != 'error' else duration_ms * 2, toast.destroy)
 
-    def create_hr_statistics_pdf(self, total_active, total_employees, dept_stats, contract_stats, leave_stats, filename):
-        """Créer le PDF des statistiques RH"""
-        doc = SimpleDocTemplate(filename, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Titre
-        title_style = styles['Title']
-        title_style.textColor = colors.HexColor(self.colors['primary_green'])
-        story.append(Paragraph("Statistiques RH ", title_style))
-        story.append(Spacer(1, 20))
-        
-        # Date de génération
-        story.append(Paragraph(f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}", styles['Normal']))
-        story.append(Spacer(1, 30))
-        
-        # Statistiques générales
-        story.append(Paragraph("Statistiques Générales", styles['Heading2']))
-        
-        general_data = [
-            ['Total Employés:', str(total_employees)],
-            ['Employés Actifs:', str(total_active)],
-            ['Taux d\'Activité:', f"{(total_active/total_employees*100):.1f}%" if total_employees > 0 else "0%"]
-        ]
-        
-        general_table = Table(general_data, colWidths=[200, 100])
-        general_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        story.append(general_table)
-        story.append(Spacer(1, 20))
-        
-        # Répartition par département
-        if dept_stats:
-            story.append(Paragraph("Répartition par Division", styles['Heading2']))
-            
-            dept_data = [['Division', 'Nombre d\'Employés', 'Pourcentage']]
-            for dept, count in dept_stats:
-                percentage = (count / total_active * 100) if total_active > 0 else 0
-                dept_data.append([dept, str(count), f"{percentage:.1f}%"])
-                
-            dept_table = Table(dept_data)
-            dept_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(self.colors['primary_green'])),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            story.append(dept_table)
-            story.append(Spacer(1, 20))
-            
-        # Statistiques des congés
-        story.append(Paragraph(f"Statistiques des Congés {datetime.now().year}", styles['Heading2']))
-        
-        total_leave_requests = leave_stats[0] or 0
-        total_leave_days = leave_stats[1] or 0
-        
-        leave_data = [
-            ['Total Demandes de Congés:', str(total_leave_requests)],
-            ['Total Jours de Congés:', str(total_leave_days)],
-            ['Moyenne par Demande:', f"{(total_leave_days/total_leave_requests):.1f} jours" if total_leave_requests > 0 else "0 jours"]
-        ]
-        
-        leave_table = Table(leave_data, colWidths=[200, 100])
-        leave_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        story.append(leave_table)
-        
-        doc.build(story)
-        
-    def create_hr_statistics_excel(self, total_active, total_employees, dept_stats, contract_stats, leave_stats, filename):
-        """Créer le fichier Excel des statistiques RH"""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Statistiques RH"
-        
-        # Titre
-        ws['A1'] = "Statistiques RH "
-        ws['A1'].font = Font(size=16, bold=True, color='2E7D32')
-        ws.merge_cells('A1:D1')
-        
-        # Date
-        ws['A2'] = f"Généré le: {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-        ws['A2'].font = Font(size=10)
-        
-        row = 4
-        
-        # Statistiques générales
-        ws[f'A{row}'] = "STATISTIQUES GÉNÉRALES"
-        ws[f'A{row}'].font = Font(size=12, bold=True, color='2E7D32')
-        row += 2
-        
-        ws[f'A{row}'] = "Total Employés:"
-        ws[f'A{row}'].font = Font(bold=True)
-        ws[f'B{row}'] = total_employees
-        row += 1
-        
-        ws[f'A{row}'] = "Employés Actifs:"
-        ws[f'A{row}'].font = Font(bold=True)
-        ws[f'B{row}'] = total_active
-        row += 1
-        
-        ws[f'A{row}'] = "Taux d'Activité:"
-        ws[f'A{row}'].font = Font(bold=True)
-        ws[f'B{row}'] = f"{(total_active/total_employees*100):.1f}%" if total_employees > 0 else "0%"
-        row += 3
-        
-        # Répartition par département
-        if dept_stats:
-            ws[f'A{row}'] = "RÉPARTITION PAR DÉPARTEMENT"
-            ws[f'A{row}'].font = Font(size=12, bold=True, color='2E7D32')
-            row += 2
-            
-            # En-têtes
-            headers = ['Division', 'Nombre', 'Pourcentage']
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row, column=col, value=header)
-                cell.font = Font(bold=True, color='FFFFFF')
-                cell.fill = PatternFill(start_color='2E7D32', end_color='2E7D32', fill_type='solid')
-            row += 1
-            
-            # Données
-            for dept, count in dept_stats:
-                percentage = (count / total_active * 100) if total_active > 0 else 0
-                ws.cell(row=row, column=1, value=dept)
-                ws.cell(row=row, column=2, value=count)
-                ws.cell(row=row, column=3, value=f"{percentage:.1f}%")
-                row += 1
-                
-        # Ajuster les largeurs de colonnes
-        ws.column_dimensions['A'].width = 25
-        ws.column_dimensions['B'].width = 15
-        ws.column_dimensions['C'].width = 15
-        
-        wb.save(filename)
-        
     def show_settings_module(self):
         """Module de configuration"""
         self.clear_main_content()
@@ -5062,7 +4574,7 @@ Développé pour Sen pro
                 return
                 
             # Vérifier l'unicité
-            conn = sqlite3.connect(self.db_path)
+            conn = self.db.connect()
             cursor = conn.cursor()
             cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
             
@@ -5209,7 +4721,7 @@ Développé pour Sen pro
                 return
                 
             # Vérifier le mot de passe actuel
-            conn = sqlite3.connect(self.db_path)
+            conn = self.db.connect()
             cursor = conn.cursor()
             
             current_pwd_hash = hashlib.sha256(current_pwd.encode()).hexdigest()
@@ -5274,8 +4786,8 @@ Développé pour Sen pro
             )
             
             if backup_path:
-                # Copier la base de données
-                shutil.copy2(self.db_path, backup_path)
+                # Copie cohérente via l'API de sauvegarde SQLite (inclut le journal WAL)
+                self.db.backup(backup_path)
                 messagebox.showinfo("Succès", f"Base de données sauvegardée avec succès:\n{backup_path}")
                 
         except Exception as e:
@@ -5294,8 +4806,40 @@ Développé pour Sen pro
                 )
                 
                 if backup_file:
-                    # Remplacer la base de données actuelle
-                    shutil.copy2(backup_file, self.db_path)
+                    # Un rapport en cours utilise encore la base : attendre sa fin
+                    if any(job.active for job in self.report_queue.jobs):
+                        messagebox.showwarning(
+                            "Rapports en cours",
+                            "Des rapports sont en cours de génération.\n\n"
+                            "Attendez leur fin (ou annulez-les) avant de restaurer la base.")
+                        return
+                    # Arrêter l'indexation OCR, qui écrit dans la base
+                    indexer = self.attachment_indexer
+                    indexer_was_running = indexer is not None and indexer.running
+                    if indexer_was_running:
+                        indexer.stop()
+                        indexer.join(timeout=10)
+                    # Fermer les connexions (après le retour de celles des
+                    # recherches en cours) avant de remplacer le fichier
+                    if not self.db.close(timeout=10):
+                        self.db.reopen()
+                        if indexer_was_running:
+                            indexer.start()
+                        messagebox.showerror("Erreur", "La base de données est encore utilisée "
+                                             "par une tâche en arrière-plan.\n\nRéessayez dans un instant.")
+                        return
+                    try:
+                        for suffix in ('-wal', '-shm'):
+                            if os.path.exists(self.db_path + suffix):
+                                os.remove(self.db_path + suffix)
+                        # Remplacer la base de données actuelle
+                        shutil.copy2(backup_file, self.db_path)
+                    except Exception:
+                        # Restauration impossible : l'application continue sur la base actuelle
+                        self.db.reopen()
+                        if indexer_was_running:
+                            indexer.start()
+                        raise
                     messagebox.showinfo("Succès", "Base de données restaurée avec succès.\n\nL'application va redémarrer.")
                     
                     # Redémarrer l'application
@@ -5307,11 +4851,10 @@ Développé pour Sen pro
     def get_total_employees(self):
         """Obtenir le nombre total d'employés"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM employees')
-            count = cursor.fetchone()[0]
-            conn.close()
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*) FROM employees')
+                count = cursor.fetchone()[0]
             return count
         except:
             return 0
@@ -5319,11 +4862,10 @@ Développé pour Sen pro
     def get_total_users(self):
         """Obtenir le nombre total d'utilisateurs"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM users')
-            count = cursor.fetchone()[0]
-            conn.close()
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*) FROM users')
+                count = cursor.fetchone()[0]
             return count
         except:
             return 0
@@ -5392,9 +4934,47 @@ Développé pour Sen pro
                              command=self._select_and_process_file)
         load_btn.pack(pady=10, padx=10, fill='x')
 
+        # Résolution de rendu des PDF : plus élevée = plus précis mais plus lent
+        dpi_frame = tk.Frame(left_panel, bg=self.colors['white'])
+        dpi_frame.pack(pady=(0, 5), padx=10, fill='x')
+        tk.Label(dpi_frame, text="Résolution PDF (DPI) :", font=('Segoe UI', 10),
+                 bg=self.colors['white']).pack(side='left')
+        self.ocr_dpi_var = tk.StringVar(value=str(DEFAULT_DPI))
+        ttk.Combobox(dpi_frame, textvariable=self.ocr_dpi_var, values=['150', '200', '300', '400'],
+                     width=6, state='readonly').pack(side='right')
+
+        # Réduction à 300 DPI, niveaux de gris, binarisation et redressement avant l'OCR
+        self.ocr_preprocess_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(left_panel, text="Prétraiter les images (photos, scans penchés)",
+                       variable=self.ocr_preprocess_var, font=('Segoe UI', 10),
+                       bg=self.colors['white'], anchor='w').pack(padx=10, fill='x')
+
         self.ocr_file_label = tk.Label(left_panel, text="Aucun fichier sélectionné", font=('Segoe UI', 10),
                                        bg=self.colors['white'], wraplength=280)
         self.ocr_file_label.pack(pady=5, padx=10)
+
+        # Progression et annulation du traitement en cours
+        self.ocr_progress = ttk.Progressbar(left_panel, mode='determinate')
+        self.ocr_progress.pack(pady=(5, 0), padx=10, fill='x')
+        self.ocr_status_label = tk.Label(left_panel, text="", font=('Segoe UI', 9),
+                                         fg=self.colors['text_light'], bg=self.colors['white'])
+        self.ocr_status_label.pack(pady=(2, 0), padx=10)
+        self.ocr_cancel_btn = tk.Button(left_panel, text="⛔ Annuler", font=('Segoe UI', 10),
+                                        bg=self.colors['error'], fg='white', relief='flat',
+                                        state='disabled', command=self._cancel_ocr_job)
+        self.ocr_cancel_btn.pack(pady=5, padx=10, fill='x')
+
+        # Indexation des pièces jointes (courriers et documents) pour la recherche
+        tk.Label(left_panel, text="Pièces jointes", font=('Segoe UI', 12, 'bold'),
+                 bg=self.colors['white']).pack(pady=(10, 0))
+        self.ocr_index_btn = tk.Button(left_panel, font=('Segoe UI', 10),
+                                       bg=self.colors['accent_green'], relief='flat',
+                                       command=self._toggle_attachment_indexer)
+        self.ocr_index_btn.pack(pady=5, padx=10, fill='x')
+        self.ocr_index_label = tk.Label(left_panel, text="", font=('Segoe UI', 9),
+                                        fg=self.colors['text_light'], bg=self.colors['white'])
+        self.ocr_index_label.pack(padx=10)
+        self._poll_attachment_indexer()
         
         self.ocr_image_preview = tk.Label(left_panel, bg=self.colors['light_gray'])
         self.ocr_image_preview.pack(pady=10, padx=10, fill='both', expand=True)
@@ -5416,6 +4996,11 @@ Développé pour Sen pro
                              bg=self.colors['accent_green'], command=self._save_text_as_file)
         save_btn.pack(side='right')
 
+        pdf_btn = tk.Button(result_toolbar, text="📑 PDF interrogeable", font=('Segoe UI', 10),
+                            bg=self.colors['accent_green'],
+                            command=lambda: self._create_searchable_pdf(self.ocr_file_path))
+        pdf_btn.pack(side='right', padx=5)
+
         text_frame = tk.Frame(right_panel)
         text_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
 
@@ -5441,10 +5026,10 @@ Développé pour Sen pro
         if not file_path:
             return
 
+        self.ocr_file_path = file_path
         self.ocr_file_label.config(text=os.path.basename(file_path))
         self.ocr_result_text.delete('1.0', tk.END)
         self.ocr_result_text.insert('1.0', "Traitement en cours, veuillez patienter...")
-        self.root.update_idletasks()
 
         file_ext = os.path.splitext(file_path)[1].lower()
         if file_ext in ['.pdf']:
@@ -5453,10 +5038,7 @@ Développé pour Sen pro
             self._process_image_ocr(file_path)
 
     def _process_image_ocr(self, file_path):
-        """
-        CORRIGÉ : Traite une seule image avec Tesseract et affiche le résultat.
-        Cette fonction gère maintenant correctement les fichiers images.
-        """
+        """Affiche l'aperçu de l'image et lance son OCR en arrière-plan."""
         try:
             # Afficher un aperçu de l'image
             image = Image.open(file_path)
@@ -5464,50 +5046,198 @@ Développé pour Sen pro
             preview_photo = ImageTk.PhotoImage(image)
             self.ocr_image_preview.config(image=preview_photo, text="")
             self.ocr_image_preview.image = preview_photo
-
-            # Extraire le texte de l'image originale
-            text = pytesseract.image_to_string(Image.open(file_path), lang='fra')
-            self.ocr_result_text.delete('1.0', tk.END)
-            self.ocr_result_text.insert('1.0', text or "Aucun texte n'a pu être détecté dans l'image.")
-
         except Exception as e:
             messagebox.showerror("Erreur de Traitement d'Image",
                                  f"Impossible de traiter l'image.\n\nDétail de l'erreur: {e}")
             self.ocr_result_text.delete('1.0', tk.END)
+            return
+
+        self._start_ocr_job(file_path)
 
     def _process_pdf_ocr(self, file_path):
-        """
-        CORRIGÉ : Convertit un PDF en images, puis traite chaque image avec Tesseract.
-        Utilise maintenant le chemin portable de Poppler.
-        """
+        """Lance l'OCR d'un PDF : les pages sont réparties sur le pool de processus."""
         # Pas d'aperçu pour les PDF
         self.ocr_image_preview.config(image=None, text="Aperçu non\ndisponible\npour les PDF")
         self.ocr_image_preview.image = None
-        
+
+        self._start_ocr_job(file_path)
+
+    def _get_ocr_executor(self):
+        """Pool de processus OCR, créé à la première utilisation."""
+        if self.ocr_executor is None:
+            self.ocr_executor = create_ocr_executor(
+                tesseract_cmd=pytesseract.pytesseract.tesseract_cmd)
+        return self.ocr_executor
+
+    def _toggle_attachment_indexer(self):
+        """Lance ou arrête l'indexation OCR des pièces jointes en arrière-plan."""
+        indexer = self.attachment_indexer
+        if indexer is not None and indexer.running:
+            indexer.stop()
+        else:
+            # Pool propre à l'indexeur : l'OCR interactif garde ses processus
+            self.attachment_indexer = AttachmentIndexer(
+                self.db,
+                poppler_path=self.poppler_path,
+                tesseract_cmd=pytesseract.pytesseract.tesseract_cmd,
+                cache=self.ocr_cache,
+                preprocess=self._ocr_preprocess_options())
+            self.attachment_indexer.start()
+        self._poll_attachment_indexer()
+
+    def _poll_attachment_indexer(self):
+        """Met à jour le bouton et l'avancement tant que le module OCR est affiché."""
+        if self.ocr_index_poll_id is not None:
+            self.root.after_cancel(self.ocr_index_poll_id)
+            self.ocr_index_poll_id = None
+        if not self.ocr_index_btn.winfo_exists():
+            return
+        indexer = self.attachment_indexer
+        if indexer is not None and indexer.running:
+            self.ocr_index_btn.config(text="⏸ Arrêter l'indexation")
+            status = f"{indexer.done}/{indexer.total} fichiers indexés"
+            self.ocr_index_poll_id = self.root.after(500, self._poll_attachment_indexer)
+        else:
+            self.ocr_index_btn.config(text="🔎 Indexer les pièces jointes")
+            status = ""
+            if indexer is not None:
+                status = f"{indexer.done}/{indexer.total} fichiers indexés"
+        if indexer is not None and indexer.errors:
+            status += f" ({indexer.errors} en erreur)"
+        self.ocr_index_label.config(text=status)
+
+    def _start_ocr_job(self, file_path):
+        if self.ocr_job is not None:
+            self.ocr_job.cancel()
+
+        # Une version interrogeable à jour se lit sans OCR. Le démarrage
+        # (comptage des pages, empreinte du fichier, cache) se fait hors du
+        # thread Tk : le nombre de pages est affiché dès qu'il est connu.
+        job = OcrJob(self._get_ocr_executor(), searchable_copy(file_path) or file_path,
+                     poppler_path=self.poppler_path,
+                     tesseract_cmd=pytesseract.pytesseract.tesseract_cmd,
+                     dpi=int(self.ocr_dpi_var.get()),
+                     cache=self.ocr_cache,
+                     preprocess=self._ocr_preprocess_options()).start_async()
+
+        self.ocr_job = job
+        self.ocr_result_text.delete('1.0', tk.END)
+        self.ocr_progress.config(maximum=1, value=0)
+        self.ocr_status_label.config(text="Préparation du fichier...")
+        self.ocr_cancel_btn.config(state='normal')
+        self._poll_ocr_job(job, has_text=False)
+
+    def _poll_ocr_job(self, job, has_text):
+        """Affiche les pages terminées, dans l'ordre, puis se replanifie jusqu'à la fin."""
+        if job is not self.ocr_job or job.cancelled:
+            return
+        if not self.ocr_result_text.winfo_exists():
+            # Module OCR quitté : inutile de continuer
+            job.cancel()
+            self.ocr_job = None
+            return
+        if not job.started:
+            self.root.after(100, self._poll_ocr_job, job, has_text)
+            return
+
         try:
-            # --- CHEMIN CORRIGÉ POUR ÊTRE PORTABLE ---
-            # Utilise le chemin défini dans __init__
-            images = convert_from_path(file_path, poppler_path=self.poppler_path)
-            
-            full_text = ""
-            
-            for i, image in enumerate(images):
-                self.ocr_result_text.delete('1.0', tk.END)
-                self.ocr_result_text.insert('1.0', f"Traitement de la page {i+1}/{len(images)}...")
-                self.root.update_idletasks()
-                
-                text = pytesseract.image_to_string(image, lang='fra')
-                full_text += f"--- PAGE {i+1} ---\n{text}\n\n"
+            ready = job.poll()
+        except Exception as e:
+            job.cancel()
+            self._finish_ocr_job()
+            self._show_ocr_error(job, e)
+            return
+
+        for page_number, text in ready:
+            if job.is_pdf:
+                source = OCR_SOURCE_LABELS[job.page_sources[page_number]]
+                self.ocr_result_text.insert(tk.END, f"--- PAGE {page_number} ({source}) ---\n{text}\n\n")
+            else:
+                self.ocr_result_text.insert(tk.END, text)
+            has_text = has_text or bool(text.strip())
+
+        self.ocr_progress.config(maximum=max(1, job.page_count), value=job.completed)
+        status = f"Page {job.completed}/{job.page_count}"
+        counts = job.source_counts()
+        if counts:
+            status += " (" + ", ".join(f"{label} : {counts[source]}"
+                                       for source, label in OCR_SOURCE_LABELS.items()
+                                       if counts[source]) + ")"
+        self.ocr_status_label.config(text=status)
+
+        if not job.finished:
+            self.root.after(100, self._poll_ocr_job, job, has_text)
+            return
 
+        self.ocr_status_label.config(text=status + self._ocr_timing_summary(job))
+        self._finish_ocr_job()
+        if not has_text:
             self.ocr_result_text.delete('1.0', tk.END)
-            self.ocr_result_text.insert('1.0', full_text or "Aucun texte n'a pu être détecté dans le PDF.")
+            self.ocr_result_text.insert('1.0', "Aucun texte n'a pu être détecté dans le PDF." if job.is_pdf
+                                        else "Aucun texte n'a pu être détecté dans l'image.")
+
+    def _cancel_ocr_job(self):
+        """Bouton Annuler : abandonne les pages restantes."""
+        if self.ocr_job is not None:
+            self.ocr_job.cancel()
+            self._finish_ocr_job()
+            self.ocr_status_label.config(text="Traitement annulé")
 
+    def _create_searchable_pdf(self, file_path):
+        """
+        Écrit à côté du fichier sa version PDF interrogeable (image + texte
+        invisible), dans le pool OCR ; un message signale la fin.
+        """
+        if not file_path:
+            messagebox.showwarning("Attention", "Veuillez d'abord charger une image ou un PDF.")
+            return
+        dpi = int(self.ocr_dpi_var.get()) if hasattr(self, 'ocr_dpi_var') else DEFAULT_DPI
+        future = self._get_ocr_executor().submit(
+            write_searchable_pdf, file_path, self.poppler_path,
+            pytesseract.pytesseract.tesseract_cmd, dpi=dpi)
+        self._poll_searchable_pdf(future, file_path)
+
+    def _poll_searchable_pdf(self, future, file_path):
+        if not future.done():
+            self.root.after(200, self._poll_searchable_pdf, future, file_path)
+            return
+        try:
+            output_path = future.result()
         except Exception as e:
+            messagebox.showerror("Erreur",
+                                 f"Impossible de créer le PDF interrogeable de {os.path.basename(file_path)}.\n\n"
+                                 f"Détail de l'erreur: {e}")
+            return
+        messagebox.showinfo("PDF interrogeable", f"PDF interrogeable créé :\n{output_path}")
+
+    def _ocr_preprocess_options(self):
+        return PreprocessOptions() if self.ocr_preprocess_var.get() else None
+
+    def _ocr_timing_summary(self, job):
+        """Durées du traitement terminé, pour comparer avec et sans prétraitement."""
+        timings = job.timings
+        if not timings:
+            return ""
+        summary = f"\nOCR : {timings['ocr']:.1f} s"
+        if 'preprocess' in timings:
+            summary += (f", prétraitement : {timings['preprocess']:.1f} s"
+                        f" ({timings['pixels_before'] / 1e6:.1f} → {timings['pixels_after'] / 1e6:.1f} Mpx)")
+        return summary
+
+    def _finish_ocr_job(self):
+        self.ocr_job = None
+        self.ocr_cancel_btn.config(state='disabled')
+
+    def _show_ocr_error(self, job, error):
+        if job.is_pdf:
             # Ce message s'affichera si le PDF est corrompu OU si Poppler a un problème
             messagebox.showerror("Erreur de Traitement PDF",
                                  "Impossible de traiter le PDF. Assurez-vous que les fichiers Poppler sont bien présents et que le fichier PDF n'est pas corrompu.\n\n"
-                                 f"Détail de l'erreur: {e}")
-            self.ocr_result_text.delete('1.0', tk.END)
+                                 f"Détail de l'erreur: {error}")
+        else:
+            messagebox.showerror("Erreur de Traitement d'Image",
+                                 f"Impossible de traiter l'image.\n\nDétail de l'erreur: {error}")
+        self.ocr_result_text.delete('1.0', tk.END)
 
     def _copy_text_to_clipboard(self):
         """Copie le texte extrait dans le presse-papiers."""
@@ -5574,21 +5304,29 @@ Développé pour Sen pro
 
     def _update_employee_listbox(self, listbox, search_var):
         """Met à jour la Listbox des employés en fonction de la recherche."""
-        search_term = search_var.get()
-        listbox.delete(0, tk.END)
+        self._fill_employee_listbox(listbox, self._query_employee_choices(search_var.get()))
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT id, first_name, last_name FROM employees WHERE status = "Active" AND (first_name LIKE ? OR last_name LIKE ?) ORDER BY last_name',
-            (f'%{search_term}%', f'%{search_term}%')
-        )
-        self.employee_choices_data = cursor.fetchall()
-        conn.close()
+    def _query_employee_choices(self, search_term, cancel_event=None):
+        # Seuls les 50 meilleurs résultats sont affichés dans la liste
+        return search_employees(
+            self.db, search_term, columns='e.id, e.first_name, e.last_name',
+            status='Active', limit=50, cancel_event=cancel_event)
 
+    def _fill_employee_listbox(self, listbox, choices):
+        if not listbox.winfo_exists():
+            return
+        self.employee_choices_data = choices
+        listbox.delete(0, tk.END)
         for emp in self.employee_choices_data:
             listbox.insert(tk.END, f"{emp[1]} {emp[2]} (ID: {emp[0]})")
 
+    def _bind_employee_picker(self, listbox, search_var):
+        """Met à jour la Listbox au fil de la frappe, en arrière-plan."""
+        picker_search = DebouncedSearch(
+            self.root, self.search_executor, self._query_employee_choices,
+            lambda choices: self._fill_employee_listbox(listbox, choices))
+        search_var.trace('w', lambda *args: picker_search.submit(search_var.get()))
+
     def _select_employee_from_listbox(self, listbox, search_var, listbox_frame):
         """Remplit le champ de saisie lorsque l'employé est sélectionné."""
         if listbox.curselection():
@@ -5600,6 +5338,8 @@ Développé pour Sen pro
 
 # Point d'entrée de l'application
 if __name__ == "__main__":
+    # Nécessaire au pool de processus OCR dans l'exécutable PyInstaller (Windows)
+    multiprocessing.freeze_support()
     try:
         app = HRManagementApp()
         app.run()